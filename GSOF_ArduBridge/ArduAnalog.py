@@ -21,6 +21,17 @@ The packet has a binary byte based structure
 byte0 - 'P' for PWM-Out, 'A' for Analog-In
 byte1 - pin bumber (binary-value)
 byte2 - pwm-value (binary-value) only for analog-out command
+
+The methods with the _nb suffix are non-blocking, they return a future of the result.
+When the output-state shadow of the bridge is enabled (ArduBridgeComm.setShadow), analogWrite
+of the already commanded value returns at once (counted by getShadowStats).
+
+analogReadOversampled reads a pin n times (pipelined, or in a single write and read) and reduces
+the reads by their mean, median or trimmed mean. It returns the value and the noise (the standard
+deviation of a single read, LSB), the defaults of every pin are set with setOversampling:
+
+ardu.an.setOversampling(0, n=32, mode='median')
+val, noise = ardu.an.analogReadOversampled(0)
 """
 
 __version__ = "1.0.0"
@@ -32,38 +43,136 @@ __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
+import math
+from concurrent.futures import Future
+
+MODES = ('mean', 'median', 'trimmed')
+
+def trimmedScale(p) -> float:
+    """
+    Returns the ratio of the standard deviation of a normal distribution to the standard deviation
+    of its central part, without the fraction p at every end (truncated normal, z is the 1-p quantile):
+    var = 1 -2*z*pdf(z)/(1 -2*p)
+    """
+    if p <= 0.0:
+        return 1.0
+    import statistics #< Imported on first use
+    nd = statistics.NormalDist()
+    z = nd.inv_cdf(1.0 -p)
+    return 1.0/math.sqrt(1.0 -2.0*z*nd.pdf(z)/(1.0 -2.0*p))
+
+def reduceSamples(vals, mode='mean', trim=0.25) -> tuple:
+    """
+    Reduce the reads to (value, noise), noise is the standard deviation of a single read
+    (estimated by the median absolute deviation for the median, by the spread of the kept reads
+    scaled by trimmedScale for the trimmed mean, both assume a gaussian noise).
+    trim - Fraction of the reads that the trimmed mean drops from every end
+    """
+    n = len(vals)
+    if mode == 'mean':
+        val = sum(vals)/n
+        return (val, math.sqrt(sum([(v -val)**2 for v in vals])/max(n -1, 1)))
+    vSorted = sorted(vals)
+    if mode == 'median':
+        val = (vSorted[(n -1)//2] +vSorted[n//2])/2.0
+        dev = sorted([abs(v -val) for v in vals])
+        return (val, 1.4826*(dev[(n -1)//2] +dev[n//2])/2.0)
+    if mode == 'trimmed':
+        k = min(int(n*trim), (n -1)//2)
+        val, noise = reduceSamples(vSorted[k:n -k], 'mean')
+        return (val, noise*trimmedScale(k/(n +1.0))) #< k/(n+1) is the expected quantile of the k-th read
+    raise ValueError('Invalid oversampling mode %s'%(mode))
 
 class ArduBridgeAn():
+    OVERSAMPLING = (16, 'mean', 0.25) #< Default (n, mode, trim) of analogReadOversampled
+
     def __init__(self, bridge=False, logger=None):
         self.logger = logger
         self.comm = bridge
+        self.writes = 0 #< PWM writes
+        self.elided = 0 #< Writes skipped by the output-state shadow
+        self.oversampling = {} #< {pin: (n, mode, trim)}
+
+    def getShadowStats(self) -> dict:
+        """Returns the number of writes and the number of writes that were skipped by the output-state shadow"""
+        return {'writes': self.writes, 'elided': self.elided}
 
     def analogWrite(self, pin, val):
+        return self.analogWrite_nb(pin, val).result()
+
+    def analogWrite_nb(self, pin, val) -> Future:
+        """Non-blocking analogWrite(), returns a future of the result"""
         val = int(val)
         if (val > 0xff):
             val = 0xff
+        def parse(reply):
+            if self.logger != None:
+                RES = 'OK'
+                if reply[0] == -1:
+                    RES = 'ERR'
+                self.logger.debug(f"PWM{pin}: {val} - {RES}")
+            self.comm.shadowUpdate(pin, ('P', val), reply[0])
+            return reply[0]
         if (pin < 0x1b):
+            self.writes += 1
+            if self.comm.shadowed(pin, ('P', val)):
+                self.elided += 1
+                return self.comm.done((self.comm.GOOD, [1]), parser=lambda reply: reply[0])
             vDat = [ord('P'), pin, val]
-            self.comm.send(vDat)
-        reply = self.comm.receive(1)
-        if self.logger != None:
-            RES = 'OK'
-            if reply[0] == -1:
-                RES = 'ERR'
-            self.logger.debug(f"PWM{pin}: {val} - {RES}")
-        return reply[0]
+            return self.comm.submit(vDat, 1, parser=parse)
+        return self.comm.done((self.comm.ERR_BYTE, [-1]), parser=parse)
 
     def analogRead(self, pin):
+        return self.analogRead_nb(pin).result()
+
+    def analogRead_nb(self, pin) -> Future:
+        """Non-blocking analogRead(), returns a future of the value"""
+        def parse(reply):
+            if reply[0] != -1:
+                val = (reply[1][0] +(reply[1][1])*256)
+                if self.logger != None:
+                    self.logger.debug(f"AN{pin}: {val}")
+                return val
+            if self.logger != None:
+                self.logger.error(f"AN{pin}: Error")
+            return -1
         if (pin < 0x1b):
             vDat = [ord('A'), pin]
-            self.comm.send(vDat)
-        reply = self.comm.receive(2)
-        if reply[0] != -1:
-            val = (reply[1][0] +(reply[1][1])*256)
-            if self.logger != None:
-                self.logger.debug(f"AN{pin}: {val}")
-            return val
-        if self.logger != None:
-            self.logger.error(f"AN{pin}: Error")
+            return self.comm.submit(vDat, 2, parser=parse)
+        return self.comm.done((self.comm.ERR_BYTE, [-1, -1]), parser=parse)
+
+    def setOversampling(self, pin, n=16, mode='mean', trim=0.25) -> None:
+        """Set the defaults of analogReadOversampled for the pin (see reduceSamples)"""
+        if mode not in MODES:
+            raise ValueError('Invalid oversampling mode %s'%(mode))
+        self.oversampling[pin] = (max(int(n), 1), mode, trim)
 
-        return -1
+    def analogReadOversampled(self, pin, n=None, mode=None) -> tuple:
+        """
+        Read the pin n times back to back and reduce the reads by mode ('mean', 'median' or 'trimmed').
+        n and mode default to the setting of the pin (setOversampling).
+        Returns (value, noise) in LSB or (-1, -1.0) on error
+        """
+        return self.analogReadOversampled_nb(pin, n=n, mode=mode).result()
+
+    def analogReadOversampled_nb(self, pin, n=None, mode=None) -> Future:
+        """Non-blocking analogReadOversampled(), returns a future of (value, noise)"""
+        N, MODE, trim = self.oversampling.get(pin, self.OVERSAMPLING)
+        if n == None:
+            n = N
+        n = max(int(n), 1)
+        if mode == None:
+            mode = MODE
+        if self.comm.pipe != None:
+            futures = [self.analogRead_nb(pin) for i in range(n)]
+        else:
+            with self.comm.batch():
+                futures = [self.analogRead_nb(pin) for i in range(n)]
+        def parse(vals):
+            if min(vals) < 0:
+                return (-1, -1.0)
+            val, noise = reduceSamples(vals, mode, trim)
+            if self.logger != None:
+                self.logger.debug(f"AN{pin}: {val:.2f} +-{noise:.2f} ({mode} of {n})")
+            return (val, noise)
+        return self.comm.gather(futures, parser=parse)
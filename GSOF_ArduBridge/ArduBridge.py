@@ -20,7 +20,9 @@ It also creates instances of several other classes: ArduGPIO.ArduBridgeGPIO, Ard
 ArduI2C.ArduBridgeI2C, ArduSPI.ArduBridgeSPI, and CAP.ArduBridgePnS. These classes provide methods for
 interacting with the Arduino's analog inputs, digital inputs and outputs, I2C bus, SPI bus, and pulse and
 sample functionality, respectively.
-
+The subsystems (gpio, an, i2c, spi, cap, ws) are imported and created on first access, so short scripts
+only pay for what they use.
+COM is a serial port name, "auto" or a transport URL (fd://, tcp://host:port, loop://, see BridgeTransport).
 """
 
 __version__ = "1.0.0"
@@ -32,18 +34,12 @@ __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
-import sys, time
-import serial.tools.list_ports as listPorts
+import sys, time, importlib
 import logging
 from GSOF_ArduBridge import BridgeSerial
-from GSOF_ArduBridge import ArduAnalog
-from GSOF_ArduBridge import ArduGPIO
-from GSOF_ArduBridge import ArduI2C
-from GSOF_ArduBridge import ArduSPI
-from GSOF_ArduBridge import ArduPulseAndSample as CAP
-from GSOF_ArduBridge import ArduWs2812
 
 def findArduCom(lookFor="Arduino"):
+    import serial.tools.list_ports as listPorts
     ports = listPorts.comports()
     for port in ports:
         if lookFor in port.description:
@@ -51,7 +47,23 @@ def findArduCom(lookFor="Arduino"):
     return None
 
 class ArduBridge():
-    def __init__(self, COM="auto", baud=115200*2, logger=None, logLevel=logging.INFO, fileHandler=False, consoleHandler=True, RxTimeOut=0.015, TxTimeOut=0.1):
+    #< The subsystems are imported and created on first access: {attribute: (module, class)}
+    SUBSYSTEMS = {'gpio': ('ArduGPIO', 'ArduBridgeGPIO'),
+                  'an':   ('ArduAnalog', 'ArduBridgeAn'),
+                  'i2c':  ('ArduI2C', 'ArduBridgeI2C'),
+                  'spi':  ('ArduSPI', 'ArduBridgeSPI'),
+                  'cap':  ('ArduPulseAndSample', 'ArduBridgePnS'),
+                  'ws':   ('ArduWs2812', 'ArduBridgeWs2812')}
+    POLL = 0.05 #< GetID receive timeout while the board boots (sec)
+
+    def __init__(self, COM="auto", baud=115200*2, logger=None, logLevel=logging.INFO, fileHandler=False, consoleHandler=True, RxTimeOut=0.015, TxTimeOut=0.1, transport=None, boardID=None, vid=None, pid=None, serialNumber=None, shadow=False):
+        """
+        COM - Serial port, transport URL or "auto" to discover the board (see BridgeDiscovery)
+        boardID - The ID of the board to discover (the GetID() reply)
+        vid, pid, serialNumber - USB filter of the discovered ports
+        shadow - Skip the GPIO/PWM/servo writes of unchanged values (see ArduBridgeComm.setShadow)
+        """
+        self.timing = {} #< Startup time breakdown (sec)
 
         version = 'v1.1 running on Python %s'%(sys.version[0:5])
         self.logger = logger
@@ -60,26 +72,38 @@ class ArduBridge():
         self.logger.info('GSOF_ArduBridge %s'%(version))
         self.ExtGpio = [0,0]
         self.COM = COM
+        self.discovered = (COM == "auto")
         if self.COM == "auto":
-            self.COM = findArduCom(lookFor="Arduino")
+            from GSOF_ArduBridge import BridgeDiscovery
+            self.COM = BridgeDiscovery.findPort(boardID=boardID, vid=vid, pid=pid, serialNumber=serialNumber,
+                                                baud=baud, timing=self.timing)
             if self.COM == None:
                 raise Exception("Couldn't find arduio, try to manualy specify its port.")
             else:
                 if self.logger != None:
                     self.logger.info(f"Arduino on port '{self.COM}' is being used.")
 
-        self.comm = BridgeSerial.ArduBridgeComm( COM=self.COM, baud=baud, RxTimeOut=RxTimeOut, writeTimeout=TxTimeOut, logger=self.logger )
-        self.gpio = ArduGPIO.ArduBridgeGPIO( bridge=self.comm, logger=self.logger )
-        self.an   = ArduAnalog.ArduBridgeAn(bridge=self.comm, logger=self.logger )
-        self.i2c  = ArduI2C.ArduBridgeI2C( bridge=self.comm, logger=self.logger)
-        self.spi  = ArduSPI.ArduBridgeSPI( bridge=self.comm, logger=self.logger)
-        self.cap  = CAP.ArduBridgePnS( bridge=self.comm, logger=self.logger)
-        self.ws   = ArduWs2812.ArduBridgeWs2812( bridge=self.comm, logger=self.logger)     
+        tStart = time.perf_counter()
+        self.comm = BridgeSerial.ArduBridgeComm( COM=self.COM, baud=baud, RxTimeOut=RxTimeOut, writeTimeout=TxTimeOut, logger=self.logger, transport=transport )
+        self.comm.setShadow(shadow)
+        self.ID = False #< ID of the board from the last OpenClosePort handshake (False if it did not answer)
+        self.timing['init'] = time.perf_counter() -tStart
+
+    def __getattr__(self, name):
+        """Create the subsystems (gpio, an, i2c, spi, cap, ws) on first access"""
+        sub = self.SUBSYSTEMS.get(name)
+        if (sub == None) or ('comm' not in self.__dict__):
+            raise AttributeError(f"'ArduBridge' object has no attribute '{name}'")
+        module = importlib.import_module('GSOF_ArduBridge.' +sub[0])
+        obj = getattr(module, sub[1])( bridge=self.comm, logger=self.logger )
+        return self.__dict__.setdefault(name, obj) #< The first thread wins, later accesses do not get here
     
     def _initLogger(self, logLevel=logging.INFO, fileHandler=True, consoleHandler=True):
         """Initialize the logger with a console handler and an optional file handler"""
         logger = logging.getLogger('GSOF_ArduBridge')
         logger.setLevel(logLevel)
+        if len(logger.handlers) > 0:
+            return logger #< Already initialized by another ArduBridge object
         if consoleHandler:
             ch = logging.StreamHandler()
             ch.setLevel(logLevel)
@@ -96,6 +120,7 @@ class ArduBridge():
     def OpenClosePort(self, val, retry=6):
         """
         Open (1, retry=6) or close (0) the serial port connection to the Arduino.
+        The ID of the board is polled for up to retry*0.5 sec (the board may reset when the port is opened).
         retry = -1 will try to open the port indefinitely attempts.
         """
         if type(val) == str:
@@ -103,46 +128,58 @@ class ArduBridge():
                 val = 1
             else:
                 val = 0
+        t = time.perf_counter()
         self.comm.OpenClosePort(val)
+        self.ID = False
         if val != 0:
-            while (self.GetID() == False) and (retry != 0):
-                self.logger.debug("Open port retry# {retry}")
-                time.sleep(0.5)
-                if retry > 0:
-                    retry -= 1
-            arduRespond = self.GetID()
+            self.timing['open'] = time.perf_counter() -t
+            t = time.perf_counter()
+            deadline = t +retry*0.5
+            arduRespond = self.comm.getID(timeout=self.POLL)
+            while (arduRespond == False) and ((retry < 0) or (time.perf_counter() < deadline)):
+                self.logger.debug(f"Open port retry# {retry}")
+                arduRespond = self.comm.getID(timeout=self.POLL)
+            self.timing['handshake'] = time.perf_counter() -t
+            self.ID = arduRespond
+            if retry > 0:
+                retry = int(max(deadline -time.perf_counter(), 0)/0.5)
             if arduRespond == False:
+                retry = 0
                 self.logger.critical(f"Failed to connect to arduBridge on device {self.COM}")
             else:
+                print('%s'%(arduRespond))
                 self.logger.info(f"Connected to arduBride with response {arduRespond}")
+                if self.discovered:
+                    from GSOF_ArduBridge import BridgeDiscovery
+                    BridgeDiscovery.remember(arduRespond, self.COM)
+            self.timing['total'] = sum([self.timing.get(k, 0.0) for k in ('enumerate', 'cache', 'candidates', 'probe', 'init', 'open', 'handshake')])
         return retry
 
+    def batch(self):
+        """Context that sends the commands of the calling thread in a single write, e.g: with ardu.batch() as batch: (see BridgeBatch)"""
+        return self.comm.batch()
+
     def Reset(self):
         """Sends a reset command to the Arduino and flushes the serial buffer"""
+        self.comm.call(self._Reset)
+
+    def _Reset(self):
         self.comm.sendReset()
         self.comm.uart_flush()
         self.GetID()
 
     def GetID(self):
         """Sends a request for ID and returns the the reply if received, or False otherwise"""
-        self.comm.send([ord('?')])
-        reply = self.comm.receive(1)
-        if reply[0] > 0:
-            s = ''
-            ACK = 1
-            N = reply[1][0]
-            while (ACK > 0) and (N > 0):
-                reply = self.comm.receive(1)
-                ACK = reply[0]
-                if ACK > 0:
-                    N -= 1
-                    s += chr(reply[1][0])
-            s += '\n'
+        return self.comm.call(self._GetID)
+
+    def _GetID(self):
+        s = self.comm._getID()
+        if s != False:
             print('%s'%(s))
-            if reply[0] == 1:
-                #print('Got reply\n')
-                return s
-            return False
-        else:
-            print('No reply')
-            return False
+            return s
+        print('No reply')
+        return False
+
+    def getStartupTiming(self) -> dict:
+        """Returns the startup time breakdown (sec): enumerate, cache/candidates/probe (discovery), init, open, handshake and total"""
+        return dict(self.timing)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Pool of ArduBridge boards (e.g. one per DMF station) driven from one script.
+The boards are opened concurrently (the OpenClosePort/GetID handshake of all the boards
+runs in parallel), each board gets its own I/O worker thread, and fan-out calls run
+in parallel and return the results keyed by the board ID:
+
+pool = ArduBridgePool(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+pool.open()
+print(pool.map(lambda b: b.an.analogRead(0))) #< {'ID-A': 512, 'ID-B': 498}
+pool.close()
+
+If several boards report the same ID, the port is appended to it ("ID@port").
+The key of a board that did not answer is its port.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from GSOF_ArduBridge import ArduBridge
+
+class ArduBridgePool():
+    def __init__(self, ports, baud=115200*2, logger=None, logLevel=logging.INFO, worker=True, **kwargs):
+        """
+        ports - List of serial ports (or transport URLs) of the boards
+        worker - Start an I/O worker thread for every board
+        kwargs - Passed to every ArduBridge object (e.g. RxTimeOut)
+        """
+        self.logger = logger
+        if self.logger == None:
+            self.logger = logging.getLogger('GSOF_ArduBridge')
+            self.logger.setLevel(logLevel)
+        self.worker = worker
+        self.ardu = [ArduBridge.ArduBridge(COM=port, baud=baud, logger=self.logger, **kwargs) for port in ports]
+        self.boards = {} #< {board-ID: ArduBridge}
+        self.executor = None #< Thread pool of the concurrent calls, created by open()
+
+    def _getExecutor(self) -> ThreadPoolExecutor:
+        if self.executor == None:
+            self.executor = ThreadPoolExecutor(max_workers=max(len(self.ardu), 1), thread_name_prefix='ArduBridgePool')
+        return self.executor
+
+    def open(self, retry=6) -> dict:
+        """Open all the boards concurrently, returns {board-ID: ArduBridge}"""
+        def openBoard(ardu):
+            ardu.OpenClosePort(1, retry=retry)
+            if self.worker:
+                ardu.comm.startWorker()
+            return ardu.ID #< From the handshake of OpenClosePort
+
+        vID = list(self._getExecutor().map(openBoard, self.ardu))
+        names = [str(ID).strip() for ID in vID]
+        self.boards = {}
+        for i, (ardu, ID, name) in enumerate(zip(self.ardu, vID, names)):
+            if ID == False:
+                name = str(ardu.COM)
+                self.logger.error(f"Board on {ardu.COM} did not answer")
+            elif names.count(name) > 1:
+                name = f"{name}@{ardu.COM}"
+            if name in self.boards:
+                name = f"{name}#{i}" #< Same port name (e.g. loop://)
+            self.boards[name] = ardu
+        return self.boards
+
+    def close(self) -> None:
+        """Stop the I/O workers, close all the boards and shut down the thread pool"""
+        def closeBoard(ardu):
+            ardu.comm.stopWorker()
+            ardu.OpenClosePort(0)
+        list(self._getExecutor().map(closeBoard, self.ardu))
+        self.executor.shutdown()
+        self.executor = None
+
+    def map(self, func, IDs=None) -> dict:
+        """
+        Run func(board) on every board (or the boards in IDs) in parallel.
+        Returns {board-ID: result}, the result of a call that raised is the exception.
+        """
+        if IDs == None:
+            IDs = list(self.boards.keys())
+        executor = self._getExecutor()
+        futures = {ID: executor.submit(func, self.boards[ID]) for ID in IDs}
+        res = {}
+        for ID, fut in futures.items():
+            e = fut.exception()
+            if e != None:
+                self.logger.error(f"{ID}: {e!r}")
+                res[ID] = e
+            else:
+                res[ID] = fut.result()
+        return res
+
+    def __getitem__(self, ID):
+        return self.boards[ID]
+
+    def __iter__(self):
+        return iter(self.boards)
+
+    def __len__(self) -> int:
+        return len(self.boards)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
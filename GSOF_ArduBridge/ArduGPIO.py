@@ -21,6 +21,13 @@ byte0 - 'D' to set pin direction, 'I' to read pin state, 'O' to set pin state
         'S' to set the servo control value (firmwares above 1.5)
 byte1 - pin number (binary-value)
 byte2 - pin-value (binary-value) only for digital-out command
+
+The methods with the _nb suffix are non-blocking, they return a future of the result
+(see BridgeSerial.ArduBridgeComm.submit and the pipelined mode).
+The bulk methods (setPins, getPins, pinModes) send the commands of all the pins in a single
+write and receive all the replies in a single read, about one round trip instead of one per pin.
+When the output-state shadow of the bridge is enabled (ArduBridgeComm.setShadow), pinMode,
+digitalWrite and servoWrite of the already commanded value return at once (counted by getShadowStats).
 """
 
 __version__ = "1.0.0"
@@ -33,6 +40,7 @@ __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
 import time, math
+from concurrent.futures import Future
 from GSOF_ArduBridge import S_Curve
 
 class ArduBridgeGPIO():
@@ -46,6 +54,21 @@ class ArduBridgeGPIO():
         self.comm = bridge
         self.RES = {1:'OK', 0:'ERR' , -1:'ERR'}
         self.DIR = {1:'IN', 0:'OUT', 2:'SERVO'}
+        self.wave = None
+        self.writes = 0 #< Mode, output and servo writes
+        self.elided = 0 #< Writes skipped by the output-state shadow
+
+    def getShadowStats(self) -> dict:
+        """Returns the number of writes and the number of writes that were skipped by the output-state shadow"""
+        return {'writes': self.writes, 'elided': self.elided}
+
+    def _elide(self, key, state) -> bool:
+        """Count the write, returns True if it can be skipped (the state was already commanded)"""
+        self.writes += 1
+        if self.comm.shadowed(key, state):
+            self.elided += 1
+            return True
+        return False
 
     def setMode(self, pin, mode, init=0):
         """Set the mode of a digital pin on the Arduino (INPUT, OUTPUT, SERVO)"""
@@ -53,62 +76,175 @@ class ArduBridgeGPIO():
 
     def pinMode(self, pin, mode, init=0):
         """Set the mode of a digital pin on the Arduino (INPUT, OUTPUT, SERVO)"""
+        return self.pinMode_nb(pin, mode, init=init).result()
+
+    def pinMode_nb(self, pin, mode, init=0) -> Future:
+        """Non-blocking pinMode(), returns a future of the result"""
         if (mode > self.LAST_MODE):
             raise ValueError("Invalid mode value, exceeded maximum value")
+        def parse(reply):
+            if self.logger != None:
+                self.logger.debug('DIR%d: %s - %s', pin, self.DIR[mode], self.RES[reply[0]])
+            self.comm.shadowUpdate(('D', pin), mode, reply[0])
+            return reply[0]
         if (pin < 112):
+            if self._elide(('D', pin), mode):
+                return self.comm.done((self.comm.GOOD, [1]), parser=lambda reply: reply[0])
+            self.comm.shadowForget(pin) #< The firmware may change the output of the pin
             vDat = (ord('D'), pin, mode)
-            #print(str(vDat))
-            self.comm.send(vDat)
-        reply = self.comm.receive(1)
-        #print(reply)
-        if self.logger != None:
-            self.logger.debug('DIR%d: %s - %s', pin, self.DIR[mode], self.RES[reply[0]])
-        return reply[0]
+            return self.comm.submit(vDat, 1, parser=parse)
+        return self.comm.done((self.comm.ERR_BYTE, [-1]), parser=parse)
 
     def digitalWrite(self, pin, val, log=True):
         return self.setPin(pin, val, log=log)
 
     def setPin(self, pin, val, log=True):
         """Set the Arduino's pin state (either 0 or 1)"""
+        return self.setPin_nb(pin, val, log=log).result()
+
+    def digitalWrite_nb(self, pin, val, log=True) -> Future:
+        return self.setPin_nb(pin, val, log=log)
+
+    def setPin_nb(self, pin, val, log=True) -> Future:
+        """Non-blocking setPin(), returns a future of the result"""
         val = int(val)
         if (val != 0):
             val = 1
+        def parse(reply):
+            if self.logger != None and log == True:
+                self.logger.debug(f"DOUT{pin}: {val} - {self.RES[reply[0]]}")
+            self.comm.shadowUpdate(pin, ('O', val), reply[0])
+            return reply[0]
         if (pin < 0x1b):
+            if self._elide(pin, ('O', val)):
+                return self.comm.done((self.comm.GOOD, [1]), parser=lambda reply: reply[0])
             vDat = (ord('O'), pin, val)
-            self.comm.send(vDat)
-        reply = self.comm.receive(1)
-        if self.logger != None and log == True:
-            self.logger.debug(f"DOUT{pin}: {val} - {self.RES[reply[0]]}")
-        return reply[0]
+            return self.comm.submit(vDat, 1, parser=parse)
+        return self.comm.done((self.comm.ERR_BYTE, [-1]), parser=parse)
 
     def digitalRead(self, pin, log=True):
         return self.getPin(pin, log=log)
 
     def getPin(self, pin, log=True):
         """Returns the Arduino's pin state (either 0 or 1)"""
+        return self.getPin_nb(pin, log=log).result()
+
+    def digitalRead_nb(self, pin, log=True) -> Future:
+        return self.getPin_nb(pin, log=log)
+
+    def getPin_nb(self, pin, log=True) -> Future:
+        """Non-blocking getPin(), returns a future of the pin state"""
+        def parse(reply):
+            if reply[0] > 0:
+                val = reply[1][0]
+                if self.logger != None and log == True:
+                    self.logger.debug(f"DIN{pin}: {val}")
+                return val
+            if self.logger != None:
+                self.logger.error(f"DIN{pin}: Error")
+            return reply[0]
         if (pin < 0x1b):
             vDat = (ord('I'), pin)
-            self.comm.send(vDat)
-        reply = self.comm.receive(1)
-        if reply[0] > 0:
-            val = reply[1][0]
-            if self.logger != None and log == True:
-                self.logger.debug(f"DIN{pin}: {val}")
-            return val
-        if self.logger != None:
-            self.logger.error(f"DIN{pin}: Error")
-        return reply[0]
+            return self.comm.submit(vDat, 1, parser=parse)
+        return self.comm.done((self.comm.ERR_BYTE, [-1]), parser=parse)
+
+    def _transactPins_nb(self, vCmd, parse) -> Future:
+        """
+        Send the commands vCmd [(pin, vDat), ...] (vDat is None for an invalid pin) in a single write
+        and receive their replies in a single read, returns a future of parse({pin: (status, data)})
+        """
+        with self.comm.batch():
+            futures = [self.comm.submit(vDat, 1) if vDat != None else self.comm.done((self.comm.ERR_BYTE, [-1])) for pin, vDat in vCmd]
+        pins = [pin for pin, vDat in vCmd]
+        return self.comm.gather(futures, parser=lambda replies: parse(dict(zip(pins, replies))))
+
+    def pinModes(self, modes) -> dict:
+        """Set the mode of several pins {pin: mode, ...} in one round trip, returns {pin: result}"""
+        return self.pinModes_nb(modes).result()
+
+    def pinModes_nb(self, modes) -> Future:
+        """Non-blocking pinModes(), returns a future of {pin: result}"""
+        for mode in modes.values():
+            if (mode > self.LAST_MODE):
+                raise ValueError("Invalid mode value, exceeded maximum value")
+        res = {}
+        vCmd = []
+        for pin, mode in modes.items():
+            if (pin < 112) and self._elide(('D', pin), mode):
+                res[pin] = self.comm.GOOD
+            else:
+                self.comm.shadowForget(pin)
+                vCmd.append( (pin, (ord('D'), pin, mode) if pin < 112 else None) )
+        def parse(replies):
+            for pin, reply in replies.items():
+                if self.logger != None:
+                    self.logger.debug('DIR%d: %s - %s', pin, self.DIR[modes[pin]], self.RES[reply[0]])
+                self.comm.shadowUpdate(('D', pin), modes[pin], reply[0])
+                res[pin] = reply[0]
+            return res
+        return self._transactPins_nb(vCmd, parse)
+
+    def setPins(self, vals, log=True) -> dict:
+        """Set the state of several pins {pin: val, ...} in one round trip, returns {pin: result}"""
+        return self.setPins_nb(vals, log=log).result()
+
+    def setPins_nb(self, vals, log=True) -> Future:
+        """Non-blocking setPins(), returns a future of {pin: result}"""
+        res = {}
+        vCmd = []
+        for pin, val in vals.items():
+            val = 1 if int(val) != 0 else 0
+            if (pin < 0x1b) and self._elide(pin, ('O', val)):
+                res[pin] = self.comm.GOOD
+            else:
+                vCmd.append( (pin, (ord('O'), pin, val) if pin < 0x1b else None) )
+        def parse(replies):
+            for pin, reply in replies.items():
+                if self.logger != None and log == True:
+                    self.logger.debug(f"DOUT{pin}: {vals[pin]} - {self.RES[reply[0]]}")
+                self.comm.shadowUpdate(pin, ('O', 1 if int(vals[pin]) != 0 else 0), reply[0])
+                res[pin] = reply[0]
+            return res
+        return self._transactPins_nb(vCmd, parse)
+
+    def getPins(self, pins, log=True) -> dict:
+        """Returns the state of several pins {pin: val, ...} read in one round trip (-1 for a failed pin)"""
+        return self.getPins_nb(pins, log=log).result()
+
+    def getPins_nb(self, pins, log=True) -> Future:
+        """Non-blocking getPins(), returns a future of {pin: val}"""
+        vCmd = [(pin, (ord('I'), pin) if pin < 0x1b else None) for pin in pins]
+        def parse(replies):
+            res = {}
+            for pin, reply in replies.items():
+                if reply[0] > 0:
+                    res[pin] = reply[1][0]
+                    if self.logger != None and log == True:
+                        self.logger.debug(f"DIN{pin}: {res[pin]}")
+                else:
+                    res[pin] = -1 #< Not ERR_BYTE (0), it would read as a low level
+                    if self.logger != None:
+                        self.logger.error(f"DIN{pin}: Error")
+            return res
+        return self._transactPins_nb(vCmd, parse)
 
     def servoWrite(self, pin, val):
         """Set the angle of a servo motor attached to a digital pin (an integer from 0 to 255)"""
+        return self.servoWrite_nb(pin, val).result()
+
+    def servoWrite_nb(self, pin, val) -> Future:
+        """Non-blocking servoWrite(), returns a future of the result"""
         val = int(val)
         pin = int(pin)
+        def parse(reply):
+            if self.logger != None:
+                self.logger.debug(f"SERVO AT PIN<{pin}>: {val} - {self.RES[reply[0]]}")
+            self.comm.shadowUpdate(pin, ('S', val), reply[0])
+            return reply[0]
+        if self._elide(pin, ('S', val)):
+            return self.comm.done((self.comm.GOOD, [1]), parser=lambda reply: reply[0])
         vDat = (ord('S'), pin, val)
-        self.comm.send(vDat)
-        reply = self.comm.receive(1)
-        if self.logger != None:
-            self.logger.debug(f"SERVO AT PIN<{pin}>: {val} - {self.RES[reply[0]]}")
-        return reply[0]
+        return self.comm.submit(vDat, 1, parser=parse)
 
     def servoScurve(self, pin, p0, p1, acc=200, dt=0.05) -> int:
         """Smooth transition from P0 to P1 at acceleration"""
@@ -129,7 +265,8 @@ class ArduBridgeGPIO():
 
     def servoScurveDirect(self, pin, p0, p1, acc=200, dt=0.05, blocking=True) -> int:
         """Smooth transition from P0 to P1 at acceleration"""
-        self.comm.send( (ord('s'), int(pin), int(p0), int(p1), int(acc/10), int(dt*1000)) )
+        self.comm.shadowForget(int(pin))
+        self.comm.transact( (ord('s'), int(pin), int(p0), int(p1), int(acc/10), int(dt*1000)), 0 )
         reply = [0] #self.comm.receive(1)
         sleepTime = 2*math.sqrt(abs(p1-p0)/acc)
         if self.logger != None:
@@ -138,9 +275,23 @@ class ArduBridgeGPIO():
             time.sleep(sleepTime -0.01)
         return sleepTime
  
+    def waveform(self) -> 'BridgeWaveform.WaveformScheduler':
+        """Returns the waveform scheduler of the GPIO pins (see BridgeWaveform), its writes are not logged"""
+        if self.wave == None:
+            from GSOF_ArduBridge import BridgeWaveform
+            srtt = self.comm.rtt.rtt.get(ord('O'))
+            self.wave = BridgeWaveform.WaveformScheduler(lambda pin, val: self.setPin(pin, val, log=False),
+                                                         lambda vals: self.setPins(vals, log=False),
+                                                         tWrite=(srtt[0] if srtt != None else None))
+        return self.wave
+
     def pinPulse(self, pin, onTime, log=True) -> int:
-        """Pulse the the specific pin# on the arduino GPO"""
-        self.digitalWrite(pin, 1, log=log)
-        time.sleep(onTime)
-        self.digitalWrite(pin, 0, log=log)
+        """
+        Pulse the the specific pin# on the arduino GPO (deadline based, see BridgeWaveform).
+        The edges are logged after the pulse (if log), not between them.
+        """
+        report = self.waveform().run( [(0.0, pin, 1), (onTime, pin, 0)] )
+        if self.logger != None and log == True:
+            for pin, val, requested, estimated in report['edges']:
+                self.logger.debug(f"DOUT{pin}: {val} at {estimated*1e3:.3f} ms (estimated, requested {requested*1e3:.3f} ms)")
         return 1
@@ -41,6 +41,8 @@ note:'2' I2C packet header
      'R' read
      'A' device-address
      'L' data length
+
+The methods with the _nb suffix are non-blocking, they return a future of the result.
 """
 
 __version__ = "1.0.0"
@@ -53,6 +55,7 @@ __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
 import time
+from concurrent.futures import Future
 
 class ArduBridgeI2C():
     def __init__(self, bridge=False, logger=None):
@@ -86,36 +89,45 @@ class ArduBridgeI2C():
 
     def setFreq(self, freq):
         """Set_freq method sets the I2C bus frequency"""
+        self.setFreq_nb(freq)
+
+    def setFreq_nb(self, freq) -> Future:
+        """Non-blocking setFreq(), returns a future of the reply (the command has no reply)"""
         freq = int(freq/10000)&0xff
         vDat = [self.I2C_PACKET_ID,   #I2C packet-ID
                 self.CMD_I2C_FREQ,    #next byte is the I2C closk frequency
                 freq]
         
-        self.comm.send(vDat)          #< Send command to arduBridge
-        self.comm.sendReset()         #< To exit the I2C mode
+        return self.comm.submit(vDat, 0, trailReset=True) #< Send command to arduBridge and exit the I2C mode
 
         
     def writeRaw(self, dev, vByte):
         """Send list of bytes (vByte) to device (dev 7bit)"""
+        return self.writeRaw_nb(dev, vByte).result()
+
+    def writeRaw_nb(self, dev, vByte) -> Future:
+        """Non-blocking writeRaw(), returns a future of the reply"""
         vDat = [self.I2C_PACKET_ID,   #I2C packet-ID
                 self.CMD_I2C_ADDRESS, #next byte is the I2C device-address
                 dev,                  #DEV#
                 self.CMD_I2C_LENGTH,  #Next byte is the data length
                 len(vByte),           #Data length
                 self.CMD_I2C_WRITE   #Next bytes should be sent as is to the I2C device
-                ]+vByte                #data-vector
+                ]+list(vByte)          #data-vector
         
-        self.comm.send(vDat)
-        reply = self.comm.receive(1)
-  
-        if self.logger != None:
-            if reply[0] < 0:      #did we received a byte
-                res = reply[1][0]  #if yes, read the result
-                self.logger.debug("I2C-WR: Dev-0x%02x - %s" % (dev, self.ERROR[res]))
-        return reply
+        def parse(reply):
+            if self.logger != None:
+                if reply[0] < 0:      #did we received a byte
+                    res = reply[1][0]  #if yes, read the result
+                    self.logger.debug("I2C-WR: Dev-0x%02x - %s" % (dev, self.ERROR[res]))
+            return reply
+        return self.comm.submit(vDat, 1, parser=parse)
 
     def readRaw(self, dev, N):
         """Read N bytes from device (dev 7bit) and returns a list of bytes"""
+        return self.comm.call(self._readRaw, dev, N)
+
+    def _readRaw(self, dev, N):
         vHdr = [self.I2C_PACKET_ID,         #I2C packet-ID
                 self.CMD_I2C_ADDRESS,       #next byte is the I2C device-address
                 dev,                        #DEV#
@@ -137,28 +149,55 @@ class ArduBridgeI2C():
             self.logger.error(f"I2C-RD: Dev{dev} - Error")
         return -1
 
+    def readRaw_nb(self, dev, N) -> Future:
+        """Non-blocking readRaw(), returns a future of the list of bytes (or -1). Expects all N bytes to be read"""
+        vHdr = [self.I2C_PACKET_ID,         #I2C packet-ID
+                self.CMD_I2C_ADDRESS,       #next byte is the I2C device-address
+                dev,                        #DEV#
+                self.CMD_I2C_LENGTH,        #Next byte is the data length (including the register#)
+                N,                          #Data length
+                self.CMD_I2C_READ]          #Start the read sequence
+
+        def parse(reply):
+            if (reply[0] == self.comm.GOOD) and (reply[1][0] == N): #< The byte count and N bytes
+                val = reply[1][1:]
+                if self.logger != None:
+                    self.logger.debug("I2C-RD: Dev-0x%02x, Dat %s" % (dev, str(val)))
+                return val
+            if self.logger != None:
+                self.logger.error(f"I2C-RD: Dev{dev} - Error")
+            return -1
+        return self.comm.submit(vHdr, 1 +N, parser=parse, reset=False) #< Ignoring reset command values (0x1b)
+
     def writeRegister(self, dev, reg, vByte):
         """Write bytes (vByte) to register (reg) on device (dev 7bit)"""
+        return self.writeRegister_nb(dev, reg, vByte).result()
+
+    def writeRegister_nb(self, dev, reg, vByte) -> Future:
+        """Non-blocking writeRegister(), returns a future of the reply"""
         vDat = [self.I2C_PACKET_ID,   #I2C packet-ID
                 self.CMD_I2C_ADDRESS, #next byte is the I2C device-address
                 dev,                  #DEV#
                 self.CMD_I2C_LENGTH,  #Next byte is the data length (including the register#)
                 len(vByte) +1,        #Data length
                 self.CMD_I2C_WRITE,   #Next bytes should be sent as is to the I2C device
-                reg] +vByte           #REG# +data-vector
+                reg] +list(vByte)     #REG# +data-vector
         
-        self.comm.send(vDat)
-        reply = self.comm.receive(1)
-  
-        if self.logger != None:
-            if reply[0] != 0:      #did we received a byte
-                res = reply[1][0]  #if yes, read the result
-                if self.logger != None:
-                    self.logger.debug('I2C-WR: Dev-0x%02x, Reg%d - %s' % (dev, reg, self.ERROR[res]))
-        return reply
+        def parse(reply):
+            if self.logger != None:
+                if reply[0] != 0:      #did we received a byte
+                    res = reply[1][0]  #if yes, read the result
+                    if self.logger != None:
+                        self.logger.debug('I2C-WR: Dev-0x%02x, Reg%d - %s' % (dev, reg, self.ERROR[res]))
+            return reply
+        return self.comm.submit(vDat, 1, parser=parse)
 
     def readRegister(self, dev, reg, N, delay=0.0):
         """Read N bytes from register (reg) on device (dev 7bit) and returns a list of bytes"""
+        return self.comm.call(self._readRegister, dev, reg, N, delay)
+
+    def _readRegisterCmd(self, dev, reg, N) -> tuple:
+        """Returns the register write and the read command vectors"""
         vHdr = [self.I2C_PACKET_ID,         #I2C packet-ID
                 self.CMD_I2C_ADDRESS,       #next byte is the I2C device-address
                 dev,                        #DEV#
@@ -171,7 +210,10 @@ class ArduBridgeI2C():
                 self.CMD_I2C_LENGTH,        #Next byte is the data length (including the register#)
                 N,                          #N bytes to read
                 self.CMD_I2C_READ]          #Start the read sequence
+        return (vHdr, vRd)
 
+    def _readRegister(self, dev, reg, N, delay=0.0):
+        vHdr, vRd = self._readRegisterCmd(dev, reg, N)
         if delay <= 0.0:
             ### READ WITHOUT DELAY
             self.comm.send(vHdr +vRd)
@@ -204,3 +246,17 @@ class ArduBridgeI2C():
         if self.logger != None:
             self.logger.error(f"I2C-RD: Dev{dev}, Reg{reg} - Error")
         return -1
+
+    def readRegister_nb(self, dev, reg, N) -> Future:
+        """Non-blocking readRegister() (without delay), returns a future of the list of bytes (or -1). Expects all N bytes to be read"""
+        vHdr, vRd = self._readRegisterCmd(dev, reg, N)
+        def parse(reply):
+            if (reply[0] == self.comm.GOOD) and (reply[1][1] == N): #< ACK, the byte count and N bytes
+                val = reply[1][2:]
+                if self.logger != None:
+                    self.logger.debug("I2C-RD: Dev-0x%02x, Reg%d, Dat %s " % (dev, reg, str(val)))
+                return val
+            if self.logger != None:
+                self.logger.error(f"I2C-RD: Dev{dev}, Reg{reg} - Error")
+            return -1
+        return self.comm.submit(vHdr +vRd, 2 +N, parser=parse)
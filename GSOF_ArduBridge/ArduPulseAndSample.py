@@ -24,10 +24,17 @@ byte0 - 'C' for pulse ans sample command
 byte1 - pulsePin number (binary-value)
 byte2 - adcPin number (binary-value)
 byte3 - N samples (binary-value)
+
+pulseAndSampleBatch() runs M acquisitions back to back (pipelined, or in a single write and read)
+and returns the (M, samples) uint8 traces, fitRC() fits the RC time constant of all the traces
+at once (log-linear least squares, requires numpy: pip install GSOF_ArduBridge[numpy]):
+
+traces = ardu.cap.pulseAndSampleBatch(pulsePin=[2, 3, 4], adcPin=0, samples=64)
+fit = ardu.cap.measCap(pulsePin=[2, 3, 4], adcPin=0, dt=1e-4, R=1e6) #< fit['C'][i] in F
 """
 
 """
-The ArduBridgePnS class is used to generate a pulse on pulsePin and sample the adcPin for samples number of samples. The pulseAndSample method of this class sends a command to the Arduino to execute this pulse and sample operation and receives the resulting sample values. The measCap method is not implemented and currently does not do anything.
+The ArduBridgePnS class is used to generate a pulse on pulsePin and sample the adcPin for samples number of samples. The pulseAndSample method of this class sends a command to the Arduino to execute this pulse and sample operation and receives the resulting sample values. The measCap method fits the RC time constant and the capacitance of the charge curves.
 """
 
 __version__ = "1.0.0"
@@ -40,25 +47,110 @@ __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
+import array
+import GSOF_ArduBridge
+from concurrent.futures import Future
+
+def fitRC(traces, dt=1.0, vMax=255, R=None, vFit=0.95) -> dict:
+    """
+    Fit v = vMax*(1 -exp(a -t/tau)) to every row of traces (M, samples) by a linear least squares
+    fit of log(1 -v/vMax), using the samples below vFit*vMax (the flat top has no information).
+    dt - Sample period (sec), R - Charge resistor (Ohm)
+    Returns numpy arrays of M values {'tau' (sec), 'C' (F, None without R), 'a', 'residual' (RMS error of the fitted curve, ADC units)}
+    """
+    np = GSOF_ArduBridge.requireNumpy()
+    v = np.asarray(traces, dtype=np.float64).reshape(len(traces), -1)
+    t = np.arange(v.shape[1])*dt
+    w = v < vFit*vMax #< The fitted samples
+    y = np.log(1.0 -np.minimum(v, vFit*vMax)/vMax)
+    S = w.sum(axis=1)
+    St = (w*t).sum(axis=1)
+    Sy = (w*y).sum(axis=1)
+    Stt = (w*t*t).sum(axis=1)
+    Sty = (w*t*y).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (S*Sty -St*Sy)/(S*Stt -St*St)
+        a = (Sy -slope*St)/S
+        tau = -1.0/slope
+    fitted = vMax*(1.0 -np.exp(a[:, None] +slope[:, None]*t))
+    residual = np.sqrt(np.mean((v -fitted)**2, axis=1))
+    return {'tau':      tau,
+            'C':        tau/R if R != None else None,
+            'a':        a,
+            'residual': residual}
+
 class ArduBridgePnS():
     def __init__(self, bridge=False, logger=None):
         self.logger = logger
         self.comm = bridge
 
     def pulseAndSample(self, pulsePin, adcPin, samples=64):
+        return self.pulseAndSample_nb(pulsePin, adcPin, samples).result()
 
+    def pulseAndSample_nb(self, pulsePin, adcPin, samples=64) -> Future:
+        """Non-blocking pulseAndSample(), returns a future of the samples list (or -1)"""
         vDat = [ord('C'), pulsePin, adcPin, samples]
-        self.comm.send(vDat)
-        reply = self.comm.receive(samples)
 
-        if reply[0] != -1:
-            val = reply[1]
+        def parse(reply):
+            if reply[0] == self.comm.GOOD: #< Not a timeout (ERR_BYTE) or RST, their samples are -1
+                val = reply[1]
+                if self.logger != None:
+                    self.logger.debug(f"AN{adcPin}: {str(val)}")
+                return val
+            if self.logger != None:
+                self.logger.error(f"AN{adcPin}: Error")
+            return -1
+        return self.comm.submit(vDat, samples, parser=parse)
+
+    def pulseAndSampleBatch(self, pulsePin, adcPin, samples=64, M=None, asNumpy=False):
+        """
+        M pulseAndSample acquisitions back to back, pulsePin and adcPin are pin numbers or lists of M pins.
+        Pipelined when the pipelined mode is on, otherwise sent in a single write (one bulk read).
+        Returns the (M, samples) uint8 traces (a 2D memoryview, or a numpy array if asNumpy) or None on error
+        """
+        return self.pulseAndSampleBatch_nb(pulsePin, adcPin, samples, M, asNumpy).result()
+
+    def pulseAndSampleBatch_nb(self, pulsePin, adcPin, samples=64, M=None, asNumpy=False) -> Future:
+        """Non-blocking pulseAndSampleBatch(), returns a future of the traces (or None)"""
+        pulsePins = pulsePin if isinstance(pulsePin, (list, tuple, range)) else None
+        adcPins = adcPin if isinstance(adcPin, (list, tuple, range)) else None
+        if M == None:
+            M = len(pulsePins) if pulsePins != None else len(adcPins) if adcPins != None else 1
+        pairs = [(pulsePins[i] if pulsePins != None else pulsePin,
+                  adcPins[i] if adcPins != None else adcPin) for i in range(M)]
+        if self.comm.pipe != None:
+            futures = [self.pulseAndSample_nb(p, a, samples) for p, a in pairs]
+        else:
+            with self.comm.batch():
+                futures = [self.pulseAndSample_nb(p, a, samples) for p, a in pairs]
+        def parse(vals):
+            traces = array.array('B')
+            for val in vals:
+                if not isinstance(val, list):
+                    return None
+                traces.extend(val)
+            view = memoryview(traces).cast('B', [M, samples])
+            if asNumpy:
+                return GSOF_ArduBridge.requireNumpy().asarray(view)
+            return view
+        return self.comm.gather(futures, parser=parse)
+
+    def measCap(self, pulsePin, adcPin, samples=64, M=None, dt=1.0, R=None, vMax=255):
+        """
+        Pulse and sample the electrodes (see pulseAndSampleBatch) and fit their RC charge curves (see fitRC).
+        Returns the fit {'tau', 'C', 'a', 'residual'} with the traces ('traces') or None on error
+        """
+        return self.measCap_nb(pulsePin, adcPin, samples, M, dt, R, vMax).result()
+
+    def measCap_nb(self, pulsePin, adcPin, samples=64, M=None, dt=1.0, R=None, vMax=255) -> Future:
+        """Non-blocking measCap(), returns a future of the fit (or None)"""
+        def parse(vals):
+            traces = vals[0]
+            if traces == None:
+                return None
+            fit = fitRC(traces, dt=dt, vMax=vMax, R=R)
+            fit['traces'] = traces
             if self.logger != None:
-                self.logger.debug(f"AN{adcPin}: {str(val)}")
-            return val
-        if self.logger != None:
-            self.logger.error(f"AN{adcPin}: Error")
-        return -1
-
-    def measCap(self, pulsePin, adcPin, samples=64):
-        return
+                self.logger.debug(f"measCap: tau {fit['tau']}, residual {fit['residual']}")
+            return fit
+        return self.comm.gather([self.pulseAndSampleBatch_nb(pulsePin, adcPin, samples, M)], parser=parse)
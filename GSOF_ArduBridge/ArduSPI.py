@@ -32,6 +32,9 @@ To write:
 e.g, to write the value 0x14, 0x15 and 0x16 use:
 ['3', 0x14, 0x15, 0x16 0x1b]
 In respond you three bytes will be reveived
+
+When called at the bulk priority class (see BridgeArbiter) write_read() splits long
+transfers into chunks of bridge.bulkChunk bytes (the chip-select is not controlled by the '3' packet).
 """
 
 __version__ = "1.0.0"
@@ -43,6 +46,8 @@ __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
+from concurrent.futures import Future
+
 def csLow(pin) -> int:
     return pin
 
@@ -74,6 +79,10 @@ class ArduBridgeSPI():
 
     def setMode(self, mode, freq, v=False):
         """Set the mode of the SPI bus (MODE0..MODE3)"""
+        return self.setMode_nb(mode, freq, v=v).result()
+
+    def setMode_nb(self, mode, freq, v=False) -> Future:
+        """Non-blocking setMode(), returns a future of self"""
         modeDesc = ("SPI_MODE0:\nClock is normally low (CPOL = 0)\nData is sampled on the transition from low to high (leading edge) (CPHA = 0)",
                     "SPI_MODE1:\nClock is normally low (CPOL = 0)\nData is sampled on the transition from high to low (trailing edge) (CPHA = 1)",
                     "SPI_MODE2:\nClock is normally high (CPOL = 1)\nData is sampled on the transition from high to low (leading edge) (CPHA = 0)",
@@ -82,43 +91,57 @@ class ArduBridgeSPI():
         freqL = freq&0xff
         freqH = (freq>>8)&0xff
         vDat = [self.SPI_CFG_PACKET_ID, mode, freqL, freqH]
-        self.comm.send(vDat)
-        reply = self.comm.receive(1) #Read the received bytes
-        if reply[0] > 0:       #< Did we received a byte
-            res = reply[1][0]  #< If yes, read the result
-            if v:
-                if mode < self.OFF:
-                    self.logger.info(modeDesc[mode])
-                else:
-                    self.logger.info("SPI-OFF")
-            self.mode = mode
-        else:
-            self.logger.error("Error setting the SPI mode\n")
-        return self
+
+        def parse(reply):
+            if reply[0] > 0:       #< Did we received a byte
+                res = reply[1][0]  #< If yes, read the result
+                if v:
+                    if mode < self.OFF:
+                        self.logger.info(modeDesc[mode])
+                    else:
+                        self.logger.info("SPI-OFF")
+                self.mode = mode
+            else:
+                self.logger.error("Error setting the SPI mode\n")
+            return self
+        return self.comm.submit(vDat, 1, parser=parse) #Read the received bytes
 
     def write_read(self, vByte):
         """Send and receive list of bytes (vByte) on the SPI bus. Returns a list of bytes"""
-        vDat = [self.SPI_PACKET_ID]+ vByte #SPI packet-ID +data-vector
-        self.comm.send(vDat)
-        self.comm.sendReset()         #End the SPI mode
-        reply = self.comm.receive(len(vByte)) #Read the received bytes
-  
-        if self.logger != None:
-            if reply[0] != 0:      #< Did we received a byte
-                res = reply[1][0]  #< If yes, read the result
-                self.logger.debug(f"SPI-Res: {res}")
-        return reply
+        chunk = self.comm.bulkChunk
+        if (len(vByte) > chunk) and (self.comm.getPriority() == self.comm.PRIO_BULK):
+            #Split the bulk transfer so higher priority transactions can be served between the chunks
+            status = self.comm.GOOD
+            vRes = []
+            for i in range(0, len(vByte), chunk):
+                reply = self.write_read(vByte[i:i+chunk])
+                if reply[0] != self.comm.GOOD:
+                    status = reply[0]
+                vRes += reply[1]
+            return (status, vRes)
+
+        return self.write_read_nb(vByte).result()
+
+    def write_read_nb(self, vByte) -> Future:
+        """Non-blocking write_read() of a single transfer, returns a future of the reply"""
+        vDat = [self.SPI_PACKET_ID]+ list(vByte) #SPI packet-ID +data-vector
+
+        def parse(reply):
+            if self.logger != None:
+                if reply[0] != 0:      #< Did we received a byte
+                    res = reply[1][0]  #< If yes, read the result
+                    self.logger.debug(f"SPI-Res: {res}")
+            return reply
+        return self.comm.submit(vDat, len(vByte), parser=parse, trailReset=True) #End the SPI mode and read the received bytes
 
     def cs_config(self, cs1, cs2, N):
         """"""
-        self.comm.send( [self.SPI_CS_CFG_PACKET_ID, cs1&0xff, cs2&0xff, N] )
+        self.comm.transact( [self.SPI_CS_CFG_PACKET_ID, cs1&0xff, cs2&0xff, N], 0 )
         return self
 
     def write_read_cs(self, vByte):
         """Send and receive list of bytes (vByte) on the SPI bus. Returns a list of bytes"""
-        self.comm.send( [self.SPI_CS_PACKET_ID]+ vByte )
-
-        reply = self.comm.receive(len(vByte)) #Read the received bytes
+        reply = self.comm.transact( [self.SPI_CS_PACKET_ID]+ vByte, len(vByte) ) #Read the received bytes
   
         if self.logger != None:
             if reply[0] != 0:      #< Did we received a byte
@@ -128,6 +151,9 @@ class ArduBridgeSPI():
 
     def config_write_read_cs(self, cs1, cs2, N, vByte):
         """Send and receive list of bytes (vByte) on the SPI bus. Returns a list of bytes"""
+        return self.comm.call(self._config_write_read_cs, cs1, cs2, N, vByte)
+
+    def _config_write_read_cs(self, cs1, cs2, N, vByte):
         if ( N != None ):
             self.cs_config(cs1, cs2, N)
         if ( vByte != None ):
@@ -189,6 +189,15 @@ class ArduBridge_Shield():
         C = (volt -0.5)/0.01
         return C
 
+    def acquisition(self, rate=1000.0, history=10000, chCurrent=3, chTemp=0, logger=None):
+        """
+        Returns a (not started) BridgeAcquisition.AnalogAcquisition of the chip current and the temperature.
+        The samples are binary (column 0 the current, column 1 the temperature), convert with
+        value*lsb/10000 (A) and _TC1047(value) (C)
+        """
+        from GSOF_ArduBridge import BridgeAcquisition
+        return BridgeAcquisition.AnalogAcquisition(self.ardu.an, [chCurrent, chTemp], rate=rate, history=history, logger=logger)
+
 ##    def setOsci(self, freq, dev=23):
 ##        freq = float(freq)
 ##        OCT = int(3.322*math.log10(freq/1039))
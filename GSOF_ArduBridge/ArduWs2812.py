@@ -32,7 +32,7 @@ class ArduBridgeWs2812():
     def setConfig(self, pin, leds=0, red=0, green=0, blue=0):
         """Set the mode pin# to communicate with the WS2812 IC and RGB value of first N LEDS"""
         vDat = (ord('W'), pin, leds&0xff, (leds>>8)&0xff, red&0xff, green&0xff, blue&0xff)
-        self.comm.send(vDat)
+        self.comm.transact(vDat, 0)
         return 1
 
     def ledWrite(self, vRGB):
@@ -44,5 +44,5 @@ class ArduBridgeWs2812():
             b = int(rgb[2]*3/255)&0x3
             vLED[i] = (r<<5) +(g<<2) +b
         vDat = [ord('w')] +vLED
-        self.comm.send(vDat)
+        self.comm.transact(vDat, 0)
         return 1
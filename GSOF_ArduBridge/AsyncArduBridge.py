@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+asyncio front-end of the ArduBridge.
+AsyncArduBridgeComm drives the non-blocking file descriptor of the serial port with
+loop.add_reader() (POSIX event loops), so no thread is blocked in serial.read().
+Its submit() returns an asyncio future, so the non-blocking (_nb) methods of the bus
+classes (ArduBridgeGPIO, ArduBridgeAn, ArduBridgeI2C, ArduBridgeSPI, ArduBridgePnS)
+are awaitable. Up to "window" commands are in flight, the replies are decoded
+incrementally as they arrive and matched to the commands in FIFO order.
+
+AsyncArduBridge exposes the bus classes with awaitable methods, e.g:
+
+async def main():
+    async with AsyncArduBridge(COM='/dev/ttyUSB0') as ardu:
+        await ardu.gpio.digitalWrite(13, 1)
+        val = await ardu.an.analogRead(0)
+        vDat = await ardu.i2c.readRegister(0x50, 0, 2)
+        reply = await ardu.spi.write_read([1, 2, 3])
+
+Many coroutines can share the board, their commands are sent in the order they were awaited.
+The bulk methods (gpio.setPins, an.analogReadOversampled, cap.measCap, ...) are awaitable too,
+their commands are pipelined. i2c.readRegister with a delay awaits the register write, sleeps
+and then sends the read.
+The output-state shadow (setShadow, see BridgeShadow) skips the unchanged GPIO/PWM/servo writes.
+The methods without an awaitable variant (e.g. servoScurve, waveform, spi.write_read_cs)
+are not available, they raise AttributeError.
+open() polls the ID of the board until it is up (the board may reset when the port is opened).
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import os, asyncio, collections, contextlib, logging
+import serial
+from GSOF_ArduBridge import BridgeCodec
+from GSOF_ArduBridge import BridgeTimeout
+from GSOF_ArduBridge import BridgeArbiter
+from GSOF_ArduBridge import BridgeShadow
+from GSOF_ArduBridge.BridgePipeline import complete
+from GSOF_ArduBridge import ArduAnalog
+from GSOF_ArduBridge import ArduGPIO
+from GSOF_ArduBridge import ArduI2C
+from GSOF_ArduBridge import ArduSPI
+from GSOF_ArduBridge import ArduPulseAndSample as CAP
+
+class AsyncArduBridgeComm(BridgeShadow.OutputShadow):
+    RST  = 0x1b #< Reset symbol
+    ESC  = 0x5c #< Escape symbol
+
+    GOOD     = 1
+    ERR_BYTE = 0
+    ERR_LINK = -1
+    ERR_RST  = -2
+
+    PRIO_RT     = BridgeArbiter.PRIO_RT
+    PRIO_NORMAL = BridgeArbiter.PRIO_NORMAL
+    PRIO_BULK   = BridgeArbiter.PRIO_BULK
+
+    def __init__(self, COM, baud=115200*2, window=4, RxTimeOut=0.015, logger=None):
+        self.COM = COM
+        self.baud = baud
+        self.window = window          #< Commands in flight
+        self.logger = logger
+        self.LINK = False
+        self.bulkChunk = 64
+        self.rtt = BridgeTimeout.RttEstimator(rtoMin=RxTimeOut, rtoMax=RxTimeOut*25)
+        self.ser = None
+        self.fd = -1
+        self.loop = None
+        self.txQueue = collections.deque()  #< (frame, future, N, parser, reset, op) waiting for a place in the window
+        self.inFlight = collections.deque() #< (future, N, parser, reset, op, tSend) in the order sent
+        self.rx = bytearray()         #< Received bytes that were not decoded yet
+        self.tx = bytearray()         #< Bytes that were not written yet
+        self.tRx = 0.0                #< End of the previous reply
+        self.timer = None             #< Receive timeout of the first command in flight
+        self.hold = None              #< Resync timer, no command is sent while the stale bytes are drained
+        self.rxOwed = 0               #< Reply bytes of failed commands that may still arrive
+        self.shadow = None            #< Output-state shadow (see BridgeShadow)
+        self.pipe = None              #< Not the pipelined mode of ArduBridgeComm, the commands are always pipelined
+
+    async def open(self) -> bool:
+        """Open the serial port and start reading it on the running event loop"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.ser = serial.Serial(self.COM, self.baud, timeout=0, write_timeout=0)
+        except serial.SerialException:
+            if self.logger != None:
+                self.logger.warning('Error - Cannot open %s\n'%(self.COM))
+            return False
+        self.ser.reset_input_buffer()
+        self.invalidateShadow() #< The board may have been reset
+        self.fd = self.ser.fileno()
+        self.loop.add_reader(self.fd, self._onRead)
+        self.LINK = True
+        if self.logger != None:
+            self.logger.info('ArduBridge COM is open')
+        return True
+
+    async def close(self) -> None:
+        """Complete the commands with ERR_LINK and close the serial port"""
+        self._linkDown()
+        if self.ser != None:
+            self.ser.close()
+            if self.logger != None:
+                self.logger.critical('ArduBridge COM is closed')
+
+    def getPriority(self) -> int:
+        return self.PRIO_NORMAL
+
+    def getRttStats(self) -> dict:
+        """Returns the smoothed round-trip time, its variance and the receive timeout (sec) of every command class"""
+        return self.rtt.get()
+
+    def _future(self) -> asyncio.Future:
+        if self.loop == None:
+            self.loop = asyncio.get_event_loop()
+        return self.loop.create_future()
+
+    def submit(self, vDat, N, parser=None, reset=True, trailReset=False) -> asyncio.Future:
+        """
+        Send a command with a reply of N bytes (None for a reply that starts with its length),
+        returns an asyncio future of parser((status, data)).
+        """
+        fut = self._future()
+        if not self.LINK:
+            return complete(fut, (self.ERR_LINK, []), parser)
+        frame = BridgeCodec.escape(vDat, reset=reset)
+        if trailReset:
+            frame += bytes([self.RST])
+        self.txQueue.append( (frame, fut, N, parser, reset, vDat[0]) )
+        self._pump()
+        return fut
+
+    def done(self, reply, parser=None) -> asyncio.Future:
+        """Returns a completed future of parser(reply), for commands that are not sent"""
+        return complete(self._future(), reply, parser)
+
+    def gather(self, futures, parser=None) -> asyncio.Future:
+        """Returns a future of parser([result of every future]), done when all the futures are done"""
+        fut = self._future()
+        if len(futures) == 0:
+            return complete(fut, [], parser)
+        def done(res):
+            if res.cancelled():
+                fut.cancel()
+            elif res.exception() != None:
+                fut.set_exception(res.exception())
+            else:
+                complete(fut, res.result(), parser)
+        asyncio.gather(*futures).add_done_callback(done)
+        return fut
+
+    def batch(self):
+        """The commands are always pipelined, a batch has no effect (see ArduBridgeComm.batch)"""
+        return contextlib.nullcontext()
+
+    def _pump(self) -> None:
+        """Send the queued commands while there is a place in the window"""
+        while (len(self.txQueue) > 0) and (len(self.inFlight) < self.window) and (self.hold == None) and self.LINK:
+            frame, fut, N, parser, reset, op = self.txQueue.popleft()
+            self._write(frame)
+            if N == 0:
+                complete(fut, (self.GOOD, []), parser)
+                continue
+            self.inFlight.append( (fut, N, parser, reset, op, self.loop.time()) )
+            if len(self.inFlight) == 1:
+                self._arm()
+
+    def _arm(self) -> None:
+        """Start the receive timeout of the first command in flight"""
+        fut, N, parser, reset, op, tSend = self.inFlight[0]
+        if N == None:
+            N = 256 #< The longest reply with a length byte
+        timeout = self.rtt.rto(op) +N*10.0/self.baud
+        self.timer = self.loop.call_at(max(tSend, self.tRx) +timeout, self._onTimeout)
+
+    def _write(self, dat) -> None:
+        if len(self.tx) > 0:
+            self.tx += dat
+            return
+        try:
+            n = os.write(self.fd, dat)
+        except BlockingIOError:
+            n = 0
+        except OSError:
+            self._linkDown()
+            return
+        if n < len(dat):
+            self.tx += dat[n:]
+            self.loop.add_writer(self.fd, self._onWrite)
+
+    def _onWrite(self) -> None:
+        try:
+            n = os.write(self.fd, self.tx)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._linkDown()
+            return
+        del self.tx[:n]
+        if len(self.tx) == 0:
+            self.loop.remove_writer(self.fd)
+
+    def _onRead(self) -> None:
+        try:
+            dat = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            self._linkDown()
+            return
+        if self.rxOwed > 0:
+            #Stale bytes of failed commands, nothing else is in flight
+            self.rxOwed -= len(dat) -dat.count(self.ESC) #< Every escape sequence is a single reply byte
+            if self.rxOwed <= 0:
+                self._resyncDone()
+            return
+        if len(self.inFlight) == 0:
+            return #< Unexpected bytes
+        self.rx += dat
+        self._decode()
+
+    def _decodeReply(self, N, reset) -> tuple:
+        """Returns (status, data, used) of the reply at the start of the RX buffer"""
+        if N != None:
+            return BridgeCodec.decode(self.rx, N, reset=reset)
+        status, cnt, used = BridgeCodec.decode(self.rx, 1, reset=reset)
+        if status != BridgeCodec.GOOD:
+            return (status, cnt, used)
+        status, dat, n = BridgeCodec.decode(self.rx[used:], cnt[0], reset=reset)
+        if status == BridgeCodec.PENDING:
+            return (status, cnt +dat, 0)
+        return (status, cnt +dat, used +n)
+
+    def _decode(self) -> None:
+        while (len(self.inFlight) > 0) and (len(self.rx) > 0):
+            fut, N, parser, reset, op, tSend = self.inFlight[0]
+            status, dat, used = self._decodeReply(N, reset)
+            if status == BridgeCodec.PENDING:
+                break
+            del self.rx[:used]
+            self.inFlight.popleft()
+            self.timer.cancel()
+            self.timer = None
+            if status == BridgeCodec.GOOD:
+                now = self.loop.time()
+                self.rtt.sample(op, now -max(tSend, self.tRx))
+                self.tRx = now
+                if len(self.inFlight) > 0:
+                    self._arm()
+                complete(fut, (self.GOOD, list(dat)), parser)
+            else:
+                self._lostSync(fut, N, parser, self.ERR_RST, dat)
+        self._pump()
+
+    def _onTimeout(self) -> None:
+        self.timer = None
+        fut, N, parser, reset, op, tSend = self.inFlight.popleft()
+        dat = self._decodeReply(N, reset)[1]
+        self.rtt.backoff(op)
+        if self.logger != None:
+            self.logger.warning('Error - %s RX timeout'%(self.COM))
+        self._lostSync(fut, N, parser, self.ERR_BYTE, dat)
+        self._pump()
+
+    def _lostSync(self, fut, N, parser, status, dat) -> None:
+        """Complete the failed command and the commands in flight, and drain their late replies"""
+        if N == None:
+            N = len(dat)
+        failed = [(fut, N, parser)]
+        owed = N -len(dat)
+        while len(self.inFlight) > 0:
+            f, n, p = self.inFlight.popleft()[:3]
+            if n == None:
+                n = 1
+            failed.append( (f, n, p) )
+            owed += n
+        self.rx.clear()
+        if owed > 0:
+            self.rxOwed = owed
+            self.hold = self.loop.call_later(self.rtt.rtoMax, self._resyncDone)
+        complete(fut, (status, list(dat) +[-1]*(N -len(dat))), parser)
+        for f, n, p in failed[1:]:
+            complete(f, (self.ERR_BYTE, [-1]*n), p)
+
+    def _resyncDone(self) -> None:
+        if self.hold != None:
+            self.hold.cancel()
+            self.hold = None
+        self.rxOwed = 0
+        self._pump()
+
+    def _linkDown(self) -> None:
+        """Complete all the commands with ERR_LINK"""
+        if not self.LINK:
+            return
+        self.LINK = False
+        self.loop.remove_reader(self.fd)
+        if len(self.tx) > 0:
+            self.loop.remove_writer(self.fd)
+            self.tx.clear()
+        for handle in (self.timer, self.hold):
+            if handle != None:
+                handle.cancel()
+        self.timer = None
+        self.hold = None
+        self.rxOwed = 0
+        pending = [(fut, N, parser) for fut, N, parser, reset, op, tSend in self.inFlight]
+        pending += [(fut, N, parser) for frame, fut, N, parser, reset, op in self.txQueue]
+        self.inFlight.clear()
+        self.txQueue.clear()
+        for fut, N, parser in pending:
+            complete(fut, (self.ERR_LINK, []), parser)
+
+class AsyncBus():
+    """
+    The bus class with awaitable methods, method() is mapped to its non-blocking method_nb().
+    The other public methods of the bus are not available, except the local ones (that do not use the link).
+    """
+    LOCAL = ('getShadowStats', 'setOversampling')
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def __getattr__(self, name):
+        nb = getattr(self.bus, name +'_nb', None)
+        if nb != None:
+            return nb
+        attr = getattr(self.bus, name)
+        if callable(attr) and (not name.startswith('_')) and (not name.endswith('_nb')) and (name not in self.LOCAL):
+            raise AttributeError('%s.%s() has no awaitable variant, it is not available on AsyncArduBridge'%(type(self.bus).__name__, name))
+        return attr
+
+class AsyncI2C(AsyncBus):
+    async def readRegister(self, dev, reg, N, delay=0.0):
+        """Read N bytes from register (reg) on device (dev 7bit), returns a list of bytes (or -1)"""
+        bus = self.bus
+        if delay <= 0.0:
+            return await bus.readRegister_nb(dev, reg, N)
+        vHdr, vRd = bus._readRegisterCmd(dev, reg, N)
+        reply = await bus.comm.submit(vHdr, 1)   #< ACK for the register (command) write
+        if reply[0] == bus.comm.GOOD:
+            await asyncio.sleep(delay)           #< DELAY BETWEEN WRITE COMMAND AND READ SEQUENCE
+            reply = await bus.comm.submit(vRd, None, reset=False) #< The number of bytes that were read and the bytes
+            if (reply[0] == bus.comm.GOOD) and (reply[1][0] == N):
+                val = reply[1][1:]
+                if bus.logger != None:
+                    bus.logger.debug("I2C-RD: Dev-0x%02x, Reg%d, Dat %s " % (dev, reg, str(val)))
+                return val
+        if bus.logger != None:
+            bus.logger.error(f"I2C-RD: Dev{dev}, Reg{reg} - Error")
+        return -1
+
+class AsyncArduBridge():
+    def __init__(self, COM, baud=115200*2, window=4, logger=None, logLevel=logging.INFO, RxTimeOut=0.015, shadow=False):
+        self.logger = logger
+        if self.logger == None:
+            self.logger = logging.getLogger('GSOF_ArduBridge')
+            self.logger.setLevel(logLevel)
+        self.COM = COM
+        self.comm = AsyncArduBridgeComm(COM=COM, baud=baud, window=window, RxTimeOut=RxTimeOut, logger=self.logger)
+        self.comm.setShadow(shadow)
+        self.gpio = AsyncBus( ArduGPIO.ArduBridgeGPIO( bridge=self.comm, logger=self.logger ) )
+        self.an   = AsyncBus( ArduAnalog.ArduBridgeAn( bridge=self.comm, logger=self.logger ) )
+        self.i2c  = AsyncI2C( ArduI2C.ArduBridgeI2C( bridge=self.comm, logger=self.logger ) )
+        self.spi  = AsyncBus( ArduSPI.ArduBridgeSPI( bridge=self.comm, logger=self.logger ) )
+        self.cap  = AsyncBus( CAP.ArduBridgePnS( bridge=self.comm, logger=self.logger ) )
+
+    async def open(self, retry=6):
+        """
+        Open the port, returns the ID of the board or False.
+        The ID of the board is polled for up to retry*0.5 sec (the board may reset when the port is opened).
+        """
+        if await self.comm.open():
+            deadline = self.comm.loop.time() +retry*0.5
+            ID = await self.GetID()
+            while (ID == False) and self.comm.LINK and (self.comm.loop.time() < deadline):
+                self.logger.debug(f"Open port retry# {retry}")
+                ID = await self.GetID()
+            if ID == False:
+                self.logger.critical(f"Failed to connect to arduBridge on device {self.COM}")
+            return ID
+        return False
+
+    async def close(self) -> None:
+        await self.comm.close()
+
+    def GetID(self) -> asyncio.Future:
+        """Returns a future of the ID of the board (or False)"""
+        def parse(reply):
+            if reply[0] == self.comm.GOOD:
+                return ''.join([chr(c) for c in reply[1][1:]]) +'\n'
+            return False
+        return self.comm.submit([ord('?')], None, parser=parse)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Multi-channel analog acquisition engine.
+The analog pins are scanned at the target rate (against the monotonic clock) by a background
+thread. In the pipelined mode of the bridge (ArduBridgeComm.startPipeline) up to depth scans
+are in flight, otherwise every scan is a write-coalescing batch (one write and one read).
+The 16 bit samples and their timestamps are stored in a preallocated RingBuffer (array('H')),
+no Python list is built per sample:
+
+acq = BridgeAcquisition.AnalogAcquisition(ardu.an, pins=[3, 0], rate=1000.0)
+acq.start()
+t, v = acq.latest(100)                      #< memoryviews, v holds 100 scans of 2 samples
+for t, v in acq.stream(duration=10.0):      #< The new scans as they arrive
+    log.write(v)
+acq.stop()
+
+latest(n, asNumpy=True) returns zero-copy numpy arrays, the values with the shape (n, pins).
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import time, threading, collections
+import GSOF_ArduBridge
+from GSOF_ArduBridge import RingBuffer
+from GSOF_ArduBridge import Sleep_us
+
+class AnalogAcquisition(threading.Thread):
+    def __init__(self, an, pins, rate=1000.0, history=10000, depth=4, logger=None):
+        """
+        an - ArduBridgeAn object, pins - The analog pins of every scan
+        rate - Target scan rate (Hz), history - Number of scans kept in the ring buffer
+        depth - Maximal number of scans in flight in the pipelined mode
+        """
+        threading.Thread.__init__(self)
+        self.name = 'ArduBridgeAcquisition'
+        self.daemon = True
+        self.an = an
+        self.comm = an.comm
+        self.pins = list(pins)
+        self.rate = rate
+        self.depth = depth
+        self.logger = logger
+        self.ring = RingBuffer.RingBuffer(history, typecode='H', width=len(self.pins))
+        self.cond = threading.Condition()
+        self._quit = threading.Event()
+        self.scans = 0
+        self.errors = 0   #< Scans with a failed read (dropped)
+        self.overruns = 0 #< Scans that started a full period late
+        self.tStart = 0.0
+
+    def stop(self) -> None:
+        """Stop the acquisition (after the scans in flight were received)"""
+        self._quit.set()
+        if threading.current_thread() != self:
+            self.join()
+
+    def getStats(self) -> dict:
+        """Returns the target and the achieved scan rate (Hz), the number of scans, failed scans and overruns"""
+        dt = time.perf_counter() -self.tStart
+        return {'rate':     self.rate,
+                'achieved': self.scans/dt if (self.tStart > 0) and (dt > 0) else 0.0,
+                'scans':    self.scans,
+                'errors':   self.errors,
+                'overruns': self.overruns}
+
+    def latest(self, n=None, asNumpy=False) -> tuple:
+        """Returns (timestamps, values) of the last n scans, memoryviews (or numpy arrays) of the ring buffer"""
+        t, v = self.ring.latest(n)
+        if asNumpy:
+            np = GSOF_ArduBridge.requireNumpy()
+            return (np.frombuffer(t, dtype=np.float64), np.frombuffer(v, dtype=np.uint16).reshape(-1, len(self.pins)))
+        return (t, v)
+
+    def stream(self, duration=None, timeout=1.0):
+        """
+        Generator of (timestamps, values) memoryviews of the new scans since the previous one,
+        ends after duration sec (if given), when the acquisition stops or when no scan arrived for timeout sec.
+        Scans that were overwritten before they were consumed are skipped.
+        Raises RuntimeError if the acquisition was not started.
+        """
+        if self.ident == None:
+            raise RuntimeError('The acquisition was not started, call start() before stream()')
+        return self._stream(duration, timeout)
+
+    def _stream(self, duration, timeout):
+        seq = self.ring.count
+        tEnd = None if duration == None else time.perf_counter() +duration
+        while (tEnd == None) or (time.perf_counter() < tEnd):
+            with self.cond:
+                if self.ring.count == seq:
+                    if not self.is_alive():
+                        return
+                    self.cond.wait(timeout)
+                if self.ring.count == seq:
+                    return
+            t, v, seq = self.ring.since(seq)
+            yield (t, v)
+
+    def _scan(self) -> list:
+        """Submit the reads of one scan, returns their futures"""
+        if self.comm.pipe != None:
+            return [self.an.analogRead_nb(pin) for pin in self.pins]
+        with self.comm.batch():
+            futures = [self.an.analogRead_nb(pin) for pin in self.pins]
+        return futures
+
+    def _store(self, t, futures) -> None:
+        try:
+            values = [fut.result() for fut in futures]
+        except Exception as e:
+            values = [-1]
+            if self.logger != None:
+                self.logger.error('Acquisition: %r'%(e))
+        if min(values) < 0:
+            self.errors += 1
+            return
+        self.ring.append(values, t)
+        self.scans += 1
+        with self.cond:
+            self.cond.notify_all()
+
+    def run(self) -> None:
+        period = 1.0/self.rate
+        inFlight = collections.deque() #< (time, futures) of the submitted scans
+        self.tStart = time.perf_counter()
+        tNext = self.tStart
+        while not self._quit.is_set():
+            t = time.perf_counter()
+            try:
+                inFlight.append( (t, self._scan()) )
+            except Exception as e:
+                self.errors += 1
+                if self.logger != None:
+                    self.logger.error('Acquisition: %r'%(e))
+            while (len(inFlight) > 0) and ((len(inFlight) >= self.depth) or inFlight[0][1][-1].done()):
+                self._store(*inFlight.popleft())
+
+            tNext += period
+            now = time.perf_counter()
+            if now > tNext +period:
+                self.overruns += 1
+                tNext = now #< Do not try to catch up
+            Sleep_us.sleepUntil(tNext, spin=0.0)
+        while len(inFlight) > 0:
+            self._store(*inFlight.popleft())
+        with self.cond:
+            self.cond.notify_all()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Transaction level priority arbitration of the bridge.
+Every thread has a priority class (PRIO_RT, PRIO_NORMAL or PRIO_BULK) that is used
+when its transactions compete for the serial link:
+- PriorityLock is the reentrant transaction lock of ArduBridgeComm. When released,
+  it is granted to the waiting thread with the highest priority class.
+- The I/O worker queue (BridgeWorker) serves the requests by priority class.
+Each transaction is one chunk, so a real-time request waits at most for the
+transaction that is currently on the link. Long bulk transfers are split by the
+drivers (e.g. ArduBridgeSPI.write_read) into chunks of ArduBridgeComm.bulkChunk bytes.
+WaitStats accumulates the wait time of every priority class.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import threading, time
+
+PRIO_RT     = 0 #< Control loops
+PRIO_NORMAL = 1 #< Default
+PRIO_BULK   = 2 #< Display and frame pushes
+PRIO_NAME = ('RT', 'NORMAL', 'BULK')
+
+class WaitStats():
+    """Number of transactions, average and worst-case wait time per priority class"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.n = [0]*len(PRIO_NAME)
+            self.tSum = [0.0]*len(PRIO_NAME)
+            self.tMax = [0.0]*len(PRIO_NAME)
+
+    def record(self, prio, dt) -> None:
+        with self.lock:
+            self.n[prio] += 1
+            self.tSum[prio] += dt
+            if dt > self.tMax[prio]:
+                self.tMax[prio] = dt
+
+    def get(self) -> dict:
+        """Returns {class-name: {'n', 'tWaitAvg', 'tWaitMax'}} (sec)"""
+        with self.lock:
+            res = {}
+            for prio, name in enumerate(PRIO_NAME):
+                res[name] = {'n':        self.n[prio],
+                             'tWaitAvg': self.tSum[prio]/max(self.n[prio], 1),
+                             'tWaitMax': self.tMax[prio]}
+            return res
+
+class PriorityLock():
+    """Reentrant lock that is granted to the waiting thread with the highest priority class"""
+    def __init__(self, getPriority, stats=None):
+        self.getPriority = getPriority #< Returns the priority class of the calling thread
+        self.stats = stats
+        self.cond = threading.Condition(threading.Lock())
+        self.owner = None
+        self.count = 0
+        self.waiting = [0]*len(PRIO_NAME)
+
+    def _blocked(self, prio) -> bool:
+        if self.owner != None:
+            return True
+        for p in range(prio):
+            if self.waiting[p] > 0:
+                return True
+        return False
+
+    def acquire(self, record=True) -> bool:
+        me = threading.get_ident()
+        with self.cond:
+            if self.owner == me:
+                self.count += 1
+                return True
+            prio = self.getPriority()
+            t0 = time.perf_counter()
+            if self._blocked(prio):
+                self.waiting[prio] += 1
+                while self._blocked(prio):
+                    self.cond.wait()
+                self.waiting[prio] -= 1
+            self.owner = me
+            self.count = 1
+        if record and (self.stats != None):
+            self.stats.record(prio, time.perf_counter() -t0)
+        return True
+
+    def release(self) -> None:
+        with self.cond:
+            if self.owner != threading.get_ident():
+                raise RuntimeError("Cannot release un-acquired lock")
+            self.count -= 1
+            if self.count == 0:
+                self.owner = None
+                self.cond.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Write-coalescing batch of the ArduBridgeComm object.
+Inside the batch context the commands of the calling thread are collected instead of
+being sent. When the context ends, all the frames are sent in a single write and
+their replies are received in a single bulk read:
+
+with ardu.batch() as batch:
+    pca.setOnOffTicks(0, 0, 2048)
+    ardu.gpio.digitalWrite(13, 1)
+print(batch.status(), batch.ok())
+
+Commands that are only acknowledged (pinMode, digitalWrite, analogWrite, servoWrite,
+I2C writes and commands without a reply) return at once with a GOOD placeholder,
+the real status of every command is reported by the batch object afterwards.
+Their futures stay pending until the batch is sent, the parser of the command
+(logging, output-state shadow) runs once, on the real reply.
+Requesting the result of any other command (e.g. digitalRead) sends the batch
+up to that command. Multi stage transactions (e.g. readRegister) also send the
+batch before they are executed, so the order of the commands is kept.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+from concurrent.futures import Future
+from GSOF_ArduBridge import BridgePipeline
+
+ACK_CMD = (ord('D'), ord('O'), ord('P'), ord('S')) #< Commands with a single acknowledge byte
+I2C_PACKET_ID = ord('2')
+I2C_WRITE = (ord('W'), ord('w'))
+I2C_ERROR_NONE = ord('N')
+
+def ackReply(vDat, N):
+    """Returns the expected reply of an acknowledge only command, or None for commands that return data"""
+    if N == 0:
+        return (1, [])
+    if N == 1:
+        if vDat[0] in ACK_CMD:
+            return (1, [1])
+        if (vDat[0] == I2C_PACKET_ID) and (len(vDat) > 5) and (vDat[5] in I2C_WRITE):
+            return (1, [I2C_ERROR_NONE])
+    return None
+
+def ackResult(vDat, reply, parser=None):
+    """
+    Returns the placeholder result of an acknowledge only command (without running its parser):
+    the status for the parsed GPIO, PWM and servo writes, the expected reply for the other commands
+    """
+    if (parser != None) and (vDat[0] in ACK_CMD):
+        return reply[0]
+    return reply
+
+class BatchFuture(Future):
+    """
+    Future of a command in a batch. Its result() sends the batch if the command is still waiting in it,
+    except for an acknowledge only command, its placeholder result (ack) is returned until the batch is sent.
+    """
+    def __init__(self, batch, ack=None):
+        Future.__init__(self)
+        self.batch = batch
+        self.ack = ack
+
+    def result(self, timeout=None):
+        if not self.done():
+            if self.ack != None:
+                return self.ack
+            self.batch.flush()
+        return Future.result(self, timeout)
+
+class ArduBridgeBatch():
+    def __init__(self, comm):
+        self.comm = comm
+        self.queue = []   #< (vDat, N, parser, reset, trailReset, future) waiting to be sent
+        self.replies = [] #< (status, data) of every sent command in the order they were added
+
+    def add(self, vDat, N, parser=None, reset=True, trailReset=False) -> Future:
+        """Add a command to the batch, returns a future of parser((status, data))"""
+        reply = ackReply(vDat, N)
+        fut = BatchFuture(self, ack=(ackResult(vDat, reply, parser) if reply != None else None))
+        self.queue.append( (vDat, N, parser, reset, trailReset, fut) )
+        return fut
+
+    def flush(self) -> None:
+        """Send the waiting commands in a single write and receive their replies"""
+        queue = self.queue
+        self.queue = []
+        if len(queue) == 0:
+            return
+        vCmd = [(vDat, N, reset, trailReset) for vDat, N, parser, reset, trailReset, fut in queue]
+        replies = self.comm.call(self.comm._transactMany, vCmd)
+        self.replies += replies
+        for reply, (vDat, N, parser, reset, trailReset, fut) in zip(replies, queue):
+            BridgePipeline.complete(fut, reply, parser)
+
+    def status(self) -> list:
+        """Returns the status (GOOD, ERR_BYTE, ...) of every sent command"""
+        return [reply[0] for reply in self.replies]
+
+    def ok(self) -> bool:
+        """Returns True if all the sent commands were acknowledged"""
+        for reply in self.replies:
+            if reply[0] != self.comm.GOOD:
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.replies) +len(self.queue)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Transport benchmark of the ArduBridge.
+Measures the round-trip latency percentiles and the sustained commands/sec of
+GetID, digitalWrite, analogRead, readRegister, write_read and pulseAndSample,
+and the bytes/sec on the link versus the theoretical limit of the baud-rate.
+It runs on any ArduBridge object (a real board or the emulator) and the results
+can be saved as JSON to compare releases and catch regressions.
+
+From the command line:
+python -m GSOF_ArduBridge.BridgeBenchmark --port emulator --json bench.json
+python -m GSOF_ArduBridge.BridgeBenchmark --port /dev/ttyUSB0
+
+The recorded commands of a wire trace (see BridgeTrace) are replayed instead of the tests with:
+python -m GSOF_ArduBridge.BridgeBenchmark --port /dev/ttyUSB0 --replay run.trace
+
+The effective resolution versus the latency of the oversampled analog read is measured with:
+python -m GSOF_ArduBridge.BridgeBenchmark --port /dev/ttyUSB0 --oversampling 0
+
+The import time of the facade is checked against a budget (IMPORT_BUDGET ms by default,
+exit status 1 if exceeded) with the command below. The budget is the time of the package modules
+('own'), the standard library and pyserial modules they import depend on the machine and are not counted
+(the heavy optional ones must not be imported at all, see tests/test_import.py):
+python -m GSOF_ArduBridge.BridgeBenchmark --import-budget 10
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import os, sys, time, math, json, argparse, platform, subprocess
+from GSOF_ArduBridge import BridgeCodec
+
+IMPORT_BUDGET = 10.0 #< Import time budget of the package modules of the facade, GSOF_ArduBridge.ArduBridge (ms)
+
+def percentile(vSorted, p) -> float:
+    """Nearest-rank percentile (p in 0..100) of a sorted list"""
+    if len(vSorted) == 0:
+        return 0.0
+    idx = int(round(p/100.0*(len(vSorted) -1)))
+    return vSorted[idx]
+
+def frameBytes(vDat, reset=True) -> int:
+    """Number of bytes on the wire of the command vDat"""
+    return len(BridgeCodec.escape(vDat, reset=reset))
+
+class ArduBridgeBenchmark():
+    def __init__(self, ardu, dev=0x50, pulsePin=2, adcPin=0, samples=64, spiBytes=16):
+        """
+        ardu - ArduBridge object with an open port
+        dev - I2C device address for readRegister
+        pulsePin, adcPin, samples - pulseAndSample arguments
+        spiBytes - Length of the write_read vector
+        """
+        self.ardu = ardu
+        self.dev = dev
+        self.pulsePin = pulsePin
+        self.adcPin = adcPin
+        self.samples = samples
+        self.spiBytes = spiBytes
+
+    def cases(self) -> list:
+        """Returns a list of (name, function, TX-bytes, RX-bytes) of the benchmarked commands"""
+        ardu = self.ardu
+        vSpi = list(range(self.spiBytes))
+        ID = len(ardu.GetID() or '\n') -1 #< The ID length without the '\n'
+        return [
+            ('GetID',          lambda: ardu.GetID(),                    frameBytes([ord('?')]), 1 +ID),
+            ('digitalWrite',   lambda: ardu.gpio.digitalWrite(13, 1),   frameBytes([ord('O'), 13, 1]), 1),
+            ('analogRead',     lambda: ardu.an.analogRead(0),           frameBytes([ord('A'), 0]), 2),
+            ('readRegister',   lambda: ardu.i2c.readRegister(self.dev, 0, 2),
+                                frameBytes([ord('2'), ord('A'), self.dev, ord('L'), 1, ord('w'), 0, ord('2'), ord('L'), 2, ord('R')]), 1 +1 +2),
+            ('write_read',     lambda: ardu.spi.write_read(vSpi),       frameBytes([ord('3')] +vSpi) +1, len(vSpi)),
+            ('pulseAndSample', lambda: ardu.cap.pulseAndSample(self.pulsePin, self.adcPin, self.samples),
+                                frameBytes([ord('C'), self.pulsePin, self.adcPin, self.samples]), self.samples),
+        ]
+
+    def run(self, count=200, warmup=10, names=None, v=True) -> dict:
+        """Run every case count times and return the results dictionary"""
+        comm = self.ardu.comm
+        bytesPerSec = comm.baud/10.0 #< Start, 8 data and stop bits
+        res = {'meta': {'benchmark':  __version__,
+                        'python':     platform.python_version(),
+                        'platform':   platform.platform(),
+                        'port':       str(comm.COM),
+                        'baud':       comm.baud,
+                        'count':      count,
+                        'time':       time.strftime('%Y-%m-%dT%H:%M:%S')},
+               'results': {}}
+        if v:
+            print('%-15s %8s %8s %8s %8s %8s %10s %10s %7s'%(
+                'Command', 'p50[ms]', 'p90[ms]', 'p99[ms]', 'max[ms]', 'cmd/s', 'TX[B/s]', 'RX[B/s]', 'Link'))
+        for name, func, txBytes, rxBytes in self.cases():
+            if (names != None) and (name not in names):
+                continue
+            for i in range(warmup):
+                func()
+            vT = [0.0]*count
+            t0 = time.perf_counter()
+            for i in range(count):
+                t = time.perf_counter()
+                func()
+                vT[i] = time.perf_counter() -t
+            total = time.perf_counter() -t0
+            vT.sort()
+            cmdPerSec = count/total
+            r = {'n':          count,
+                 'mean':       sum(vT)/count,
+                 'min':        vT[0],
+                 'p50':        percentile(vT, 50),
+                 'p90':        percentile(vT, 90),
+                 'p99':        percentile(vT, 99),
+                 'max':        vT[-1],
+                 'cmdPerSec':  cmdPerSec,
+                 'txBytes':    txBytes,
+                 'rxBytes':    rxBytes,
+                 'txBytesPerSec': txBytes*cmdPerSec,
+                 'rxBytesPerSec': rxBytes*cmdPerSec,
+                 'linkUtil':   max(txBytes, rxBytes)*cmdPerSec/bytesPerSec} #< Of the busier direction
+            res['results'][name] = r
+            if v:
+                print('%-15s %8.3f %8.3f %8.3f %8.3f %8.0f %10.0f %10.0f %6.1f%%'%(
+                    name, r['p50']*1e3, r['p90']*1e3, r['p99']*1e3, r['max']*1e3, cmdPerSec,
+                    r['txBytesPerSec'], r['rxBytesPerSec'], 100*r['linkUtil']))
+        if v:
+            print('Theoretical limit at %d baud: %.0f B/s per direction'%(comm.baud, bytesPerSec))
+        return res
+
+    def oversampling(self, pin=0, vN=(1, 4, 16, 64), modes=('mean', 'median', 'trimmed'), count=50, v=True) -> dict:
+        """
+        Effective resolution versus latency of analogReadOversampled.
+        Every (mode, n) is read count times, the resolution is log2(1024/(sqrt(12)*sigma)) bits,
+        sigma is the standard deviation of the reduced values (10 bits if no noise was measured).
+        Returns {mode: {n: {'p50', 'mean' (latency, sec), 'sigma' (LSB), 'bits', 'noise' (LSB)}}}
+        """
+        an = self.ardu.an
+        res = {}
+        if v:
+            print('%-8s %4s %8s %8s %8s %6s %8s'%('Mode', 'n', 'p50[ms]', 'avg[ms]', 'sigma', 'bits', 'noise'))
+        for mode in modes:
+            res[mode] = {}
+            for n in vN:
+                vT = [0.0]*count
+                vVal = [0.0]*count
+                vNoise = [0.0]*count
+                for i in range(count):
+                    t = time.perf_counter()
+                    vVal[i], vNoise[i] = an.analogReadOversampled(pin, n, mode)
+                    vT[i] = time.perf_counter() -t
+                vT.sort()
+                avg = sum(vVal)/count
+                sigma = math.sqrt(sum([(x -avg)**2 for x in vVal])/max(count -1, 1))
+                r = {'p50':   percentile(vT, 50),
+                     'mean':  sum(vT)/count,
+                     'sigma': sigma,
+                     'bits':  math.log2(1024.0/(math.sqrt(12)*sigma)) if sigma > 0 else 10.0,
+                     'noise': sum(vNoise)/count}
+                res[mode][n] = r
+                if v:
+                    print('%-8s %4d %8.3f %8.3f %8.3f %6.2f %8.3f'%(
+                        mode, n, r['p50']*1e3, r['mean']*1e3, r['sigma'], r['bits'], r['noise']))
+        return res
+
+def importTime(module='GSOF_ArduBridge.ArduBridge', runs=5) -> dict:
+    """
+    Returns the import time (sec) of the module in a new interpreter (python -X importtime), the best of runs:
+    {'module', 'total', 'own' (self time of the GSOF_ArduBridge modules), 'modules': {GSOF_ArduBridge module: cumulative time}}
+    The bytecode is cached by the first run (even with PYTHONDONTWRITEBYTECODE), the compile time is not counted.
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    best = None
+    for i in range(runs +1):
+        p = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s'%(module)],
+                           stderr=subprocess.PIPE, universal_newlines=True, env=env)
+        if i == 0:
+            continue #< Writes the bytecode
+        modules = {}
+        own = 0.0
+        for line in p.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            field = line[len('import time:'):].split('|')
+            name = field[2].strip()
+            if name.startswith('GSOF_ArduBridge'):
+                try:
+                    modules[name] = int(field[1])*1e-6 #< Cumulative time (us)
+                    own += int(field[0])*1e-6 #< Self time (us)
+                except ValueError:
+                    pass
+        total = modules.get(module)
+        if (total != None) and ((best == None) or (own < best['own'])):
+            best = {'module': module, 'total': total, 'own': own, 'modules': modules}
+    return best
+
+def save(res, fileName) -> None:
+    """Save the results as JSON"""
+    with open(fileName, 'w') as f:
+        json.dump(res, f, indent=2, sort_keys=True)
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description='ArduBridge transport benchmark')
+    parser.add_argument('--port', default='emulator', help='Serial port, "auto" or "emulator" (default)')
+    parser.add_argument('--baud', type=int, default=115200*2)
+    parser.add_argument('--count', type=int, default=200, help='Commands per test')
+    parser.add_argument('--dev', type=lambda x: int(x, 0), default=0x50, help='I2C device for readRegister')
+    parser.add_argument('--json', default=None, help='Save the results to this file')
+    parser.add_argument('--replay', default=None, help='Replay the commands of this wire trace instead of the tests')
+    parser.add_argument('--oversampling', type=int, default=None, metavar='PIN', help='Measure the resolution versus latency of the oversampled read of this analog pin instead of the tests')
+    parser.add_argument('--import-budget', type=float, nargs='?', const=IMPORT_BUDGET, default=None, help='Check the import time of the package modules of the facade against this budget (ms, default %.0f) and exit'%(IMPORT_BUDGET))
+    args = parser.parse_args(argv)
+
+    if args.import_budget != None:
+        res = importTime()
+        for name, t in sorted(res['modules'].items(), key=lambda x: -x[1]):
+            print('%-40s %8.2f ms'%(name, t*1e3))
+        ok = res['own']*1e3 <= args.import_budget
+        print('Import time %.2f ms, package modules %.2f ms, budget %.2f ms - %s'%(res['total']*1e3, res['own']*1e3, args.import_budget, ('OK' if ok else 'EXCEEDED')))
+        if args.json != None:
+            save(res, args.json)
+        if not ok:
+            sys.exit(1)
+        return res
+
+    import logging
+    from GSOF_ArduBridge import ArduBridge
+    emu = None
+    port = args.port
+    if port == 'emulator':
+        from GSOF_ArduBridge import BridgeEmulator
+        emu = BridgeEmulator.ArduBridgeEmulator(baud=args.baud)
+        port = emu.start()
+    ardu = ArduBridge.ArduBridge(COM=port, baud=args.baud, logLevel=logging.WARNING)
+    ardu.OpenClosePort(1)
+    try:
+        if args.replay != None:
+            from GSOF_ArduBridge import BridgeTrace
+            res = {'replay': BridgeTrace.replayTraffic(args.replay, ardu.comm, realtime=False)}
+            print(res['replay'])
+        elif args.oversampling != None:
+            res = {'oversampling': ArduBridgeBenchmark(ardu).oversampling(pin=args.oversampling, count=args.count)}
+        else:
+            res = ArduBridgeBenchmark(ardu, dev=args.dev).run(count=args.count)
+            res['meta']['emulator'] = (emu != None)
+    finally:
+        ardu.OpenClosePort(0)
+        if emu != None:
+            emu.stop()
+    if args.json != None:
+        save(res, args.json)
+    return res
+
+if __name__ == "__main__":
+    main()
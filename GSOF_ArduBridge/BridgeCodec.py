@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Bulk escape / unescape codec of the ArduBridge serial framing.
+Special data bytes such as RST(0x1b) and ESC(0x5c) are sent using an escape code sequence:
+Instead of sending the value 0x1b, send the byte sequence 0x5c followed by 0xb1
+Instead of sending the value 0x5c, send the byte sequence 0x5c followed by 0xc5
+A bare RST (0x1b) in the stream marks the start of a new frame.
+
+The functions below work on whole buffers (bytes.replace / bytes.find) instead of
+a Python branch per byte, and return bytes / bytearray objects.
+Run this module as a script to compare it with the legacy per-byte loops:
+python -m GSOF_ArduBridge.BridgeCodec
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import io, time
+
+RST  = 0x1b #< Reset symbol
+ESC  = 0x5c #< Escape symbol
+
+GOOD    = 1
+PENDING = 0  #< More bytes are needed
+ERR_RST = -2
+
+#< Nibble-swap table, the value sent after ESC is the swapped value
+SWAP = bytes( [((c&0xf)<<4) +((c>>4)&0xf) for c in range(256)] )
+
+_RST = bytes([RST])
+_ESC = bytes([ESC])
+_ESC_ESC = bytes([ESC, SWAP[ESC]]) #< 0x5c, 0xc5
+_ESC_RST = bytes([ESC, SWAP[RST]]) #< 0x5c, 0xb1
+
+def escape(vDat, reset=True) -> bytes:
+    """Returns the escaped frame of vDat (list / bytes of values), starting with RST if reset"""
+    dat = bytes(vDat)
+    if _ESC in dat:
+        dat = dat.replace(_ESC, _ESC_ESC) #< Must be first, the RST sequence starts with ESC
+    if _RST in dat:
+        dat = dat.replace(_RST, _ESC_RST)
+    if reset:
+        return _RST +dat
+    return dat
+
+def unescape(raw, reset=True) -> tuple:
+    """
+    Decode a received buffer.
+    Returns (status, vDat, pending) where status is GOOD or ERR_RST (bare RST found and reset==True),
+    vDat is the decoded bytearray (up to the RST) and pending is True if raw ends with an incomplete escape sequence.
+    """
+    out = bytearray()
+    n = len(raw)
+    i = 0
+    while True:
+        j = raw.find(ESC, i)
+        if j < 0:
+            j = n
+        if reset:
+            k = raw.find(RST, i, j)
+            if k >= 0:
+                out += raw[i:k]
+                return (ERR_RST, out, False)
+        out += raw[i:j]
+        if j >= n:
+            return (GOOD, out, False)
+        if j +1 >= n:
+            return (GOOD, out, True) #< The value after ESC was not received yet
+        out.append( SWAP[raw[j+1]] )
+        i = j +2
+
+def decode(raw, N, reset=True) -> tuple:
+    """
+    Decode the first N values of a received buffer (for incremental receivers).
+    Returns (status, vDat, used) where status is GOOD, PENDING (less than N values were received)
+    or ERR_RST, and used is the number of raw bytes that were consumed (0 when PENDING).
+    """
+    head = raw[:N]
+    if (_ESC not in head) and not (reset and (_RST in head)):
+        if len(head) == N:
+            return (GOOD, bytearray(head), N)
+        return (PENDING, bytearray(head), 0)
+    out = bytearray()
+    n = len(raw)
+    i = 0
+    while len(out) < N:
+        if i >= n:
+            return (PENDING, out, 0)
+        c = raw[i]
+        if c == ESC:
+            if i +1 >= n:
+                return (PENDING, out, 0) #< The value after ESC was not received yet
+            out.append( SWAP[raw[i+1]] )
+            i += 2
+        elif reset and (c == RST):
+            return (ERR_RST, out, i +1)
+        else:
+            out.append(c)
+            i += 1
+    return (GOOD, out, i)
+
+### Legacy per-byte implementations (kept for the benchmark below)
+def _legacyEscape(vDat, reset=True) -> bytes:
+    if reset == True:
+        vStr = bytes([RST])
+    else:
+        vStr = bytes()
+    for c in vDat:
+        if ( (c == ESC) or (c == RST) ):
+            swap_c = ((c&0xf)<<4) +((c>>4)&0xf)
+            vStr += bytes( [ESC, swap_c] )
+        else:
+            vStr += bytes( [c] )
+    return vStr
+
+def _legacyUnescape(raw, N) -> list:
+    ser = io.BytesIO(raw)
+    vDat = [-1]*N
+    i = 0
+    while i<N:
+        c = ser.read(1)
+        if (len(c) == 0):
+            return vDat
+        c = ord(c)
+        if (c == ESC):
+            c = ord(ser.read(1))
+            c = ((c&0xf)<<4) +((c>>4)&0xf)
+        vDat[i] = c
+        i += 1
+    return vDat
+
+def _timeit(func, *args) -> float:
+    """Returns the best time (sec) of a few runs of func(*args)"""
+    best = None
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            func(*args)
+        dt = time.perf_counter() -t0
+        if dt > 0.05:
+            break
+        loops *= 4
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            func(*args)
+        dt = (time.perf_counter() -t0)/loops
+        if (best == None) or (dt < best):
+            best = dt
+    return best
+
+def benchmark(sizes=(16, 1024, 65536)) -> list:
+    """Compare the bulk codec with the legacy per-byte loops. Returns a list of result dictionaries"""
+    res = []
+    print('%8s | %12s %12s %8s | %12s %12s %8s'%('Bytes', 'Enc-legacy', 'Enc-bulk', 'Gain', 'Dec-legacy', 'Dec-bulk', 'Gain'))
+    for N in sizes:
+        vDat = [i&0xff for i in range(N)] #< All values, including RST and ESC
+        raw = escape(vDat, reset=False)
+        assert _legacyEscape(vDat, reset=False) == raw
+        assert _legacyUnescape(raw, N) == list(unescape(raw)[1])
+
+        encOld = _timeit(_legacyEscape, vDat)
+        encNew = _timeit(escape, vDat)
+        decOld = _timeit(_legacyUnescape, raw, N)
+        decNew = _timeit(unescape, raw)
+        print('%8d | %10.1fus %10.1fus %7.1fx | %10.1fus %10.1fus %7.1fx'%(
+            N, encOld*1e6, encNew*1e6, encOld/encNew, decOld*1e6, decNew*1e6, decOld/decNew))
+        res.append( {'bytes':N, 'encLegacy':encOld, 'encBulk':encNew, 'decLegacy':decOld, 'decBulk':decNew} )
+    return res
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Serial port discovery of ArduBridge boards.
+The candidate ports are selected by USB VID/PID/serial-number (the known Arduino and
+USB-serial bridges by default) instead of the port description string.
+The last known port (and USB serial-number) of every board ID is kept in a persistent
+cache (~/.GSOF_ArduBridge_ports.json, or the GSOF_ARDUBRIDGE_CACHE environment variable),
+so a board that did not move is found without opening any port. A cached port without a
+USB serial-number is probed first, another board may have taken its name.
+Otherwise the candidates are probed in parallel with a deadline based GetID.
+
+Note: opening the port of most Arduino boards resets them (DTR), the firmware answers
+only after the bootloader is done. probe() polls the ID until its deadline instead of
+fixed retry sleeps, so the handshake ends as soon as the board is up.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import os, time, json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+#< (VID, PID) of the Arduino boards and the common USB-serial bridges, None matches any PID
+USB_IDS = ((0x2341, None),   #< Arduino
+           (0x2a03, None),   #< Arduino.org
+           (0x1a86, 0x7523), #< CH340
+           (0x0403, 0x6001), #< FTDI FT232R
+           (0x10c4, 0xea60)) #< CP210x
+
+POLL = 0.05 #< GetID receive timeout while the board boots (sec)
+
+def cacheFile() -> str:
+    return os.environ.get('GSOF_ARDUBRIDGE_CACHE', os.path.join(os.path.expanduser('~'), '.GSOF_ArduBridge_ports.json'))
+
+def loadCache() -> dict:
+    """Returns {board-ID: {'port', 'vid', 'pid', 'serial'}}"""
+    try:
+        with open(cacheFile(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def saveCache(cache) -> None:
+    fileName = cacheFile()
+    try:
+        with open(fileName +'.tmp', 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(fileName +'.tmp', fileName)
+    except OSError:
+        pass #< Read only home directory, the cache is an optimization
+
+def comports() -> list:
+    import serial.tools.list_ports as listPorts
+    return listPorts.comports()
+
+def portInfo(port, ports=None):
+    """Returns the ListPortInfo of the port (or None)"""
+    if ports == None:
+        ports = comports()
+    for p in ports:
+        if p.device == port:
+            return p
+    return None
+
+def remember(ID, port) -> None:
+    """Save the port of the board ID in the cache"""
+    ID = str(ID).strip()
+    p = portInfo(port)
+    entry = {'port': port}
+    if p != None:
+        entry.update( {'vid': p.vid, 'pid': p.pid, 'serial': p.serial_number} )
+    cache = loadCache()
+    if cache.get(ID) != entry:
+        cache[ID] = entry
+        saveCache(cache)
+
+def match(p, vid=None, pid=None, serialNumber=None, lookFor="Arduino") -> bool:
+    """Returns True if the port info p is a candidate ArduBridge port"""
+    if (vid != None) or (pid != None) or (serialNumber != None):
+        return (((vid == None) or (p.vid == vid)) and
+                ((pid == None) or (p.pid == pid)) and
+                ((serialNumber == None) or (p.serial_number == serialNumber)))
+    for usbVid, usbPid in USB_IDS:
+        if (p.vid == usbVid) and ((usbPid == None) or (p.pid == usbPid)):
+            return True
+    return (lookFor != None) and (lookFor in str(p.description))
+
+def candidates(vid=None, pid=None, serialNumber=None, lookFor="Arduino", ports=None) -> list:
+    """Returns the list of the candidate ports (device names)"""
+    if ports == None:
+        ports = comports()
+    return sorted([p.device for p in ports if match(p, vid, pid, serialNumber, lookFor)])
+
+def probe(port, baud=115200*2, timeout=2.5):
+    """Open the port and poll the ID of the board until the deadline, returns the ID or False"""
+    from GSOF_ArduBridge import BridgeSerial
+    comm = BridgeSerial.ArduBridgeComm(COM=port, baud=baud)
+    comm.OpenClosePort(1)
+    ID = False
+    if comm.LINK:
+        deadline = time.perf_counter() +timeout
+        while (ID == False) and (time.perf_counter() < deadline):
+            ID = comm.getID(timeout=POLL)
+        comm.OpenClosePort(0)
+    return ID
+
+def findPort(boardID=None, vid=None, pid=None, serialNumber=None, lookFor="Arduino", baud=115200*2, timeout=2.5, timing=None):
+    """
+    Returns the port of the board (or None).
+    boardID - ID of the board (GetID() reply), None for the first candidate
+    vid, pid, serialNumber - USB filter of the candidate ports
+    timing - Optional dictionary that gets the time (sec) of every step
+    """
+    if timing == None:
+        timing = {}
+    t = time.perf_counter()
+    ports = comports()
+    timing['enumerate'] = time.perf_counter() -t
+    t = time.perf_counter()
+
+    stale = None #< Cached port of another board
+    if boardID != None:
+        boardID = str(boardID).strip()
+        entry = loadCache().get(boardID)
+        if entry != None:
+            for p in ports:
+                if entry.get('serial') != None:
+                    found = (p.serial_number == entry['serial']) and (p.vid == entry.get('vid'))
+                else:
+                    found = (p.device == entry['port'])
+                    if found:
+                        ID = probe(p.device, baud, timeout) #< The port name alone does not identify the board
+                        if (ID == False) or (ID.strip() != boardID):
+                            stale = p.device
+                            break
+                if found:
+                    timing['cache'] = time.perf_counter() -t
+                    return p.device
+            timing['cache'] = time.perf_counter() -t
+            t = time.perf_counter()
+
+    vPort = [port for port in candidates(vid, pid, serialNumber, lookFor, ports) if port != stale]
+    if (boardID == None) or (len(vPort) == 0):
+        timing['candidates'] = time.perf_counter() -t
+        if len(vPort) > 0:
+            return vPort[0]
+        return None
+
+    t = time.perf_counter()
+    port = None
+    executor = ThreadPoolExecutor(max_workers=len(vPort))
+    futures = {executor.submit(probe, p, baud, timeout): p for p in vPort}
+    for fut in as_completed(futures):
+        ID = fut.result()
+        if (ID != False) and (ID.strip() == boardID):
+            port = futures[fut]
+            break
+    executor.shutdown(wait=False) #< The other probes end (and close their ports) in the background
+    timing['probe'] = time.perf_counter() -t
+    if port != None:
+        remember(boardID, port)
+    return port
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Host side emulator of the Bridge_Ctrl firmware, for benchmarks and tests without a board.
+
+ArduBridgeFirmware is the protocol model. It decodes the RST/ESC framing of the
+received stream, executes the commands on a simulated board and returns the
+replies. The supported commands are:
+'?' ID, 'D' pin direction, 'I' digital in, 'O' digital out, 'P' PWM, 'A' analog in,
+'S' servo, 's' servo S-curve, '2' I2C packets (register-map devices), '3' SPI (loopback),
+'4' SPI mode, '5' SPI-CS configuration, '6' SPI with CS (loopback), 'C' pulse and sample,
+'W' WS2812 configuration and 'w' WS2812 data.
+
+ArduBridgeEmulator serves the model on a Linux pseudo-terminal, so
+ArduBridge(COM=emu.port) connects unchanged. Replies are delayed by a per-command
+firmware latency, a fixed USB link latency and the time the bytes take on the wire
+at the configured baud-rate (10 bits per byte).
+
+To run the emulator from the command line:
+python -m GSOF_ArduBridge.BridgeEmulator
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import os, time, math, random, threading, select, collections
+from GSOF_ArduBridge import BridgeCodec
+
+#< Number of argument bytes of the fixed length commands
+CMD_ARGS = {'?':0, 'D':2, 'I':1, 'O':2, 'P':2, 'A':1, 'S':2, 's':5, 'C':3, 'W':6, '4':3, '5':3}
+
+#< Firmware execution time of every command (sec)
+LATENCY = {'?':50e-6, 'D':20e-6, 'I':20e-6, 'O':20e-6, 'P':20e-6, 'A':120e-6, 'S':20e-6,
+           '2':150e-6, '3':20e-6, '4':20e-6, '6':20e-6, 'C':0.0}
+
+class ArduBridgeFirmware():
+    ID = 'Bridge_Ctrl_V21 (emulator)'
+    PINS = 256 #< Any pin# that fits in a byte
+
+    def __init__(self, ID=None):
+        if ID != None:
+            self.ID = ID
+        self.mode = [1]*self.PINS     #< All pins are inputs after reset
+        self.dout = [0]*self.PINS     #< Digital output latch
+        self.din = [0]*self.PINS      #< Digital input level (set by the user)
+        self.pwm = [0]*self.PINS
+        self.servo = [0]*self.PINS
+        self.analog = [512]*self.PINS #< 10 bit analog input value (set by the user)
+        self.noise = 0.0              #< RMS noise of the analog reads (LSB)
+        self.i2cDev = {}              #< {dev: bytearray(256)} register maps, created on first access
+        self.i2cPtr = {}              #< Register pointer of every device
+        self.spiMode = 4
+        self.leds = bytearray()
+        self.tau = 16.0               #< Pulse and sample RC time constant (samples)
+        self.cmdCount = collections.Counter()
+        self._esc = False
+        self._cmd = None
+        self._args = []
+
+    ### Stream decoder
+    def feed(self, raw) -> list:
+        """Process received bytes, returns a list of (command, reply-bytes) of the executed commands"""
+        out = []
+        for b in raw:
+            if self._esc:
+                self._esc = False
+                self._data(BridgeCodec.SWAP[b], out)
+            elif b == BridgeCodec.RST:
+                self._reset(out)
+            elif b == BridgeCodec.ESC:
+                self._esc = True
+            else:
+                self._data(b, out)
+        return out
+
+    def _reply(self, out, cmd, vDat) -> None:
+        vDat = BridgeCodec.escape(vDat, reset=False)
+        if (len(out) > 0) and (out[-1][0] == cmd) and (cmd in '36'):
+            out[-1] = (cmd, out[-1][1] +vDat) #< Merge the SPI bytes of the same packet
+        else:
+            out.append( (cmd, vDat) )
+
+    def _reset(self, out) -> None:
+        """RST symbol, end of the previous packet"""
+        if self._cmd == 'w':
+            self.ledShow(self.leds)
+        self._cmd = None
+        self._args = []
+
+    def _data(self, b, out) -> None:
+        cmd = self._cmd
+        if cmd == None:
+            cmd = chr(b)
+            self._cmd = cmd
+            self._args = []
+            if cmd == '2':
+                self._i2c = {'state':None, 'dev':0, 'len':0, 'op':None, 'dat':[]}
+            elif cmd == 'w':
+                self.leds = bytearray()
+            elif cmd in CMD_ARGS:
+                if CMD_ARGS[cmd] == 0:
+                    self._execute(cmd, [], out)
+            elif cmd not in '36':
+                self._cmd = None #< Unknown command
+            return
+
+        if cmd in CMD_ARGS:
+            self._args.append(b)
+            if len(self._args) == CMD_ARGS[cmd]:
+                self._execute(cmd, self._args, out)
+        elif cmd in '36':
+            self._reply(out, cmd, [self.spiTransfer(b)])
+        elif cmd == 'w':
+            self.leds.append(b)
+        elif cmd == '2':
+            self._i2cData(b, out)
+
+    def _execute(self, cmd, args, out) -> None:
+        self.cmdCount[cmd] += 1
+        self._cmd = None #< Ready for the next command
+        if cmd == '?':
+            vID = [ord(c) for c in self.ID]
+            self._reply(out, cmd, [len(vID)] +vID)
+        elif cmd == 'D':
+            pin, mode = args
+            self.mode[pin] = mode
+            self._reply(out, cmd, [1])
+        elif cmd == 'I':
+            pin = args[0]
+            val = self.dout[pin] if self.mode[pin] == 0 else self.din[pin]
+            self._reply(out, cmd, [val&1])
+        elif cmd == 'O':
+            pin, val = args
+            self.dout[pin] = val
+            self._reply(out, cmd, [1])
+        elif cmd == 'P':
+            pin, val = args
+            self.pwm[pin] = val
+            self._reply(out, cmd, [1])
+        elif cmd == 'A':
+            val = int(self.analogRead(args[0]))&0x3ff
+            self._reply(out, cmd, [val&0xff, val>>8])
+        elif cmd == 'S':
+            pin, val = args
+            self.servo[pin] = val
+            self._reply(out, cmd, [1])
+        elif cmd == 's':
+            self.servo[args[0]] = args[2]
+        elif cmd == 'C':
+            pulsePin, adcPin, samples = args
+            self._reply(out, cmd, self.pulseAndSample(pulsePin, adcPin, samples))
+        elif cmd == '4':
+            self.spiMode = args[0]
+            self._reply(out, cmd, [self.spiMode])
+
+    ### I2C packet grammar
+    def _i2cData(self, b, out) -> None:
+        i2c = self._i2c
+        state = i2c['state']
+        if state == None:
+            if b in (ord('A'), ord('L'), ord('F')):
+                i2c['state'] = chr(b)
+            elif b in (ord('W'), ord('w')):
+                i2c['op'] = chr(b)
+                i2c['dat'] = []
+                i2c['state'] = 'W'
+                if i2c['len'] == 0:
+                    self._i2cWrite(out)
+            elif b in (ord('R'), ord('r')):
+                self._i2cRead(out)
+            #'2' (packet header) is ignored
+        elif state == 'A':
+            i2c['dev'] = b
+            i2c['state'] = None
+        elif state == 'L':
+            i2c['len'] = b
+            i2c['state'] = None
+        elif state == 'F':
+            i2c['state'] = None
+        elif state == 'W':
+            i2c['dat'].append(b)
+            if len(i2c['dat']) >= i2c['len']:
+                self._i2cWrite(out)
+
+    def _i2cMem(self, dev) -> bytearray:
+        if dev not in self.i2cDev:
+            self.i2cDev[dev] = bytearray(256)
+            self.i2cPtr[dev] = 0
+        return self.i2cDev[dev]
+
+    def _i2cWrite(self, out) -> None:
+        i2c = self._i2c
+        dev = i2c['dev']
+        mem = self._i2cMem(dev)
+        vDat = i2c['dat']
+        if len(vDat) > 0:
+            ptr = vDat[0]
+            for b in vDat[1:]:
+                mem[ptr&0xff] = b
+                ptr += 1
+            self.i2cPtr[dev] = ptr&0xff
+        i2c['state'] = None
+        self.cmdCount['2'] += 1
+        self._reply(out, '2', [ord('N')])
+
+    def _i2cRead(self, out) -> None:
+        i2c = self._i2c
+        dev = i2c['dev']
+        mem = self._i2cMem(dev)
+        N = i2c['len']
+        ptr = self.i2cPtr[dev]
+        vDat = [mem[(ptr +i)&0xff] for i in range(N)]
+        self.i2cPtr[dev] = (ptr +N)&0xff
+        self.cmdCount['2'] += 1
+        self._reply(out, '2', [N] +vDat)
+
+    ### Simulated hardware, override to model other devices
+    def analogRead(self, pin) -> int:
+        if self.noise > 0:
+            return min(max(int(round(random.gauss(self.analog[pin], self.noise))), 0), 0x3ff)
+        return self.analog[pin]
+
+    def spiTransfer(self, b) -> int:
+        return b #< MISO is connected to MOSI
+
+    def ledShow(self, leds) -> None:
+        return
+
+    def pulseAndSample(self, pulsePin, adcPin, samples) -> list:
+        """RC charge curve of the electrode"""
+        return [int(255*(1.0 -math.exp(-i/self.tau))) for i in range(samples)]
+
+class ArduBridgeEmulator():
+    def __init__(self, firmware=None, baud=115200*2, latency=None, linkLatency=0.0005, pacing=True):
+        """
+        firmware - The protocol model (ArduBridgeFirmware)
+        baud - The emulated baud-rate (bits per second)
+        latency - {command: sec} firmware execution time of the commands (updates LATENCY)
+        linkLatency - Fixed latency of the USB-serial converter (sec)
+        pacing - If False, the replies are sent as fast as possible
+        """
+        self.fw = firmware
+        if self.fw == None:
+            self.fw = ArduBridgeFirmware()
+        self.baud = baud
+        self.latency = dict(LATENCY)
+        if latency != None:
+            self.latency.update(latency)
+        self.linkLatency = linkLatency
+        self.pacing = pacing
+        self.port = None
+        self.thread = None
+        self.enable = False
+
+    def byteTime(self, N) -> float:
+        """The time of N bytes on the wire (start, 8 data and stop bits)"""
+        if self.pacing:
+            return N*10.0/self.baud
+        return 0.0
+
+    def start(self) -> str:
+        """Open the pseudo-terminal, start the emulator thread and return the port name"""
+        import tty
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.enable = True
+        self.thread = threading.Thread(target=self._run, name='ArduBridgeEmulator')
+        self.thread.daemon = True
+        self.thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """Stop the emulator thread and close the pseudo-terminal"""
+        self.enable = False
+        if self.thread != None:
+            self.thread.join()
+            self.thread = None
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _run(self) -> None:
+        txQueue = collections.deque() #< (time, bytes) in the order of transmission
+        rxFree = 0.0 #< Time the host to board line is free
+        txFree = 0.0 #< Time the board to host line is free
+        while self.enable:
+            timeout = 0.05
+            if len(txQueue) > 0:
+                timeout = max(0.0, txQueue[0][0] -time.perf_counter())
+            r = select.select([self.master], [], [], timeout)[0]
+            now = time.perf_counter()
+            if len(r) > 0:
+                try:
+                    raw = os.read(self.master, 4096)
+                except OSError:
+                    raw = b''
+                if self.pacing:
+                    rxFree = max(now, rxFree) +self.byteTime(len(raw))
+                    tDone = rxFree +self.linkLatency
+                else:
+                    tDone = now
+                for cmd, vDat in self.fw.feed(raw):
+                    tDone += self.latency.get(cmd, 0.0)
+                    if cmd == 'C':
+                        tDone += 100e-6*len(vDat) #< ADC conversion of every sample
+                    tStart = max(tDone, txFree)
+                    txFree = tStart +self.byteTime(len(vDat))
+                    txQueue.append( (txFree +(self.linkLatency if self.pacing else 0.0), vDat) )
+
+            now = time.perf_counter()
+            while (len(txQueue) > 0) and (txQueue[0][0] <= now):
+                os.write(self.master, txQueue.popleft()[1])
+
+if __name__ == "__main__":
+    emu = ArduBridgeEmulator()
+    print('ArduBridge emulator is running on %s (Ctrl-C to stop)'%(emu.start()))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emu.stop()
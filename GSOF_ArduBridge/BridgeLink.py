@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Link supervisor of the ArduBridgeComm object.
+When the serial link is lost (e.g. the USB cable was unplugged) the port is closed
+and a background thread tries to reopen it with exponential back-off and jitter:
+delay = min(maxDelay, baseDelay*2^attempt), the actual sleep is uniform in [delay/2, delay].
+No lock of the link is held while waiting, so no thread is blocked by a dead link.
+
+While the link is down, new and queued requests fail at once with LinkDownError:
+
+try:
+    v = ardu.an.analogRead(0)
+except BridgeLink.LinkDownError:
+    v = None #< Hold the last output, the link is reconnected in the background
+
+A reconnect attempt succeeds when the port is open and the board answers GetID (its ID is
+polled for up to handshake sec, the board may reset when the port is opened).
+
+The up/down events are published to the listeners, func(event) with the event dictionary:
+{'event': 'down' or 'up', 'port', 'time', 'reason' (down), 'downtime', 'attempts' and 'ID' (up)}
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import time, random, threading
+
+class LinkDownError(ConnectionError):
+    """The serial link is down, the request was not sent"""
+    def __init__(self, port, downFor=0.0):
+        ConnectionError.__init__(self, '%s link is down (%.3f sec)'%(port, downFor))
+        self.port = port
+        self.downFor = downFor
+
+class LinkSupervisor():
+    def __init__(self, comm, baseDelay=0.05, maxDelay=2.0, handshake=2.5, logger=None):
+        """
+        comm - ArduBridgeComm object, its _reopen(handshake) method is called to reconnect, it returns the ID of the board or False
+        baseDelay, maxDelay - Back-off delays (sec) of the first and the late reconnect attempts
+        handshake - GetID polling time (sec) of every reconnect attempt
+        """
+        self.comm = comm
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.handshake = handshake
+        self.logger = logger
+        self.down = False   #< True while the link is lost (checked by every request)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.thread = None
+        self.resetStats()
+
+    def resetStats(self) -> None:
+        """Clear the accumulated statistics"""
+        self.downs = 0        #< Number of times the link was lost
+        self.reconnects = 0   #< Number of successful reconnections
+        self.attempts = 0     #< Total reconnect attempts
+        self.downtime = 0.0   #< Total time the link was down (sec)
+        self.lastDowntime = 0.0
+        self.maxDowntime = 0.0
+        self.tDown = 0.0
+
+    def getStats(self) -> dict:
+        """Returns the link state, the number of outages and reconnections and the downtime statistics (sec)"""
+        with self._lock:
+            downFor = 0.0
+            if self.down:
+                downFor = time.perf_counter() -self.tDown
+            return {'state':       'down' if self.down else 'up',
+                    'downs':       self.downs,
+                    'reconnects':  self.reconnects,
+                    'attempts':    self.attempts,
+                    'downtime':    self.downtime +downFor,
+                    'lastDowntime':self.lastDowntime,
+                    'maxDowntime': self.maxDowntime,
+                    'downFor':     downFor}
+
+    def addListener(self, func) -> None:
+        """func(event) is called on every link up/down event (from the reporting thread)"""
+        if func not in self.listeners:
+            self.listeners.append(func)
+
+    def removeListener(self, func) -> None:
+        if func in self.listeners:
+            self.listeners.remove(func)
+
+    def error(self) -> LinkDownError:
+        """Returns the exception of the requests that are made while the link is down"""
+        downFor = 0.0
+        if self.down:
+            downFor = time.perf_counter() -self.tDown
+        return LinkDownError(self.comm.COM, downFor)
+
+    def lost(self, reason='') -> None:
+        """Report a link failure, starts the reconnect thread (returns at once)"""
+        with self._lock:
+            if self.down:
+                return
+            self.down = True
+            self.downs += 1
+            self.tDown = time.perf_counter()
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run, name='ArduBridgeLink')
+            self.thread.daemon = True
+        if self.logger != None:
+            self.logger.critical('COM is dead!! - %s, reconnecting in the background'%(reason))
+        self._publish( {'event':'down', 'port':self.comm.COM, 'time':time.time(), 'reason':str(reason)} )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop reconnecting (the port was closed by the user)"""
+        self._stop.set()
+        thread = self.thread
+        if (thread != None) and (threading.current_thread() != thread):
+            thread.join()
+        with self._lock:
+            if self.down:
+                self._endDowntime()
+            self.down = False
+            self.thread = None
+
+    def _endDowntime(self) -> float:
+        dt = time.perf_counter() -self.tDown
+        self.downtime += dt
+        self.lastDowntime = dt
+        if dt > self.maxDowntime:
+            self.maxDowntime = dt
+        return dt
+
+    def _publish(self, event) -> None:
+        for func in list(self.listeners):
+            try:
+                func(event)
+            except Exception as e:
+                if self.logger != None:
+                    self.logger.error('Link listener failed: %r'%(e))
+
+    def _run(self) -> None:
+        """The reconnect thread"""
+        attempt = 0
+        while True:
+            delay = min(self.maxDelay, self.baseDelay*(2**min(attempt, 30)))
+            if self._stop.wait(random.uniform(delay/2, delay)):
+                return
+            attempt += 1
+            with self._lock:
+                self.attempts += 1
+            ID = self.comm._reopen(self.handshake)
+            if ID != False:
+                break
+        with self._lock:
+            self.down = False
+            self.reconnects += 1
+            dt = self._endDowntime()
+        if self.logger != None:
+            self.logger.info('COM connection reastablished!! (%.3f sec, %d attempts)'%(dt, attempt))
+        self._publish( {'event':'up', 'port':self.comm.COM, 'time':time.time(), 'downtime':dt, 'attempts':attempt, 'ID':ID} )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Pipelined command window for the ArduBridgeComm object.
+The firmware answers the commands in the order they were received, so up to
+"window" commands can be sent before their replies arrive.
+Each submitted command (vDat, N, parser) returns a concurrent.futures.Future.
+A reader thread receives the replies in FIFO order and completes the futures
+with parser((status, data)), or with the (status, data) reply if no parser was given.
+If a reply is missing or corrupted, all the commands that are in flight are completed
+with an ERR_BYTE reply and the late bytes of their replies are drained (ArduBridgeComm.resync).
+
+Use ArduBridgeComm.startPipeline(window) to enable it.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import threading, collections, time
+from concurrent.futures import Future
+
+def complete(fut, reply, parser=None) -> Future:
+    """Complete the future with parser(reply) (or reply if no parser)"""
+    if parser == None:
+        fut.set_result(reply)
+    else:
+        try:
+            fut.set_result( parser(reply) )
+        except Exception as e:
+            fut.set_exception(e)
+    return fut
+
+class ArduBridgePipeline():
+    def __init__(self, comm, window=4):
+        self.comm = comm
+        self.window = window
+        self.slots = threading.Semaphore(window) #< Free places in the window
+        self.inFlight = collections.deque()      #< (future, N, parser, reset, op, tSend) in the order sent
+        self.cond = threading.Condition()
+        self.enable = True
+        self.reader = threading.Thread(target=self._run, name='ArduBridgePipeline')
+        self.reader.daemon = True
+        self.reader.start()
+
+    def submit(self, vDat, N, parser=None, reset=True, trailReset=False) -> Future:
+        """Send the command and return a future of its reply (N bytes)"""
+        fut = Future()
+        if N <= 0:
+            with self.comm.lock, self.cond:
+                self.comm.send(vDat, reset=reset, flush=(len(self.inFlight) == 0), trailReset=trailReset)
+            return complete(fut, (self.comm.GOOD, []), parser)
+
+        self.slots.acquire()
+        #The command is sent and queued under self.cond, so the reader never fails the commands
+        #in flight (and counts their stale bytes) between the send and the queuing
+        with self.comm.lock, self.cond:
+            self.comm.send(vDat, reset=reset, flush=(len(self.inFlight) == 0), trailReset=trailReset)
+            tSend = time.perf_counter()
+            self.inFlight.append( (fut, N, parser, reset, vDat[0], tSend) )
+            self.cond.notify_all()
+        return fut
+
+    def pending(self) -> int:
+        """Returns the number of commands waiting for a reply"""
+        return len(self.inFlight)
+
+    def drain(self) -> None:
+        """Wait until all the replies were received"""
+        with self.cond:
+            while len(self.inFlight) > 0:
+                self.cond.wait()
+
+    def stop(self) -> None:
+        """Wait for the commands in flight and stop the reader thread"""
+        self.drain()
+        with self.cond:
+            self.enable = False
+            self.cond.notify_all()
+        if threading.current_thread() != self.reader:
+            self.reader.join()
+
+    def _run(self) -> None:
+        """The reader thread, matches the replies to the commands in FIFO order"""
+        tRx = 0.0 #< End of the previous reply
+        while True:
+            with self.cond:
+                while (len(self.inFlight) == 0) and self.enable:
+                    self.cond.wait()
+                if len(self.inFlight) == 0:
+                    return
+                fut, N, parser, reset, op, tSend = self.inFlight[0]
+
+            #The round-trip of a command starts when it was sent or when the previous reply ended (it was queued in the firmware)
+            reply = self.comm.receive(N, reset=reset, op=op, t0=max(tSend, tRx))
+            tRx = time.perf_counter()
+            failed = []
+            with self.cond:
+                self.inFlight.popleft()
+                if reply[0] != self.comm.GOOD:
+                    #Lost sync, the following replies cannot be trusted. Their bytes are
+                    #drained by the next command that is sent when no reply is expected
+                    while len(self.inFlight) > 0:
+                        failed.append( self.inFlight.popleft() )
+                        self.comm.expectStale(failed[-1][1])
+                self.cond.notify_all()
+            for i in range(1 +len(failed)):
+                self.slots.release()
+
+            if self.comm.link.down:
+                #The link was lost, its reconnect supervisor is running
+                for fut, N, parser, reset, op, tSend in [(fut, N, parser, reset, op, tSend)] +failed:
+                    fut.set_exception(self.comm.link.error())
+                continue
+            complete(fut, reply, parser)
+            for fut, N, parser, reset, op, tSend in failed:
+                complete(fut, (self.comm.ERR_BYTE, [-1]*N), parser)
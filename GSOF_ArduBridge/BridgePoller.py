@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Background digital-input poller.
+The configured GPIO pins (read together with ArduBridgeGPIO.getPins, one round trip) and
+I/O expander ports (any object with getPort(), e.g. PCF8574, one read per port) are sampled
+at the target rate against the monotonic clock. Every sample is timestamped and stored in a
+RingBuffer (one byte per channel), the rising and falling edges are passed to the callbacks
+by a dispatcher thread, so a slow callback does not delay the sampling.
+
+poller = BridgePoller.DigitalPoller(rate=200.0)
+poller.addPins(ardu.gpio, [2, 3])
+poller.addPort(pcf, name='pcf')             #< Channels 'pcf.0' .. 'pcf.7'
+poller.onEdge(lambda ch, val, t: print(ch, val, t), channel=2, edge=poller.RISING)
+poller.start()
+...
+print(poller.getStats()['achieved'])        #< The achieved sample rate (Hz)
+poller.stop()
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import time, queue, threading
+from GSOF_ArduBridge import RingBuffer
+from GSOF_ArduBridge import Sleep_us
+
+class DigitalPoller(threading.Thread):
+    RISING = 1
+    FALLING = 2
+    BOTH = RISING |FALLING
+
+    def __init__(self, rate=100.0, history=1000, logger=None):
+        """rate - Target sample rate (Hz), history - Number of samples kept in the ring buffer"""
+        threading.Thread.__init__(self)
+        self.name = 'ArduBridgePoller'
+        self.daemon = True
+        self.rate = rate
+        self.history = history
+        self.logger = logger
+        self.sources = []   #< (read function, number of channels)
+        self.channels = []  #< Channel names in the order of the sample values
+        self.callbacks = [] #< (func, channel index or None, edge mask)
+        self.ring = None
+        self.prev = None
+        self.events = queue.SimpleQueue()
+        self.dispatcher = threading.Thread(target=self._dispatch, name='ArduBridgePollerCallbacks')
+        self.dispatcher.daemon = True
+        self._quit = threading.Event()
+        self.samples = 0
+        self.overruns = 0   #< Samples that started a full period late
+        self.errors = 0     #< Failed reads (the sample was dropped)
+        self.edges = 0
+        self.tStart = 0.0
+
+    def addPins(self, gpio, pins, names=None) -> None:
+        """Sample the GPIO pins (ArduBridgeGPIO) in one round trip, the channels are named by names (the pin# by default)"""
+        pins = list(pins)
+        def read():
+            vals = gpio.getPins(pins, log=False)
+            return [vals[pin] for pin in pins]
+        self.sources.append( (read, len(pins)) )
+        self.channels += list(names) if names != None else pins
+
+    def addPort(self, expander, name='port', bits=range(8)) -> None:
+        """Sample the port of an I/O expander (expander.getPort()), the channels are named 'name.bit'"""
+        bits = list(bits)
+        def read():
+            port = expander.getPort()
+            return [(port >>bit) &1 for bit in bits]
+        self.sources.append( (read, len(bits)) )
+        self.channels += ['%s.%d'%(name, bit) for bit in bits]
+
+    def onEdge(self, func, channel=None, edge=BOTH) -> None:
+        """Call func(channel, value, time) on the edges of the channel (of any channel if None), on the dispatcher thread"""
+        idx = None
+        if channel != None:
+            idx = self.channels.index(channel)
+        self.callbacks.append( (func, idx, edge) )
+
+    def start(self) -> None:
+        self.ring = RingBuffer.RingBuffer(self.history, typecode='B', width=len(self.channels))
+        self.dispatcher.start()
+        threading.Thread.start(self)
+
+    def stop(self) -> None:
+        """Stop the sampling, the pending callbacks are still called (nothing to join if it was not started)"""
+        self._quit.set()
+        if (threading.current_thread() != self) and self.is_alive():
+            self.join()
+        if self.dispatcher.is_alive():
+            self.events.put(None)
+            if threading.current_thread() != self.dispatcher:
+                self.dispatcher.join()
+
+    def state(self) -> dict:
+        """Returns the last sample {channel: value}"""
+        if (self.ring == None) or (self.ring.count == 0):
+            return {}
+        t, v = self.ring.latest(1)
+        return dict(zip(self.channels, v))
+
+    def getStats(self) -> dict:
+        """Returns the target and the achieved sample rate (Hz), the number of samples, overruns, read errors and edges"""
+        dt = time.perf_counter() -self.tStart
+        return {'rate':     self.rate,
+                'achieved': self.samples/dt if (self.tStart > 0) and (dt > 0) else 0.0,
+                'samples':  self.samples,
+                'overruns': self.overruns,
+                'errors':   self.errors,
+                'edges':    self.edges,
+                'pending':  self.events.qsize()}
+
+    def sample(self) -> list:
+        """Read all the sources once, returns the values (or None if a read failed)"""
+        values = []
+        for read, N in self.sources:
+            vals = read()
+            for v in vals:
+                if (v == None) or (v < 0):
+                    return None
+            values += vals
+        return values
+
+    def run(self) -> None:
+        period = 1.0/self.rate
+        self.tStart = time.perf_counter()
+        tNext = self.tStart
+        while not self._quit.is_set():
+            t0 = time.perf_counter()
+            try:
+                values = self.sample()
+            except Exception as e:
+                values = None
+                if self.logger != None:
+                    self.logger.error('Poller: %r'%(e))
+            t = (t0 +time.perf_counter())/2 #< Timestamp in the middle of the reads
+            if values == None:
+                self.errors += 1
+            else:
+                self.ring.append(values, t)
+                self.samples += 1
+                if self.prev != None:
+                    for i, (old, new) in enumerate(zip(self.prev, values)):
+                        if old != new:
+                            self.edges += 1
+                            self.events.put( (i, new, t) )
+                self.prev = values
+
+            tNext += period
+            now = time.perf_counter()
+            if now > tNext +period:
+                self.overruns += 1
+                tNext = now #< Do not try to catch up
+            Sleep_us.sleepUntil(tNext, spin=0.0)
+
+    def _dispatch(self) -> None:
+        """The dispatcher thread, calls the edge callbacks"""
+        while True:
+            event = self.events.get()
+            if event == None:
+                return
+            idx, value, t = event
+            mask = self.RISING if value else self.FALLING
+            for func, channel, edge in list(self.callbacks):
+                if ((channel == None) or (channel == idx)) and (edge &mask):
+                    try:
+                        func(self.channels[idx], value, t)
+                    except Exception as e:
+                        if self.logger != None:
+                            self.logger.error('Poller callback: %r'%(e))
@@ -18,6 +18,16 @@
 Class of a basic serial communication methods.
 The object is constructed with the supplied serial device and baud-rate as an input arguments.
 The send and receive methods are thread protected using internal semaphores.
+Complete transactions (send followed by the receive of the reply) are protected by self.lock,
+use the transact(), submit() and call() methods to execute them atomically.
+The optional pipelined mode (startPipeline) keeps several commands in flight (see BridgePipeline).
+The optional I/O worker thread (startWorker) executes the transactions of all threads (see BridgeWorker).
+Transactions are arbitrated by the priority class of the calling thread (see BridgeArbiter).
+A lost link is reconnected in the background, meanwhile the requests raise LinkDownError (see BridgeLink).
+The link counters and latency histograms are returned by stats() (see BridgeStats).
+The traffic can be recorded to a binary wire trace with startTrace() (see BridgeTrace).
+The optional output-state shadow (setShadow, see BridgeShadow) lets the GPIO and analog drivers skip the writes
+of values that were already commanded. It is cleared on reset, open and reconnect.
 Special data bytes such as RST(0x1b) and ESC(0x5c) are send using an escape code sequence.
 The escape code sequence is generated as follow:
 Instead of sending the value 0x1b, send the byte sequence 0x5c followed by 0xb1
@@ -38,10 +48,19 @@ __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
-import time, sys, threading
+import time, sys, threading, contextlib
+from concurrent.futures import Future
 import serial
+from GSOF_ArduBridge import BridgeCodec
+from GSOF_ArduBridge import BridgePipeline
+from GSOF_ArduBridge import BridgeArbiter
+from GSOF_ArduBridge import BridgeTimeout
+from GSOF_ArduBridge import BridgeTransport
+from GSOF_ArduBridge import BridgeLink
+from GSOF_ArduBridge import BridgeStats
+from GSOF_ArduBridge import BridgeShadow
 
-class ArduBridgeComm():
+class ArduBridgeComm(BridgeShadow.OutputShadow):
     """Open, Close, Send, Receive methods"""
     RST  = 0x1b #< Reset symbol
     ESC  = 0x5c #< Escape symbol
@@ -53,44 +72,74 @@ class ArduBridgeComm():
     ERR_LINK = -1
     ERR_RST  = -2
 
-    def __init__(self, COM, baud=115200*2, PortStatusReport=False, RxTimeOut = 0.015, writeTimeout=0.1, interByteTimeout=None, logger=None):
+    PRIO_RT     = BridgeArbiter.PRIO_RT     #< Real-time (control loops)
+    PRIO_NORMAL = BridgeArbiter.PRIO_NORMAL #< Default
+    PRIO_BULK   = BridgeArbiter.PRIO_BULK   #< Bulk transfers (displays)
+
+    RX_POLL = 0.002 #< Serial read timeout (sec), the receive deadline is checked after every read
+    BATCH_OP = 'batch' #< Latency histogram key of the write-coalescing batches
+    ID_POLL = 0.05 #< GetID receive timeout while the board boots after a reconnect (sec)
+
+    def __init__(self, COM, baud=115200*2, PortStatusReport=False, RxTimeOut = 0.015, writeTimeout=0.1, interByteTimeout=None, logger=None, adaptiveTimeout=True, transport=None):
         self.pyVer = sys.version_info.major +sys.version_info.minor/10.0
         print('GSOF_ArduSerial v1.1 for Python-%s'%(self.pyVer))
         self.RxTry = 25
         self.logger = logger
         self.LINK = False
+        self.LinkReport = PortStatusReport #< Optional callback, LinkReport(val) on every link up/down
+        self.link = BridgeLink.LinkSupervisor(self, logger=logger) #< Reconnects a lost link
+        self.counters = BridgeStats.LinkCounters()
+        self.statsDump = None
+        self.trace = None             #< Wire trace recorder
+        self.shadow = None            #< {pin: (cmd, val), ('D', pin): mode} last commanded output state, None when disabled
         self.semaTX = threading.Semaphore(1)
         self.semaRX = threading.Semaphore(1)
-        self.ser = serial.Serial(None,
-                                 baud,
-                                 timeout=RxTimeOut,
-                                 writeTimeout=writeTimeout,
-                                 inter_byte_timeout=interByteTimeout
-                                 )
-        self.ser.port = COM
+        self.waitStats = BridgeArbiter.WaitStats()
+        self.lock = BridgeArbiter.PriorityLock(self.getPriority, self.waitStats) #< Transaction lock
+        self.bulkChunk = 64           #< Bulk transfers are split to chunks of this size (bytes)
+        self._tls = threading.local() #< Priority class of each thread
+        self.pipe = None              #< Pipelined mode
+        self.worker = None            #< I/O worker thread
+        self.adaptiveTimeout = adaptiveTimeout
+        #Receive deadline per command class, never shorter than RxTimeOut (USB-serial latency and firmware execution time)
+        self.rtt = BridgeTimeout.RttEstimator(rtoMin=RxTimeOut, rtoMax=RxTimeOut*self.RxTry)
+        self._rxOp = None             #< Command class of the last sent command
+        self._rxFirst = False         #< The next reply is the first reply of the last sent command (an RTT sample)
+        self._rxT0 = 0.0              #< Time of the last send (or receive)
+        self.rxOwed = 0               #< Reply bytes of failed commands that may still arrive
+        self.rxStale = True           #< The RX buffer should be drained before the next command
+        self.ser = transport #< serial.Serial or a BridgeTransport backend
+        if self.ser == None:
+            self.ser = BridgeTransport.create(COM,
+                                              baud,
+                                              timeout=min(RxTimeOut, self.RX_POLL),
+                                              writeTimeout=writeTimeout,
+                                              interByteTimeout=interByteTimeout
+                                              )
         self.baud = baud
         self.COM = COM
         
     def sendReset(self) -> None:
         """Send the reset command to the Arduino"""
-        self.semaTX.release()
+        self.invalidateShadow() #< The firmware restores its defaults
+        self.semaTX.acquire()
         if self.pyVer < 3.0:
             self.uart_wr(chr(self.RST))
         else:
             self.uart_wr( bytes([self.RST]) )
-        
-    def send(self, vDat, reset=True) -> None:
-        """Send list of bytes over the serial link"""
+        self._rxT0 = time.perf_counter()
+        self.semaTX.release()
+
+    def send(self, vDat, reset=True, flush=True, trailReset=False) -> None:
+        """
+        Send list of bytes over the serial link (a single write).
+        flush - Drain the stale bytes of failed commands first (set to False when other replies are expected).
+        trailReset - Append the reset command.
+        """
         self.semaTX.acquire()
         if ( self.LINK == True):
-            done = False
-            while done == False:
-                try:
-                    self.ser.flushInput() #self.ser.read(32) #self.uart_flush() #Make sure RX is empty
-                    done = True
-                except serial.serialutil.SerialException:
-                    self.try_to_open_new_port()
-                    pass
+            if flush and self.rxStale:
+                self.resync()
 
             if self.pyVer < 3.0:
                 if reset == True:
@@ -103,94 +152,375 @@ class ArduBridgeComm():
                         vStr += ( chr(self.ESC) +chr(swap_c) )
                     else:
                         vStr += ( chr(c) )
+                if trailReset:
+                    vStr += chr(self.RST)
 
             else:
-                if reset == True:
-                    vStr = bytes([self.RST])
-                else:
-                    vStr = bytes()
-                for c in vDat:
-                    if ( (c == self.ESC) or (c == self.RST) ):
-                        swap_c = ((c&0xf)<<4) +((c>>4)&0xf)
-                        vStr += bytes( [self.ESC, swap_c] )
-                    else:
-                        vStr += bytes( [c] )
+                vStr = BridgeCodec.escape(vDat, reset=reset)
+                if trailReset:
+                    vStr += bytes([self.RST])
             self.uart_wr( vStr )
+            self.counters.tx(len(vDat), len(vStr))
+            if len(vDat) > 0:
+                self._rxOp = vDat[0]
+            self._rxFirst = True
+            self._rxT0 = time.perf_counter()
         self.semaTX.release()
 
+    def _transact(self, vDat, N, reset=True, trailReset=False) -> tuple:
+        reply = (self.GOOD, [])
+        with self.lock:
+            self.send(vDat, reset=reset, trailReset=trailReset)
+            if N > 0:
+                reply = self.receive(N, reset=reset)
+        if self.link.down:
+            raise self.link.error() #< The link was lost during the transaction
+        return reply
+
+    def _onWorker(self):
+        """Returns the I/O worker thread if the request should be queued to it, otherwise None"""
+        worker = self.worker #< May be stopped by another thread
+        if (worker != None) and (threading.current_thread() != worker):
+            return worker
+        return None
+
+    def transact(self, vDat, N, reset=True) -> tuple:
+        """Atomic send of a command and receive of its N bytes reply. Returns (status, data) like receive()"""
+        if self.link.down:
+            raise self.link.error()
+        if self.pipe != None:
+            return self.pipe.submit(vDat, N, reset=reset).result()
+        if self.getBatch() != None:
+            return self.submit(vDat, N, reset=reset).result()
+        return self.call(self._transact, vDat, N, reset)
+
+    def submit(self, vDat, N, parser=None, reset=True, trailReset=False) -> Future:
+        """
+        Send a command with a reply of N bytes, returns a future of parser((status, data)).
+        The future is already done when neither the pipelined mode nor the I/O worker are active.
+        While the link is down the future fails at once with LinkDownError.
+        """
+        if self.link.down:
+            fut = Future()
+            fut.set_exception(self.link.error())
+            return fut
+        batch = self.getBatch()
+        if batch != None:
+            return batch.add(vDat, N, parser=parser, reset=reset, trailReset=trailReset)
+        if self.pipe != None:
+            return self.pipe.submit(vDat, N, parser=parser, reset=reset, trailReset=trailReset)
+        worker = self._onWorker()
+        if worker != None:
+            return worker.submit(self._transact, (vDat, N, reset, trailReset), parser=parser)
+        return self.done(self.call(self._transact, vDat, N, reset, trailReset), parser)
+
+    def done(self, reply, parser=None) -> Future:
+        """Returns a completed future of parser(reply), for commands that are not sent"""
+        return BridgePipeline.complete(Future(), reply, parser)
+
+    def gather(self, futures, parser=None) -> Future:
+        """Returns a future of parser([result of every future]), for the methods that are made of several commands"""
+        return self.done([fut.result() for fut in futures], parser)
+
+    def call(self, func, *args, **kwargs):
+        """Execute func(*args, **kwargs) with exclusive access to the link (for multi stage transactions)"""
+        if self.link.down:
+            raise self.link.error()
+        batch = self.getBatch()
+        if batch != None:
+            batch.flush() #< Keep the order of the commands
+        worker = self._onWorker()
+        if worker != None:
+            return worker.execute(func, *args, **kwargs)
+        with self.lock:
+            if self.pipe != None:
+                self.pipe.drain()
+            return func(*args, **kwargs)
+
+    def getID(self, timeout=None):
+        """
+        Request the ID of the board, returns the ID string (ending with '\\n') or False.
+        timeout - Receive timeout of the first reply byte (sec), None for the adaptive timeout.
+        """
+        return self.call(self._getID, timeout)
+
+    def _getID(self, timeout=None):
+        with self.lock:
+            self.send([ord('?')])
+            reply = self.receive(1, timeout=timeout) #< Length of the ID
+            if reply[0] == self.GOOD:
+                N = reply[1][0]
+                reply = self.receive(N, timeout=self.rtt.rtoMin +N*10.0/self.baud) #< Bulk read of the ID
+                if reply[0] == self.GOOD:
+                    return ''.join([chr(c) for c in reply[1]]) +'\n'
+            if timeout != None:
+                self.rxOwed = 0 #< Polling (board boot), drop what is buffered without waiting for a late ID
+            return False
+
+    def _transactMany(self, vCmd) -> list:
+        """
+        Send the commands vCmd [(vDat, N, reset, trailReset), ...] in a single write and
+        receive all their replies in a single read. Returns the list of (status, data) replies.
+        """
+        with self.lock:
+            vStr = bytearray()
+            timeout = 0.0
+            total = 0
+            rxReset = True
+            for vDat, N, reset, trailReset in vCmd:
+                vStr += BridgeCodec.escape(vDat, reset=reset)
+                if trailReset:
+                    vStr.append(self.RST)
+                if N > 0:
+                    timeout += self.rxTimeout(vDat[0], N)
+                    total += N
+                    rxReset = rxReset and reset
+            self.semaTX.acquire()
+            if self.LINK and self.rxStale:
+                self.resync()
+            self.uart_wr( bytes(vStr) )
+            self.counters.tx(len(vStr) -len(vCmd), len(vStr), len(vCmd)) #< Approximate payload, one RST per frame
+            self._rxFirst = True
+            self._rxT0 = time.perf_counter()
+            self.semaTX.release()
+
+            status, vDat = (self.GOOD, [])
+            if not self.LINK:
+                status = self.ERR_LINK
+            elif total > 0:
+                timeout += len(vStr)*10.0/self.baud #< The last command is executed after all the frames were sent
+                status, vDat = self.receive(total, reset=rxReset, op=self.BATCH_OP, timeout=timeout)
+            if len(vDat) < total:
+                vDat = [-1]*total
+
+            replies = []
+            idx = 0
+            for cmd in vCmd:
+                N = cmd[1]
+                dat = vDat[idx:idx +N]
+                if (status == self.GOOD) or ((status != self.ERR_LINK) and ((N == 0) or (dat[-1] != -1))): #< All the bytes of this reply arrived
+                    replies.append( (self.GOOD, dat) )
+                else:
+                    replies.append( (status, dat) )
+                idx += N
+            return replies
+
+    def getBatch(self):
+        """Returns the batch of the calling thread (None if not in a batch context)"""
+        return getattr(self._tls, 'batch', None)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context that collects the commands of the calling thread and sends them in a single write
+        when it ends, e.g: with comm.batch() as batch: ... (see BridgeBatch)
+        """
+        batch = self.getBatch()
+        if batch != None:
+            yield batch #< Nested batch
+            return
+        from GSOF_ArduBridge import BridgeBatch #< Imported on first use
+        batch = BridgeBatch.ArduBridgeBatch(self)
+        self._tls.batch = batch
+        try:
+            yield batch
+        finally:
+            self._tls.batch = None
+            batch.flush()
+
+    def startPipeline(self, window=4) -> None:
+        """Enable the pipelined mode with up to window commands in flight"""
+        with self.lock:
+            if self.pipe == None:
+                self.pipe = BridgePipeline.ArduBridgePipeline(self, window=window)
+
+    def stopPipeline(self) -> None:
+        """Wait for the commands in flight and return to the blocking mode"""
+        with self.lock:
+            if self.pipe != None:
+                self.pipe.stop()
+                self.pipe = None
+
+    def getPriority(self) -> int:
+        """Returns the priority class of the calling thread"""
+        return getattr(self._tls, 'prio', self.PRIO_NORMAL)
+
+    def setPriority(self, prio) -> None:
+        """Set the priority class (PRIO_RT, PRIO_NORMAL, PRIO_BULK) of the calling thread transactions"""
+        self._tls.prio = prio
+
+    @contextlib.contextmanager
+    def priority(self, prio):
+        """Context to execute transactions at the given priority class, e.g: with comm.priority(comm.PRIO_BULK):"""
+        old = self.getPriority()
+        self.setPriority(prio)
+        try:
+            yield self
+        finally:
+            self.setPriority(old)
+
+    def getPriorityStats(self) -> dict:
+        """Returns the number of transactions, the average and worst-case wait time (sec) of every priority class"""
+        return self.waitStats.get()
+
+    def startWorker(self) -> 'BridgeWorker.ArduBridgeWorker':
+        """Start the I/O worker thread, from now on all the transactions are executed by it"""
+        if self.worker == None:
+            from GSOF_ArduBridge import BridgeWorker #< Imported on first use
+            self.worker = BridgeWorker.ArduBridgeWorker(self)
+            self.worker.start()
+        return self.worker
+
+    def stopWorker(self) -> None:
+        """Serve the queued requests and stop the I/O worker thread, the requests queued later fail with RuntimeError"""
+        worker = self.worker
+        if worker != None:
+            worker.stop()
+            self.worker = None
+
     def getByte(self) -> list:
         """Returns a list with single byte received over the serial link"""
-        c = []
-        trail = self.RxTry
-        while (len(c)==0) and (trail > 0):
+        return self.getBytes(1)
+
+    def getBytes(self, N, deadline=None) -> bytes:
+        """Returns up to N bytes received over the serial link until the deadline (bulk read, retry on a short read)"""
+        if deadline == None:
+            deadline = time.perf_counter() +self.rtt.rtoMax
+        buf = bytearray()
+        while len(buf) < N:
             try:
-                c = self.ser.read(1)
-            except serial.serialutil.SerialException:
-                self.try_to_open_new_port()
-                c = []
-                pass
+                c = self.ser.read(N -len(buf))
+            except serial.serialutil.SerialException as e:
+                self.try_to_open_new_port(e)
+                break
 
-            trail -= 1
-        if len(c) == 0:
+            if len(c) > 0:
+                buf += c
+                if self.trace != None:
+                    self.trace.rx(c)
+            elif time.perf_counter() > deadline:
+                break
+        if (len(buf) < N) and self.LINK:
             if self.logger != None:
                 self.logger.warning('Error - %s RX timeout'%(self.ser.port))
-        return c
-        
-    def receive(self, N, reset=True) -> list:
-        """Returns a list with maximum N received bytes with timeout of 0.1 sec"""
+        return buf
+
+    def rxTimeout(self, op, N) -> float:
+        """Returns the receive timeout (sec) of N bytes reply of the command class op"""
+        if self.adaptiveTimeout:
+            return self.rtt.rto(op) +N*10.0/self.baud #< Plus the time of the reply on the wire
+        return self.rtt.rtoMax
+
+    def getRttStats(self) -> dict:
+        """Returns the smoothed round-trip time, its variance and the receive timeout (sec) of every command class"""
+        return self.rtt.get()
+
+    def receive(self, N, reset=True, op=None, t0=None, timeout=None) -> list:
+        """
+        Returns a list with maximum N received bytes.
+        The deadline is t0 (the time of the last send by default) +the receive timeout of the command class op
+        (or the given timeout, in which case the round-trip time is not measured).
+        The round-trip time and the latency statistics are measured once per command, by its first reply
+        (or when t0 is given), the later stages of a multi stage reply are timed from the end of the previous stage.
+        """
         N = int(N)
         self.semaRX.acquire()
         vDat = [-1]*N
         if (self.LINK == True):
-            i = 0
-            while i<N:
-                c = self.getByte()
-                
-                if (len(c) == 0):
-                    self.semaRX.release()
-                    return (self.ERR_BYTE, vDat) #< Error missing bytes
-                c = ord(c)
-                
-                if (c == self.ESC):
-                    c = self.getByte()
-                    if (len(c) == 0):
-                        self.semaRX.release()
-                        return (self.ERR_BYTE, vDat)
-
-                    elif (c == self.RST) and reset:
-                        #print('Error - Received RST from Arduino-Bridge\n')
-                        self.semaRX.release()
-                        return (self.ERR_RST, vDat) #< In case of missing bytes, return (0, vDat)
-
-                    c = ord(c)
-                    c = ((c&0xf)<<4) +((c>>4)&0xf) #Swapping the value after ESC
-                    
-                elif (c == self.RST) and reset:
+            first = self._rxFirst or (t0 != None)
+            self._rxFirst = False
+            if op == None:
+                op = self._rxOp
+            if t0 == None:
+                t0 = self._rxT0
+            if timeout == None:
+                deadline = max(t0, time.perf_counter() -self.rtt.rtoMax) +self.rxTimeout(op, N)
+            else:
+                deadline = t0 +timeout
+            raw = bytearray()
+            need = N #< At least N more escaped bytes are expected
+            while need > 0:
+                c = self.getBytes(need, deadline)
+                raw += c
+                status, dat, pending = BridgeCodec.unescape(raw, reset=reset)
+                vDat[:len(dat)] = dat
+                if status == self.ERR_RST:
                     #print('Error - Received RST from Arduino-Bridge\n')
+                    self.counters.rstRx += 1
+                    self.expectStale(N -len(dat))
                     self.semaRX.release()
                     return (self.ERR_RST, vDat) #< In case of missing bytes, return (0, vDat)
 
-                vDat[i] = c
-                i += 1
-            self.semaRX.release()
-            return (self.GOOD, vDat) #< In case of all GOOD, return (1, vDat)
-        if self.logger != None:
+                if not self.LINK:
+                    break #< The link was lost during the read
+                if len(c) < need:
+                    self.counters.timeouts += 1
+                    if timeout == None:
+                        self.rtt.backoff(op)
+                    self.expectStale(N -len(dat))
+                    self.semaRX.release()
+                    return (self.ERR_BYTE, vDat) #< Error missing bytes
+                need = N -len(dat) #< Every escape sequence delays one decoded byte
+            else:
+                now = time.perf_counter()
+                self.counters.rx(op, N, len(raw), (now -t0) if first else None)
+                if first and (timeout == None):
+                    self.rtt.sample(op, now -t0)
+                self._rxT0 = now #< The next reply (of a multi stage transaction) is timed from here
+                self.semaRX.release()
+                return (self.GOOD, vDat) #< In case of all GOOD, return (1, vDat)
+        if (self.logger != None) and (not self.link.down):
             self.logger.critical('Error - %s is closed'%(self.ser.port))
         self.semaRX.release()
         return (self.ERR_LINK,[]) #< In case of link error return (-1, ())
 
+    def expectStale(self, N) -> None:
+        """N reply bytes of a failed command may still arrive, drain them before the next command"""
+        self.rxOwed += max(N, 0)
+        self.rxStale = True
+
+    def resync(self) -> int:
+        """
+        Discard the stale bytes in the RX buffer, returns the number of discarded bytes.
+        Waits until the owed bytes of the failed commands arrived (or the maximal receive
+        timeout expired) and discards everything that is already in the buffer.
+        """
+        stale = bytearray()
+        if self.LINK:
+            deadline = time.perf_counter() +self.rtt.rtoMax
+            try:
+                #Every escape sequence is a single reply byte
+                while (len(stale) -stale.count(self.ESC) < self.rxOwed) and (time.perf_counter() < deadline):
+                    stale += self.ser.read(self.rxOwed -len(stale) +stale.count(self.ESC))
+                stale += self.ser.read(self.ser.in_waiting)
+            except serial.serialutil.SerialException as e:
+                self.try_to_open_new_port(e)
+        n = len(stale)
+        if (n > 0) and (self.trace != None):
+            self.trace.rx(stale)
+        self.counters.resyncs += 1
+        self.counters.staleBytes += n
+        if (n > 0) and (self.logger != None):
+            self.logger.info('%s resync, %d stale bytes discarded'%(self.ser.port, n))
+        self.rxOwed = 0
+        self.rxStale = False
+        return n
+
     def ReportLinkStatus(self, val) -> None:
-        """Returns True is serial link is active"""
+        """Set the link status and report it to the LinkReport callback"""
         self.LINK = val
         if (self.LinkReport):
             self.LinkReport(val)
         
     def OpenClosePort(self, val) -> None:
         """Open (1) or close (0) the serial link"""
+        self.link.stop() #< The user takes over the port
         if (val):
             try:
                 self.ser.open()
                 self.LINK = True
+                self.rxStale = True #< Drop whatever the board sent before
+                self.invalidateShadow()
                 if self.logger != None:
                     self.logger.info('ArduBridge COM is open')
                 
@@ -209,44 +539,124 @@ class ArduBridgeComm():
             if self.logger != None:
                 self.logger.critical('ArduBridge COM is closed')
 
-    def try_to_open_new_port(self) -> None:
-        """Retry to open the serial link every 0.5 sec"""
-        self.ser.close()
-        while self.ser.isOpen() == False:
-            if self.logger != None:
-                self.logger.critical('COM is dead!! - retry a connection')
+    def try_to_open_new_port(self, reason='') -> None:
+        """The link is lost, close the port and reconnect it in the background (returns at once)"""
+        if self.link.down:
+            return
+        self.ReportLinkStatus(False)
+        try:
+            self.ser.close()
+        except serial.serialutil.SerialException:
+            pass
+        self.link.lost(reason)
+
+    def _reopen(self, handshake=2.5):
+        """
+        Reconnect attempt of the link supervisor, returns the ID of the board or False.
+        The ID is polled for up to handshake sec after the port was opened (the board may reset).
+        """
+        with self.semaTX, self.semaRX:
             try:
+                self.ser.close()
                 self.ser.open()
+            except (serial.serialutil.SerialException, OSError):
+                return False
+            self.rxOwed = 0
+            self.rxStale = True #< Drop whatever the board sent before
+            self.invalidateShadow() #< The board may have been reset
+            self.LINK = True
+        ID = False
+        deadline = time.perf_counter() +handshake
+        while (ID == False) and self.LINK and (time.perf_counter() < deadline):
+            ID = self._getID(timeout=self.ID_POLL) #< The requests fail fast until the link is up, nothing else is sent
+        if ID == False:
+            self.LINK = False
+            try:
+                self.ser.close()
             except serial.serialutil.SerialException:
-                time.sleep(0.5)
                 pass
-        if self.logger != None:
-            self.logger.info('COM connection reastablished!!')
+            return False
+        self.ReportLinkStatus(True)
+        return ID
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the link counters (see BridgeStats), the number of reconnects
+        and the latency statistics (sec) of every command class
+        """
+        res = self.counters.snapshot()
+        res['reconnects'] = self.link.reconnects
+        res['linkDowns'] = self.link.downs
+        return res
+
+    def resetStats(self) -> None:
+        """Clear the link counters"""
+        self.counters.reset()
+
+    def startStatsDump(self, period=10.0, func=None) -> 'BridgeStats.StatsDump':
+        """Call func(stats()) every period sec (log the statistics by default)"""
+        self.stopStatsDump()
+        if func == None:
+            def func(res):
+                if self.logger != None:
+                    self.logger.info('%s stats: %s'%(self.COM, res))
+                else:
+                    print(res)
+        self.statsDump = BridgeStats.StatsDump(self.stats, period, func)
+        self.statsDump.start()
+        return self.statsDump
+
+    def stopStatsDump(self) -> None:
+        dump = self.statsDump
+        if dump != None:
+            dump.stop()
+            self.statsDump = None
+
+    def startTrace(self, fileName, size=4*1024*1024) -> 'BridgeTrace.TraceRecorder':
+        """Record the wire traffic to the trace file, a ring of size bytes (see BridgeTrace)"""
+        from GSOF_ArduBridge import BridgeTrace
+        self.stopTrace()
+        self.trace = BridgeTrace.TraceRecorder(fileName, size)
+        return self.trace
+
+    def stopTrace(self) -> None:
+        trace = self.trace
+        if trace != None:
+            self.trace = None
+            trace.close()
+
+    def getLinkStats(self) -> dict:
+        """Returns the link state, number of outages and reconnections and the downtime statistics (see BridgeLink)"""
+        return self.link.getStats()
 
     def uart_flush(self) -> None:
         """Flash the serial FIFO"""
+        self.counters.flushes += 1
         if (self.LINK):
             v=[1]
             while len(v) > 0:
                 try:
                     v = self.ser.read(32)
-                except serial.serialutil.SerialException:
-                    comm = self.try_to_open_new_port()
-                    v = [1]
+                    if (len(v) > 0) and (self.trace != None):
+                        self.trace.rx(v)
+                except serial.serialutil.SerialException as e:
+                    self.try_to_open_new_port(e)
+                    v = []
 
     def uart_wr(self, dat) -> None:
         """Send list of bytes over the serial link, attempt to open the link if closed"""
         if (self.LINK):
             try:
                 self.ser.write(dat)
+                if self.trace != None:
+                    self.trace.tx(dat)
                 
             except serial.SerialTimeoutException:
                 if self.logger != None:
                     self.logger.warning('Error - %s TX timeout'%(self.ser.port))
                 pass
             
-            except serial.serialutil.SerialException:
-                comm = self.try_to_open_new_port()
-                pass
+            except serial.serialutil.SerialException as e:
+                self.try_to_open_new_port(e)
 
            
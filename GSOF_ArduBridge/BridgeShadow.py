@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Output-state shadow of the bridge objects (ArduBridgeComm, AsyncArduBridgeComm).
+The GPIO and analog drivers record the last commanded (and acknowledged) output state of
+every pin, {pin: (cmd, val), ('D', pin): mode}, and skip the writes of unchanged values.
+The shadow is disabled (None) until setShadow() is called, then every method is a no-op.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+class OutputShadow():
+    """Base class of the bridge objects, the class must define GOOD"""
+    shadow = None #< {pin: (cmd, val), ('D', pin): mode} last commanded output state, None when disabled
+
+    def setShadow(self, enable=True) -> None:
+        """Enable (or disable) the output-state shadow, unchanged GPIO/PWM/servo writes are skipped"""
+        self.shadow = {} if enable else None
+
+    def invalidateShadow(self) -> None:
+        """Forget the commanded output state (after a reset or a reconnect)"""
+        shadow = self.shadow
+        if shadow != None:
+            shadow.clear()
+
+    def shadowed(self, key, state) -> bool:
+        """Returns True if state is the last commanded (and acknowledged) state of key"""
+        shadow = self.shadow
+        return (shadow != None) and (shadow.get(key) == state)
+
+    def shadowUpdate(self, key, state, status) -> None:
+        """Record the commanded state of key after its write was acknowledged (or forget it if the write failed)"""
+        shadow = self.shadow
+        if shadow != None:
+            if status == self.GOOD:
+                shadow[key] = state
+            else:
+                shadow.pop(key, None)
+
+    def shadowForget(self, key) -> None:
+        shadow = self.shadow
+        if shadow != None:
+            shadow.pop(key, None)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Link statistics of the ArduBridgeComm object.
+The counters are plain integers updated by the send/receive code (no lock, a few
+hundred ns per frame, a racing update of another thread may rarely be lost), the snapshot() method converts them to a dictionary:
+frames and bytes sent and received, the escape expansion ratio (bytes on the wire
+per payload byte), receive timeouts, RST receptions, flushes, resyncs and the
+latency histogram of every command class (the first byte of the command, e.g. 'O', 'A', '2').
+
+The latency histogram has power of 2 buckets in us, bucket k counts the replies
+with a latency in [2^(k-1), 2^k) us. The percentiles of the snapshot are the upper
+bounds of their buckets.
+
+StatsDump calls a function (logger.info by default) with the snapshot periodically:
+dump = comm.startStatsDump(period=10.0)
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import time, threading
+
+BUCKETS = 64 #< Any latency fits, no range check on the hot path
+
+class LinkCounters():
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all the counters"""
+        self.t0 = time.perf_counter()
+        self.framesTx = 0
+        self.bytesTx = 0     #< Bytes on the wire
+        self.payloadTx = 0   #< Command bytes before escaping
+        self.framesRx = 0
+        self.bytesRx = 0
+        self.payloadRx = 0
+        self.timeouts = 0
+        self.rstRx = 0
+        self.flushes = 0
+        self.resyncs = 0
+        self.staleBytes = 0  #< Bytes discarded by resync
+        self.hist = {}       #< {op: [sum, max, bucket0, bucket1, ...]}
+
+    def tx(self, payload, wire, frames=1) -> None:
+        self.framesTx += frames
+        self.payloadTx += payload
+        self.bytesTx += wire
+
+    def rx(self, op, payload, wire, dt=None) -> None:
+        """
+        A reply of payload bytes (wire bytes with the escape codes) was received after dt sec.
+        dt is None for the later stages of a multi stage reply, they are not counted as frames.
+        """
+        self.payloadRx += payload
+        self.bytesRx += wire
+        if dt == None:
+            return
+        self.framesRx += 1
+        try:
+            h = self.hist[op]
+        except KeyError:
+            h = self.hist[op] = [0.0, 0.0] +[0]*BUCKETS
+        h[0] += dt
+        if dt > h[1]:
+            h[1] = dt
+        h[2 +int(dt*1e6).bit_length()] += 1
+
+    def snapshot(self) -> dict:
+        """Returns the counters, the escape expansion ratios and the latency statistics (sec) of every command class"""
+        latency = {}
+        for op, h in list(self.hist.items()):
+            h = list(h)
+            buckets = h[2:]
+            count = sum(buckets)
+            name = chr(op) if isinstance(op, int) else op
+            latency[name] = {'count': count,
+                             'avg':   h[0]/max(count, 1),
+                             'max':   h[1],
+                             'p50':   percentile(buckets, 0.5),
+                             'p99':   percentile(buckets, 0.99),
+                             'buckets': {(1 << k): n for k, n in enumerate(buckets) if n > 0}}
+        return {'time':        time.perf_counter() -self.t0,
+                'framesTx':    self.framesTx,
+                'bytesTx':     self.bytesTx,
+                'payloadTx':   self.payloadTx,
+                'escapeRatioTx': self.bytesTx/max(self.payloadTx, 1),
+                'framesRx':    self.framesRx,
+                'bytesRx':     self.bytesRx,
+                'payloadRx':   self.payloadRx,
+                'escapeRatioRx': self.bytesRx/max(self.payloadRx, 1),
+                'timeouts':    self.timeouts,
+                'rstRx':       self.rstRx,
+                'flushes':     self.flushes,
+                'resyncs':     self.resyncs,
+                'staleBytes':  self.staleBytes,
+                'latency':     latency}
+
+def percentile(buckets, q) -> float:
+    """Returns the upper bound (sec) of the bucket of the q quantile"""
+    total = sum(buckets)
+    if total == 0:
+        return 0.0
+    acc = 0
+    for k, n in enumerate(buckets):
+        acc += n
+        if acc >= q*total:
+            return (1 << k)*1e-6
+    return (1 << (len(buckets) -1))*1e-6
+
+class StatsDump(threading.Thread):
+    """Call func(snapshot) every period sec until stop()"""
+    def __init__(self, getStats, period=10.0, func=None):
+        threading.Thread.__init__(self)
+        self.name = 'ArduBridgeStats'
+        self.daemon = True
+        self.getStats = getStats
+        self.period = period
+        self.func = func
+        self._quit = threading.Event()
+
+    def stop(self) -> None:
+        self._quit.set()
+        if threading.current_thread() != self:
+            self.join()
+
+    def run(self) -> None:
+        while not self._quit.wait(self.period):
+            self.func(self.getStats())
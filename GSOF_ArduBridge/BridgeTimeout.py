@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Adaptive receive timeout of the ArduBridgeComm object.
+The round-trip time (RTT) of every command class (the first byte of the command, e.g. 'O', 'A', '2')
+is tracked as in TCP (RFC-6298):
+SRTT   <- (1 -1/8)*SRTT +1/8*RTT
+RTTVAR <- (1 -1/4)*RTTVAR +1/4*|SRTT -RTT|
+RTO     = SRTT +max(4*RTTVAR, rtoMin), limited to rtoMax
+The SRTT holds the firmware execution time and the reply time on the wire, rtoMin is the
+margin for the USB-serial latency, so a command with a steady RTT is never timed out early.
+Until the first reply of a class is received its RTO is rtoMax.
+After a timeout the RTTVAR of the class is doubled (back-off), so slow legitimate
+commands quickly get a longer deadline.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+class RttEstimator():
+    ALPHA = 1.0/8
+    BETA  = 1.0/4
+    K     = 4
+
+    def __init__(self, rtoMin=0.015, rtoMax=0.375):
+        self.rtoMin = rtoMin
+        self.rtoMax = rtoMax
+        self.rtt = {} #< {command-class: [SRTT, RTTVAR]}
+
+    def rto(self, op) -> float:
+        """Returns the receive timeout (sec) of the command class"""
+        rtt = self.rtt.get(op)
+        if rtt == None:
+            return self.rtoMax
+        rto = rtt[0] +max(self.K*rtt[1], self.rtoMin)
+        if rto > self.rtoMax:
+            return self.rtoMax
+        return rto
+
+    def sample(self, op, t) -> None:
+        """Update the class with a measured round-trip time t (sec)"""
+        rtt = self.rtt.get(op)
+        if rtt == None:
+            self.rtt[op] = [t, t/2]
+        else:
+            rtt[1] += self.BETA*(abs(rtt[0] -t) -rtt[1])
+            rtt[0] += self.ALPHA*(t -rtt[0])
+
+    def backoff(self, op) -> None:
+        """A reply of the class timed out"""
+        rtt = self.rtt.get(op)
+        if rtt != None:
+            rtt[1] = min(max(2*rtt[1], self.rtoMin), self.rtoMax)
+
+    def reset(self) -> None:
+        self.rtt = {}
+
+    def get(self) -> dict:
+        """Returns {command-class: {'srtt', 'rttvar', 'rto'}} (sec)"""
+        res = {}
+        for op, rtt in list(self.rtt.items()):
+            name = op
+            if type(op) == int:
+                name = chr(op)
+            res[name] = {'srtt':rtt[0], 'rttvar':rtt[1], 'rto':self.rto(op)}
+        return res
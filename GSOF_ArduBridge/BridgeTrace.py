@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Binary wire trace of the ArduBridgeComm object.
+TraceRecorder appends the bytes sent and received over the link (as they are on the wire,
+with the escape codes) to a preallocated memory-mapped file that is used as a ring: when
+it is full the oldest records are overwritten, so a long production run keeps its last
+minutes of traffic. A record is copied into the mapping, no system call is made.
+
+comm.startTrace('run.trace', size=4*1024*1024)
+...
+comm.stopTrace()
+
+File format (little endian):
+Header (64 bytes) - magic 'GSOFTRC1', version (H), reserved (H), data size (Q),
+                    head (Q), tail (Q), record count (Q), start time (d, time.time())
+Record            - time since the start (d, sec), direction (B, 0=TX 1=RX), length (H), data
+A record with the direction 0xFF (or no room for a record header) marks the end of the
+ring, the next record is at the beginning of the data area.
+
+ReplayTransport plays a trace back as a fake port (COM="replay://run.trace", add "?fast"
+to skip the recorded delays): the recorded replies become readable after the command
+that preceded them was written, with the recorded latency or at once.
+replayTraffic() sends the recorded commands of a trace to a (real or emulated) board
+and measures the replies, to benchmark with production traffic.
+
+python -m GSOF_ArduBridge.BridgeTrace run.trace prints the records of a trace.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import sys, time, mmap, struct, threading
+import serial
+from GSOF_ArduBridge import BridgeTransport
+
+MAGIC = b'GSOFTRC1'
+VERSION = 1
+HEADER = struct.Struct('<8sHHQQQQd')
+HEADER_SIZE = 64
+RECORD = struct.Struct('<dBH')
+TX = 0
+RX = 1
+WRAP = 0xFF
+MAX_DATA = 0xFFFF
+
+class TraceRecorder():
+    def __init__(self, fileName, size=4*1024*1024):
+        """Create (or overwrite) the trace file with a ring of size bytes"""
+        self.fileName = fileName
+        self.size = size
+        self.lock = threading.Lock()
+        self.f = open(fileName, 'w+b')
+        self.f.truncate(HEADER_SIZE +size) #< Preallocated, a sparse file on most file-systems
+        self.mm = mmap.mmap(self.f.fileno(), HEADER_SIZE +size)
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+        self.t0 = time.perf_counter()
+        self.wallT0 = time.time()
+        self._header()
+
+    def _header(self) -> None:
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, 0, self.size, self.head, self.tail, self.count, self.wallT0)
+
+    def _dropTail(self) -> None:
+        """Drop the oldest record"""
+        pos = self.tail
+        if pos +RECORD.size <= self.size:
+            t, direction, N = RECORD.unpack_from(self.mm, HEADER_SIZE +pos)
+            if direction != WRAP:
+                self.tail = pos +RECORD.size +N
+                self.count -= 1
+                if self.count == 0:
+                    self.tail = self.head
+                return
+        self.tail = 0 #< End of the ring
+
+    def _reserve(self, N) -> int:
+        """Returns the position of a record of N bytes, drops the records it overwrites"""
+        if self.head +N > self.size:
+            #Drop the records up to the end of the ring and start over
+            while (self.count > 0) and (self.tail >= self.head):
+                self._dropTail()
+            if self.head +RECORD.size <= self.size:
+                RECORD.pack_into(self.mm, HEADER_SIZE +self.head, 0.0, WRAP, 0)
+            self.head = 0
+            if self.count == 0:
+                self.tail = 0
+        while (self.count > 0) and (self.head <= self.tail < self.head +N):
+            self._dropTail()
+        pos = self.head
+        self.head += N
+        return pos
+
+    def record(self, direction, dat) -> None:
+        """Append a TX or RX record of the bytes dat"""
+        if len(dat) == 0:
+            return
+        t = time.perf_counter() -self.t0
+        with self.lock:
+            if self.mm == None:
+                return
+            for i in range(0, len(dat), MAX_DATA):
+                chunk = dat[i:i +MAX_DATA]
+                N = RECORD.size +len(chunk)
+                if N > self.size:
+                    return
+                pos = HEADER_SIZE +self._reserve(N)
+                RECORD.pack_into(self.mm, pos, t, direction, len(chunk))
+                self.mm[pos +RECORD.size:pos +N] = chunk
+                self.count += 1
+            self._header()
+
+    def tx(self, dat) -> None:
+        self.record(TX, dat)
+
+    def rx(self, dat) -> None:
+        self.record(RX, dat)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.mm != None:
+                self._header()
+                self.mm.flush()
+                self.mm.close()
+                self.mm = None
+                self.f.close()
+
+def read(fileName) -> list:
+    """Returns the records of a trace file [(time, direction, bytes), ...] from the oldest"""
+    with open(fileName, 'rb') as f:
+        buf = f.read()
+    magic, version, reserved, size, head, tail, count, wallT0 = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError('%s is not an ArduBridge trace'%(fileName))
+    records = []
+    pos = tail
+    while len(records) < count:
+        if pos +RECORD.size > size:
+            pos = 0
+            continue
+        t, direction, N = RECORD.unpack_from(buf, HEADER_SIZE +pos)
+        if direction == WRAP:
+            pos = 0
+            continue
+        start = HEADER_SIZE +pos +RECORD.size
+        records.append( (t, direction, buf[start:start +N]) )
+        pos += RECORD.size +N
+    return records
+
+class ReplayTransport(BridgeTransport.Transport):
+    """
+    Fake port that plays back a trace. The written bytes are matched against the recorded
+    commands (mismatches are counted), the replies that followed a command are readable
+    after it was written, with the recorded latency divided by speed (or at once if speed is 0).
+    """
+    def __init__(self, fileName, speed=1.0, timeout=0.015):
+        BridgeTransport.Transport.__init__(self, 'replay://' +fileName, timeout=timeout)
+        self.fileName = fileName
+        self.speed = speed
+        self.records = []
+        self.idx = 0
+        self.written = bytearray()
+        self.pending = [] #< (ready time, bytes) of the released replies
+        self.rx = bytearray()
+        self.mismatches = 0
+
+    def open(self) -> None:
+        try:
+            self.records = read(self.fileName)
+        except (OSError, ValueError) as e:
+            raise serial.SerialException('Could not open %s: %s'%(self.port, e))
+        self.idx = 0
+        self.written = bytearray()
+        self.pending = []
+        self.rx = bytearray()
+        self._release(time.perf_counter(), None) #< Whatever the board sent before the first command
+        self.is_open = True
+
+    def _release(self, now, tCmd) -> None:
+        """Release the recorded replies up to the next command, tCmd is the recorded time of the last command"""
+        while (self.idx < len(self.records)) and (self.records[self.idx][1] == RX):
+            t, direction, dat = self.records[self.idx]
+            ready = now
+            if (tCmd != None) and (self.speed > 0):
+                ready = now +(t -tCmd)/self.speed
+            self.pending.append( (ready, dat) )
+            self.idx += 1
+
+    def _poll(self) -> float:
+        """Move the replies that are due to the RX buffer, returns the time of the next one (or None)"""
+        now = time.perf_counter()
+        while (len(self.pending) > 0) and (self.pending[0][0] <= now):
+            self.rx += self.pending.pop(0)[1]
+        if len(self.pending) > 0:
+            return self.pending[0][0]
+        return None
+
+    def done(self) -> bool:
+        """Returns True when all the recorded traffic was played"""
+        return (self.idx >= len(self.records)) and (len(self.pending) == 0)
+
+    @property
+    def in_waiting(self) -> int:
+        self._poll()
+        return len(self.rx)
+
+    def read(self, N) -> bytes:
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        if N <= 0:
+            return b''
+        if len(self.rx) == 0:
+            tNext = self._poll()
+            if (len(self.rx) == 0) and (tNext != None) and (tNext -time.perf_counter() < self.timeout):
+                time.sleep(max(tNext -time.perf_counter(), 0.0))
+                self._poll()
+            elif (len(self.rx) == 0) and self.timeout:
+                time.sleep(self.timeout)
+        dat = bytes(self.rx[:N])
+        del self.rx[:N]
+        return dat
+
+    def write(self, dat) -> int:
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        now = time.perf_counter()
+        self.written += dat
+        while (self.idx < len(self.records)) and (self.records[self.idx][1] == TX):
+            t, direction, cmd = self.records[self.idx]
+            if len(self.written) < len(cmd):
+                break
+            if self.written[:len(cmd)] != cmd:
+                self.mismatches += 1
+            del self.written[:len(cmd)]
+            self.idx += 1
+            self._release(now, t)
+        return len(dat)
+
+def replayTraffic(fileName, comm, realtime=False) -> dict:
+    """
+    Send the recorded commands of the trace to the board of comm (with the recorded gaps if realtime),
+    the recorded number of reply bytes is read after every command.
+    Returns the number of commands, the replies that differ from the recorded ones and the reply latency (sec).
+    """
+    records = read(fileName)
+    latency = []
+    mismatches = 0
+    tStart = time.perf_counter()
+    tFirst = None
+    with comm.lock:
+        comm.resync()
+        i = 0
+        while i < len(records):
+            t, direction, cmd = records[i]
+            i += 1
+            if direction != TX:
+                continue
+            expected = bytearray()
+            while (i < len(records)) and (records[i][1] == RX):
+                expected += records[i][2]
+                i += 1
+            if tFirst == None:
+                tFirst = t
+            if realtime:
+                delay = tStart +(t -tFirst) -time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            comm.uart_wr(cmd)
+            reply = comm.getBytes(len(expected), t0 +comm.rtt.rtoMax)
+            latency.append(time.perf_counter() -t0)
+            if reply != expected:
+                mismatches += 1
+                comm.expectStale(len(expected) -len(reply))
+                comm.resync()
+    n = max(len(latency), 1)
+    latency.sort()
+    return {'commands':   len(latency),
+            'mismatches': mismatches,
+            'avg':        sum(latency)/n,
+            'p50':        latency[len(latency)//2] if len(latency) > 0 else 0.0,
+            'max':        latency[-1] if len(latency) > 0 else 0.0,
+            'total':      time.perf_counter() -tStart}
+
+if __name__ == "__main__":
+    for t, direction, dat in read(sys.argv[1]):
+        print('%12.6f %s %s'%(t, 'TX' if direction == TX else 'RX', dat.hex(' ')))
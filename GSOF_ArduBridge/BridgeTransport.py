@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Transport layer of the ArduBridgeComm object.
+A transport is any object with the subset of the serial.Serial interface that is used
+by ArduBridgeComm: port, open(), close(), isOpen(), read(N), write(dat) and in_waiting.
+Errors are reported with the pyserial exceptions (serial.SerialException and
+serial.SerialTimeoutException), so the link recovery code works with every backend.
+
+The backend is selected by the COM string (see create()):
+"COM3", "/dev/ttyUSB0"     - pyserial (serial.Serial)
+"fd:///dev/ttyUSB0"        - Raw file descriptor configured with termios (POSIX), lower overhead than pyserial
+"tcp://host:port"          - TCP socket, e.g. a ser2net server of a remote board
+"loop://"                  - In-process loopback to a Python firmware model (BridgeEmulator.ArduBridgeFirmware)
+"replay://run.trace"       - Play back a recorded wire trace, "?fast" skips the recorded delays (BridgeTrace)
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import os, time, select
+import serial
+
+def create(COM, baud=115200*2, timeout=0.015, writeTimeout=0.1, interByteTimeout=None):
+    """Returns a closed transport for the COM string"""
+    url = str(COM)
+    if url.startswith('loop://'):
+        return LoopbackTransport(timeout=timeout)
+    if url.startswith('tcp://'):
+        return TcpTransport(url, timeout=timeout, writeTimeout=writeTimeout)
+    if url.startswith('replay://'):
+        from GSOF_ArduBridge import BridgeTrace
+        fileName, sep, option = url[len('replay://'):].partition('?')
+        return BridgeTrace.ReplayTransport(fileName, speed=(0.0 if option == 'fast' else 1.0), timeout=timeout)
+    if url.startswith('fd://'):
+        return FdTransport(url[len('fd://'):], baud, timeout=timeout, writeTimeout=writeTimeout)
+    ser = serial.Serial(None,
+                        baud,
+                        timeout=timeout,
+                        writeTimeout=writeTimeout,
+                        inter_byte_timeout=interByteTimeout
+                        )
+    ser.port = COM
+    return ser
+
+class Transport():
+    """Base class of the non pyserial backends"""
+    def __init__(self, port, timeout=0.015, writeTimeout=0.1):
+        self.port = port
+        self.timeout = timeout
+        self.writeTimeout = writeTimeout
+        self.is_open = False
+
+    def isOpen(self) -> bool:
+        return self.is_open
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    @property
+    def in_waiting(self) -> int:
+        return 0
+
+    def read(self, N) -> bytes:
+        raise NotImplementedError
+
+    def write(self, dat) -> int:
+        raise NotImplementedError
+
+    def reset_input_buffer(self) -> None:
+        """Discard the received bytes"""
+        while self.in_waiting > 0:
+            self.read(self.in_waiting)
+
+    def flushInput(self) -> None:
+        self.reset_input_buffer()
+
+class FdTransport(Transport):
+    """Serial port accessed with os.read/os.write on a raw (termios) file descriptor"""
+    def __init__(self, port, baud=115200*2, timeout=0.015, writeTimeout=0.1):
+        Transport.__init__(self, port, timeout=timeout, writeTimeout=writeTimeout)
+        self.baud = baud
+        self.fd = -1
+
+    def open(self) -> None:
+        import termios, tty
+        try:
+            self.fd = os.open(self.port, os.O_RDWR |os.O_NOCTTY |os.O_NONBLOCK)
+        except OSError as e:
+            raise serial.SerialException('Could not open port %s: %s'%(self.port, e))
+        tty.setraw(self.fd)
+        speed = getattr(termios, 'B%d'%(self.baud), None)
+        if speed == None:
+            os.close(self.fd)
+            raise serial.SerialException('Baud-rate %d is not supported by termios'%(self.baud))
+        attr = termios.tcgetattr(self.fd)
+        attr[4] = speed #< ispeed
+        attr[5] = speed #< ospeed
+        attr[2] |= termios.CLOCAL |termios.CREAD
+        termios.tcsetattr(self.fd, termios.TCSANOW, attr)
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+        self.is_open = True
+
+    def close(self) -> None:
+        if self.is_open:
+            self.is_open = False
+            os.close(self.fd)
+            self.fd = -1
+
+    def fileno(self) -> int:
+        return self.fd
+
+    @property
+    def in_waiting(self) -> int:
+        import fcntl, termios, struct
+        try:
+            return struct.unpack('I', fcntl.ioctl(self.fd, termios.TIOCINQ, b'\0\0\0\0'))[0]
+        except OSError as e:
+            raise serial.SerialException('%s: %s'%(self.port, e))
+
+    def read(self, N) -> bytes:
+        """Returns up to N bytes, waits up to timeout for the first byte"""
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        if N <= 0:
+            return b''
+        try:
+            dat = os.read(self.fd, N)
+            if (len(dat) == 0) and (self.timeout != 0):
+                if len(select.select([self.fd], [], [], self.timeout)[0]) > 0:
+                    dat = os.read(self.fd, N)
+                    if len(dat) == 0:
+                        raise serial.SerialException('%s disconnected'%(self.port))
+            return dat
+        except BlockingIOError:
+            if len(select.select([self.fd], [], [], self.timeout)[0]) > 0:
+                return self.read(N)
+            return b''
+        except OSError as e:
+            raise serial.SerialException('%s: %s'%(self.port, e))
+
+    def write(self, dat) -> int:
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        view = memoryview(dat)
+        deadline = time.perf_counter() +self.writeTimeout
+        n = 0
+        while n < len(view):
+            try:
+                n += os.write(self.fd, view[n:])
+            except BlockingIOError:
+                timeout = deadline -time.perf_counter()
+                if (timeout <= 0) or (len(select.select([], [self.fd], [], timeout)[1]) == 0):
+                    raise serial.SerialTimeoutException('Write timeout')
+            except OSError as e:
+                raise serial.SerialException('%s: %s'%(self.port, e))
+        return n
+
+class TcpTransport(Transport):
+    """TCP socket to a serial server (e.g. ser2net in raw mode), url is tcp://host:port"""
+    def __init__(self, url, timeout=0.015, writeTimeout=0.1):
+        Transport.__init__(self, url, timeout=timeout, writeTimeout=writeTimeout)
+        host, port = url[len('tcp://'):].rsplit(':', 1)
+        self.address = (host.strip('[]'), int(port))
+        self.sock = None
+
+    def open(self) -> None:
+        import socket #< Only the TCP transport needs it
+        try:
+            self.sock = socket.create_connection(self.address, timeout=max(self.writeTimeout, 1.0))
+        except OSError as e:
+            raise serial.SerialException('Could not connect to %s: %s'%(self.port, e))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) #< Every command is sent at once
+        self.sock.settimeout(self.timeout)
+        self.is_open = True
+
+    def close(self) -> None:
+        if self.is_open:
+            self.is_open = False
+            self.sock.close()
+            self.sock = None
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    @property
+    def in_waiting(self) -> int:
+        import socket
+        try:
+            if len(select.select([self.sock], [], [], 0)[0]) == 0:
+                return 0
+            return len(self.sock.recv(65536, socket.MSG_PEEK))
+        except OSError as e:
+            raise serial.SerialException('%s: %s'%(self.port, e))
+
+    def read(self, N) -> bytes:
+        import socket
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        if N <= 0:
+            return b''
+        try:
+            dat = self.sock.recv(N)
+        except socket.timeout:
+            return b''
+        except OSError as e:
+            raise serial.SerialException('%s: %s'%(self.port, e))
+        if len(dat) == 0:
+            raise serial.SerialException('%s disconnected'%(self.port))
+        return dat
+
+    def write(self, dat) -> int:
+        import socket
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        try:
+            self.sock.settimeout(self.writeTimeout)
+            self.sock.sendall(dat)
+        except socket.timeout:
+            raise serial.SerialTimeoutException('Write timeout')
+        except OSError as e:
+            raise serial.SerialException('%s: %s'%(self.port, e))
+        finally:
+            if self.sock != None:
+                self.sock.settimeout(self.timeout)
+        return len(dat)
+
+class LoopbackTransport(Transport):
+    """
+    In-process link to a firmware model (BridgeEmulator.ArduBridgeFirmware by default).
+    The written frames are passed to the model without copying, its replies are ready at once.
+    """
+    def __init__(self, firmware=None, timeout=0.015):
+        Transport.__init__(self, 'loop://', timeout=timeout)
+        if firmware == None:
+            from GSOF_ArduBridge import BridgeEmulator
+            firmware = BridgeEmulator.ArduBridgeFirmware()
+        self.fw = firmware
+        self.rx = bytearray()
+        self.pos = 0 #< Read position in rx
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.rx) -self.pos
+
+    def read(self, N) -> bytes:
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        if N <= 0:
+            return b''
+        if self.pos >= len(self.rx):
+            if self.timeout:
+                time.sleep(self.timeout) #< Nothing more will arrive, like a serial read that timed out
+            return b''
+        dat = bytes(self.rx[self.pos:self.pos +N])
+        self.pos += len(dat)
+        if self.pos >= len(self.rx):
+            self.rx.clear()
+            self.pos = 0
+        return dat
+
+    def write(self, dat) -> int:
+        if not self.is_open:
+            raise serial.SerialException('%s is closed'%(self.port))
+        for cmd, vDat in self.fw.feed(memoryview(dat)):
+            self.rx += vDat
+        return len(dat)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Deadline based software waveform scheduler.
+The events [(time, pin, value), ...] (time in sec from the start) are dispatched against
+the monotonic clock (time.perf_counter) with a coarse sleep followed by a busy-wait
+(Sleep_us.sleepUntil), so the edges do not drift with the scheduler latency or with
+the duration of the previous writes.
+The edge is assumed to happen in the middle of the blocking write (the command reached
+the board), every write is issued earlier by the measured half write time (moving average
+per number of written pins).
+Events with the same time are sent together with setPins (one round trip) when it is given.
+
+wave = BridgeWaveform.WaveformScheduler(ardu.gpio.setPin, ardu.gpio.setPins)
+report = wave.run(BridgeWaveform.pulseTrain(13, onTime=0.01, offTime=0.02, count=10))
+print(report['maxError'])
+
+The report holds the requested and the estimated time of every edge (sec from the start).
+The edges are not observed, the estimate is the middle of the write and the edge is within
++/- half of the write time of it (the 'uncertainty' of the report).
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import time, threading
+from GSOF_ArduBridge import Sleep_us
+
+def pulseTrain(pin, onTime, offTime=0.0, count=1, t0=0.0) -> list:
+    """Returns the events of count pulses of onTime sec with offTime sec between them"""
+    events = []
+    t = t0
+    for i in range(count):
+        events.append( (t, pin, 1) )
+        events.append( (t +onTime, pin, 0) )
+        t += onTime +offTime
+    return events
+
+class WaveformScheduler():
+    ALPHA = 1.0/8 #< Moving average coefficient of the write time
+
+    def __init__(self, setPin, setPins=None, lead=None, tWrite=None):
+        """
+        setPin(pin, val) - Blocking write of a single pin
+        setPins({pin: val, ...}) - Optional blocking write of several pins
+        lead - Time (sec) from run() to the first event, by default twice the write time
+        tWrite - Initial estimate of the write time of a pin (sec), measured by the first write if None
+        """
+        self.setPin = setPin
+        self.setPins = setPins
+        self.lead = lead
+        self.tWrite = {} #< {number of pins: average write time (sec)}
+        if tWrite != None:
+            self.tWrite[1] = tWrite
+        self.lock = threading.Lock() #< One waveform at a time
+
+    def latency(self, N=1) -> float:
+        """Returns the estimated time (sec) from the start of a write of N pins to the edge on the pins"""
+        tWrite = self.tWrite.get(N)
+        if tWrite == None:
+            if (N == 1) or (self.setPins == None):
+                return N*self.tWrite.get(1, 0.0)/2
+            tWrite = self.tWrite.get(1, 0.0) #< At least one round trip
+        return tWrite/2
+
+    def _write(self, vals) -> tuple:
+        """Write the pins, returns the estimated time of the edge and its uncertainty (half of the write time)"""
+        t = time.perf_counter()
+        if (len(vals) > 1) and (self.setPins != None):
+            self.setPins(vals)
+        else:
+            for pin, val in vals.items():
+                self.setPin(pin, val)
+        dt = time.perf_counter() -t
+        N = len(vals)
+        if N not in self.tWrite:
+            self.tWrite[N] = dt
+        else:
+            self.tWrite[N] += self.ALPHA*(dt -self.tWrite[N])
+        return (t +dt/2, dt/2)
+
+    def run(self, events) -> dict:
+        """
+        Dispatch the events [(time, pin, value), ...] (time in sec from the start).
+        Returns {'edges': [(pin, value, requested, estimated), ...], 'maxError', 'avgError', 'uncertainty', 'latency'} (sec),
+        the errors are the ones of the estimated edge times, the edges are within +/- uncertainty of their estimate
+        """
+        groups = {}
+        for t, pin, val in events:
+            groups.setdefault(t, {})[pin] = val
+        edges = []
+        uncertainty = 0.0
+        with self.lock:
+            lead = self.lead
+            if lead == None:
+                lead = 2*max(list(self.tWrite.values()) +[0.0])
+            tStart = time.perf_counter() +lead
+            for t in sorted(groups):
+                vals = groups[t]
+                Sleep_us.sleepUntil(tStart +t -self.latency(len(vals)))
+                tEdge, dt = self._write(vals)
+                uncertainty = max(uncertainty, dt)
+                for pin, val in vals.items():
+                    edges.append( (pin, val, t, tEdge -tStart) )
+        errors = [abs(estimated -requested) for pin, val, requested, estimated in edges]
+        return {'edges':       edges,
+                'maxError':    max(errors) if len(errors) > 0 else 0.0,
+                'avgError':    sum(errors)/max(len(errors), 1),
+                'uncertainty': uncertainty,
+                'latency':     self.latency()}
+
+    def pulse(self, pin, onTime) -> dict:
+        """Single pulse of onTime sec, returns the report of run()"""
+        return self.run(pulseTrain(pin, onTime))
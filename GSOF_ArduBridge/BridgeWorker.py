@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Serial I/O worker thread of the ArduBridgeComm object.
+The worker is the only thread that accesses the serial port. Other threads
+(e.g. threadPID, threadElectrodeSeq, UDP triggered commands) put requests in
+its queue, and every request (a complete send+receive transaction) is executed
+atomically. Requests are served by the priority class of the thread that queued
+them (see BridgeArbiter) and in the order they were queued within the same class.
+The future of each request holds its queueing time (tQueue) and service time (tService) in seconds,
+the getStats() method returns the accumulated statistics.
+
+Use ArduBridgeComm.startWorker() to enable it.
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import threading, queue, time, itertools
+from concurrent.futures import Future
+from GSOF_ArduBridge import BridgeArbiter
+
+class ArduBridgeWorker(threading.Thread):
+    def __init__(self, comm):
+        threading.Thread.__init__(self)
+        self.name = 'ArduBridgeWorker'
+        self.daemon = True
+        self.comm = comm
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count() #< FIFO order within the same priority class
+        self.running = True
+        self.runLock = threading.Lock() #< No request is queued after the worker stopped
+        self.statLock = threading.Lock()
+        self.resetStats()
+
+    def resetStats(self) -> None:
+        """Clear the accumulated statistics"""
+        with self.statLock:
+            self.requests = 0
+            self.tQueueSum = 0.0
+            self.tQueueMax = 0.0
+            self.tServiceSum = 0.0
+            self.tServiceMax = 0.0
+
+    def getStats(self) -> dict:
+        """Returns the number of requests, average and maximum queueing and service times (sec)"""
+        with self.statLock:
+            n = max(self.requests, 1)
+            return {'requests':   self.requests,
+                    'pending':    self.queue.qsize(),
+                    'tQueueAvg':  self.tQueueSum/n,
+                    'tQueueMax':  self.tQueueMax,
+                    'tServiceAvg':self.tServiceSum/n,
+                    'tServiceMax':self.tServiceMax}
+
+    def submit(self, func, args=(), kwargs={}, parser=None) -> Future:
+        """Queue the request func(*args, **kwargs), returns a future of parser(result)"""
+        fut = Future()
+        fut.tQueue = 0.0
+        fut.tService = 0.0
+        prio = self.comm.getPriority()
+        with self.runLock:
+            if not self.running:
+                fut.set_exception(self.stoppedError())
+                return fut
+            self.queue.put( (prio, next(self.seq), (func, args, kwargs, parser, fut, time.perf_counter(), prio)) )
+        return fut
+
+    def stoppedError(self) -> RuntimeError:
+        return RuntimeError('%s was stopped'%(self.name))
+
+    def execute(self, func, *args, **kwargs):
+        """Execute the request func(*args, **kwargs) on the worker thread and return its result"""
+        if threading.current_thread() == self:
+            return func(*args, **kwargs)
+        return self.submit(func, args, kwargs).result()
+
+    def stop(self) -> None:
+        """Serve the queued requests and terminate the thread, the requests queued later fail with RuntimeError"""
+        self.queue.put( (len(BridgeArbiter.PRIO_NAME), next(self.seq), None) ) #< After all the requests
+        if threading.current_thread() != self:
+            self.join()
+
+    def run(self) -> None:
+        """Serve the requests one at a time"""
+        while True:
+            req = self.queue.get()[2]
+            if req == None:
+                with self.runLock:
+                    self.running = False
+                self._failQueued()
+                return
+            func, args, kwargs, parser, fut, tQueued, prio = req
+            tStart = time.perf_counter()
+            self.comm.setPriority(prio)
+            self.comm.lock.acquire(record=False)
+            failed = False
+            try:
+                if self.comm.link.down:
+                    res = self.comm.link.error() #< Fail fast, the link is reconnected in the background
+                    failed = True
+                else:
+                    if self.comm.pipe != None:
+                        self.comm.pipe.drain()
+                    res = func(*args, **kwargs)
+                    if parser != None:
+                        res = parser(res)
+            except Exception as e:
+                res = e
+                failed = True
+            finally:
+                self.comm.lock.release()
+            tEnd = time.perf_counter()
+            self.comm.waitStats.record(prio, tStart -tQueued)
+
+            fut.tQueue = tStart -tQueued
+            fut.tService = tEnd -tStart
+            with self.statLock:
+                self.requests += 1
+                self.tQueueSum += fut.tQueue
+                self.tServiceSum += fut.tService
+                if fut.tQueue > self.tQueueMax:
+                    self.tQueueMax = fut.tQueue
+                if fut.tService > self.tServiceMax:
+                    self.tServiceMax = fut.tService
+
+            if failed:
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    def _failQueued(self) -> None:
+        """Fail the requests that were queued behind the stop request"""
+        while True:
+            try:
+                req = self.queue.get_nowait()[2]
+            except queue.Empty:
+                return
+            if req != None:
+                req[4].set_exception(self.stoppedError())
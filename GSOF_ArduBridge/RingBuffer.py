@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+    This file is part of GSOF_ArduBridge.
+
+    GSOF_ArduBridge is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    GSOF_ArduBridge is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with GSOF_ArduBridge.  If not, see <https://www.gnu.org/licenses/>.
+
+Fixed size ring buffer of records backed by a preallocated array.array.
+Every record (width values) is written twice, at its ring position and size records
+after it, so the last n records are always contiguous in memory: latest(n) and since(seq)
+return memoryview slices of the array without copying (numpy.asarray(view) is zero-copy too).
+A view is only valid until the writer overwrites its records (size records later).
+Timestamps (time.perf_counter) of the records are kept in a second ring of doubles.
+
+ring = RingBuffer(1000, typecode='H', width=2)
+ring.append((512, 498), time.perf_counter())
+t, v = ring.latest(10) #< v.tolist() == [..., 512, 498], t holds 10 timestamps
+"""
+
+__version__ = "1.0.0"
+__author__ = "Guy Soffer"
+__copyright__ = "Copyright 2019"
+__credits__ = [""]
+__license__ = "GPL-3.0-or-later"
+__maintainer__ = ""
+__email__ = "gsoffer@yahoo.com"
+__status__ = "Production"
+
+import array
+
+class RingBuffer():
+    def __init__(self, size, typecode='H', width=1):
+        """size - Number of records, typecode - array.array type of the values, width - Values per record"""
+        self.size = size
+        self.width = width
+        self.data = array.array(typecode, [0])*(2*size*width)
+        self.time = array.array('d', [0.0])*(2*size)
+        self.count = 0 #< Number of records written since the start (the sequence number of the next record)
+
+    def append(self, values, t=0.0) -> None:
+        """Add a record (a sequence of width values, or a single value if width is 1)"""
+        w = self.width
+        idx = self.count %self.size
+        if w == 1:
+            if isinstance(values, (list, tuple)):
+                values = values[0] #< A single channel scan
+            self.data[idx] = values
+            self.data[idx +self.size] = values
+        else:
+            i = idx*w
+            j = (idx +self.size)*w
+            self.data[i:i +w] = array.array(self.data.typecode, values)
+            self.data[j:j +w] = self.data[i:i +w]
+        self.time[idx] = t
+        self.time[idx +self.size] = t
+        self.count += 1
+
+    def __len__(self) -> int:
+        """Returns the number of records in the buffer"""
+        return min(self.count, self.size)
+
+    def _view(self, first, n) -> tuple:
+        """Returns (timestamps, values) views of n records starting at the sequence number first"""
+        start = first %self.size #< start +n <= 2*size
+        return (memoryview(self.time)[start:start +n],
+                memoryview(self.data)[start*self.width:(start +n)*self.width])
+
+    def latest(self, n=None) -> tuple:
+        """Returns (timestamps, values) memoryviews of the last n records (all the records if None), oldest first"""
+        if (n == None) or (n > len(self)):
+            n = len(self)
+        return self._view(self.count -n, n)
+
+    def since(self, seq) -> tuple:
+        """Returns (timestamps, values, seq) of the records written from the sequence number seq, and the next sequence number"""
+        count = self.count
+        first = max(seq, count -self.size) #< The older records were overwritten
+        return self._view(first, count -first) +(count,)
+
+    def last(self):
+        """Returns the last record (a tuple of width values, or a single value) or None"""
+        if self.count == 0:
+            return None
+        t, v = self.latest(1)
+        if self.width == 1:
+            return v[0]
+        return tuple(v)
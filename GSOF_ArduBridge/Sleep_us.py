@@ -1,7 +1,15 @@
 import time
 
+SPIN = 0.002 #< The last part of a wait is a busy-wait (sec), longer than the OS scheduler latency
+
 def sleep_us(microseconds):
     # Busy wait in loop because delays are generally very short (few microseconds).
-    end = time.time() + (microseconds/1000000.0)
-    while time.time() < end:
+    sleepUntil(time.perf_counter() + (microseconds/1000000.0))
+
+def sleepUntil(deadline, spin=SPIN):
+    """Wait until time.perf_counter() reaches the deadline, coarse sleep followed by a busy-wait of up to spin sec"""
+    coarse = deadline -spin -time.perf_counter()
+    if coarse > 0:
+        time.sleep(coarse)
+    while time.perf_counter() < deadline:
         pass
@@ -5,3 +5,11 @@
 # (C) 2019 Guy Soffer <gsoffer@yahoo.com>
 
 VERSION = '101'
+
+def requireNumpy():
+    """Returns the numpy module, the optional dependency of the curve fits and of the numpy views"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('numpy is required, install it with: pip install GSOF_ArduBridge[numpy]')
+    return numpy
@@ -27,11 +27,12 @@ __license__ = "GPL-3.0-or-later"
 __maintainer__ = ""
 __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
-import time
+from GSOF_ArduBridge import BridgeWaveform
 
 class HVSW_Driver_base():
     def __init__(self, startPin, endPin):
         self.assignPinRange(startPin, endPin)
+        self.wave = BridgeWaveform.WaveformScheduler(self.setPin) #< Deadline based pulsePin
         
     def assignPinRange(self, startPin, endPin):
         self.startPin = startPin
@@ -59,7 +60,5 @@ class HVSW_Driver_base():
 
     def pulsePin(self, pin, onTime=1.0) -> None:
         """Pulse the the specific pin# on the Electrode-Driver-Stack of onTime (sec)"""
-        if self._checkPin(pin):
-            self.setPin(pin, 1)
-            time.sleep(onTime)
-            self.setPin(pin, 0)
+        if self._checkPin(pin) >= 0:
+            self.wave.pulse(pin, onTime)
@@ -32,6 +32,8 @@ The least significant bit of the byte corresponds to the first output pin and th
 
 getPin(self, pin): Reads the current state of a single input pin and returns it as a 0 or 1.
 
+getPins(self, pins): Reads the state of several input pins with a single read of the port.
+
 digitalRead(self, pin): Alias for getPin.
 
 setPin(self, pin, val): Sets the state of a single output pin to either 0 or 1.
@@ -44,10 +46,13 @@ togglePin(self, pin): Inverts the state of a single output pin.
 If the pin is currently 0, it sets it to 1, and if it is currently 1, it sets it to 0.
 """
 
+from GSOF_ArduBridge import BridgeWaveform
+
 class PCF8574():
     def __init__(self, i2c, dev=0x20):
         self.i2c = i2c
         self.dev = dev
+        self.wave = BridgeWaveform.WaveformScheduler(self.digitalWrite) #< Deadline based pinPulse
 
     def _checkPin(self, pin):
         """Helper method that checks if a pin number within the range 0 to 7"""
@@ -73,6 +78,12 @@ class PCF8574():
             return  1
         return 0
 
+    def getPins(self, pins) -> dict:
+        """Returns the state of several input pins {pin: 0 or 1} read with a single read of the port"""
+        pins = [self._checkPin(pin) for pin in pins]
+        port = self.getPort()
+        return {pin: (port >>pin) &1 for pin in pins}
+
     def digitalRead(self, pin) -> int:
         """Alias for getPin"""
         return self.getPin(pin)
@@ -98,9 +109,7 @@ class PCF8574():
 
     def pinPulse(self, pin, onTime) -> int:
         """Pulse the the specific pin# on the arduino GPO"""
-        self.digitalWrite(pin, 1)
-        time.sleep(onTime)
-        self.digitalWrite(pin, 0)
+        self.wave.pulse(pin, onTime)
         return 1
 
     def togglePin(self, pin) -> None:
@@ -21,6 +21,8 @@ To stop the thread use the objects mothod stop() e.g: Obj.stop()
 To pause the thread use the objects mothod start() e.g: Obj.pause()
 To continue the thread use the objects mothod cont() e.g: Obj.cont()
 Your code should be located in the rocess method
+A cycle that fails because the bridge link is down (BridgeLink.LinkDownError) is skipped
+and reported once by the linkDown() method, the thread keeps running.
 """
 
 __version__ = "1.0.0"
@@ -33,6 +35,7 @@ __email__ = "gsoffer@yahoo.com"
 __status__ = "Production"
 
 import threading, time
+from GSOF_ArduBridge import BridgeLink
 
 class BasicThread(threading.Thread):
     """Thread class with a stop() method. The thread itself has to check
@@ -50,6 +53,7 @@ class BasicThread(threading.Thread):
         self.cycles = -1
         self.viewer = viewer
         self.lock = threading.Semaphore(True)
+        self.linkOk = True
         if self.is_alive == None:
             self.is_alive = self.isAlive
 
@@ -110,7 +114,11 @@ class BasicThread(threading.Thread):
             self.lock.acquire(True)
             if self.enable:
                 ## \/ Code begins below \/
-                self.process()
+                try:
+                    self.process()
+                    self.linkOk = True
+                except BridgeLink.LinkDownError as e:
+                    self.linkDown(e)
                 ## /\  Code ends above  /\
 
             ## *** Calculating how much time to wait until the next execution ***
@@ -132,6 +140,12 @@ class BasicThread(threading.Thread):
         self.enable = False
         self.teleUpdate('%s: Terminated\n'%(self.name))
 
+    def linkDown(self, e):
+        """Called instead of a cycle that failed because the bridge link is down"""
+        if self.linkOk:
+            self.linkOk = False
+            self.teleUpdate('%s: %s - Skipping cycles'%(self.name, e))
+
     def process(self):
         """The code that should be periodically executed is here"""
         ## \/ Code begins below \/
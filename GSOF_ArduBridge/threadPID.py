@@ -33,7 +33,6 @@ __status__ = "Production"
 import math, time
 from GSOF_ArduBridge import threadBasic as BT
 from GSOF_ArduBridge import PidAlgorithm
-from GSOF_ArduBridge import movAvg
 
 class ArduPidThread(BT.BasicThread):
     """Stand alone real-time PID temperature controller (thread)"""
@@ -54,6 +53,8 @@ class ArduPidThread(BT.BasicThread):
 
         if self.ardu:
             self.ardu.gpio.pinMode(self.dirPin, 0) #Set the pins direction to output
+            self.ardu.an.setOversampling(self.fbPin, n=16, mode='trimmed') #< Feedback noise filter
+        self.fbNoise = 0.0      #< Noise of the last feedback read (LSB)
         self.enOut = False
         self.enInput = True
 
@@ -74,9 +75,6 @@ class ArduPidThread(BT.BasicThread):
 
         self.Rise_tolerance = 2
         self.Settle_tolerance = 1
-
-        #Moving avarage for the feedback signal
-        self.fbFilter = movAvg.Stat_Recursive_X_Array( X=[25]*4 )
         
     def enIO(self, val=True):
         """"""
@@ -92,6 +90,12 @@ class ArduPidThread(BT.BasicThread):
         else:
             print('%s: Started OFF line'%(self.name))
 
+    def run(self):
+        """Run the controller with real-time priority on the bridge"""
+        if self.ardu:
+            self.ardu.comm.setPriority(self.ardu.comm.PRIO_RT)
+        BT.BasicThread.run(self)
+
     def process(self):
         """The controllers code"""
         ## \/ Code begins below \/
@@ -99,8 +103,6 @@ class ArduPidThread(BT.BasicThread):
         feedback = 25.0
         if self.enInput:
             feedback = self.getFeedback()
-        self.fbFilter.step(feedback)
-        feedback = fbFilter.Ex()
         
         #Calculate the control-loop
         dt = time.time() -self.T_Z[1] #Calculate the DT value
@@ -161,7 +163,7 @@ class ArduPidThread(BT.BasicThread):
     def getFeedback(self):
         """Read the feedback (temperature sensor)"""
         #Steinhart formula
-        Tbin = self.ardu.an.analogRead(self.fbPin)
+        Tbin, self.fbNoise = self.ardu.an.analogReadOversampled(self.fbPin)
         if (Tbin <= 0) or (Tbin >= 1023):
             print('TempSensor out of range! Tbin == %d'%(Tbin))
             Tbin = 950
@@ -47,6 +47,9 @@ class ArduPidThread(BT.BasicThread):
         self.ardu = bridge      #The Arduino-Bridge object
         self.outFunc = outFunc  #The function to control the output signals to the electronics
         self.fbPin = fbPin      #Pin# that should be read as the feedback
+        self.fbNoise = 0.0      #Noise of the last feedback read (LSB)
+        if self.ardu:
+            self.ardu.an.setOversampling(self.fbPin, n=16, mode='trimmed') #Feedback noise filter
         self.ct = 25.0          #Init value of target value
         self.ct_now = self.ct
         self.RC_div_DT = 22.0   #Period #Exponential pulse-shaping coef'
@@ -91,6 +94,12 @@ class ArduPidThread(BT.BasicThread):
         else:
             print('%s: Started OFF line'%(self.name))
 
+    def run(self) -> None:
+        """Run the controller with real-time priority on the bridge"""
+        if self.ardu:
+            self.ardu.comm.setPriority(self.ardu.comm.PRIO_RT)
+        BT.BasicThread.run(self)
+
     def process(self) -> None:
         """The controllers"""
         #Get the feedback
@@ -164,7 +173,7 @@ class ArduPidThread(BT.BasicThread):
     def getFeedback(self) -> float:
         """Read the feedback (temperature sensor)"""
         #Steinhart formula
-        Tbin = self.ardu.an.analogRead(self.fbPin)
+        Tbin, self.fbNoise = self.ardu.an.analogReadOversampled(self.fbPin)
         if (Tbin <= 0) or (Tbin >= 1023):
             print('TempSensor out of range! Tbin == %d'%(Tbin))
             Tbin = 950
@@ -0,0 +1,78 @@
+"""Fixtures of the tests, the bridge runs on the in-process loopback transport (loop://)"""
+
+import time, threading, collections, logging
+import pytest
+from GSOF_ArduBridge import ArduBridge, BridgeTransport, BridgeEmulator
+
+class StallTransport(BridgeTransport.LoopbackTransport):
+    """
+    Loopback transport that can hold back replies, delay(cmd) returns the delay (sec) of the reply.
+    The following replies wait behind a delayed one, like on a serial link.
+    """
+    def __init__(self, firmware=None, timeout=0.015):
+        BridgeTransport.LoopbackTransport.__init__(self, firmware=firmware, timeout=timeout)
+        self.delay = None
+        self.lock = threading.Lock()
+        self.queue = collections.deque() #< (release time, reply bytes)
+
+    def _release(self) -> None:
+        now = time.perf_counter()
+        while (len(self.queue) > 0) and (self.queue[0][0] <= now):
+            self.rx += self.queue.popleft()[1]
+
+    @property
+    def in_waiting(self) -> int:
+        with self.lock:
+            self._release()
+            return len(self.rx) -self.pos
+
+    def read(self, N) -> bytes:
+        deadline = time.perf_counter() +(self.timeout or 0.0)
+        while True:
+            with self.lock:
+                self._release()
+                if (N <= 0) or (len(self.rx) > self.pos):
+                    return BridgeTransport.LoopbackTransport.read(self, N)
+            if time.perf_counter() >= deadline:
+                return b''
+            time.sleep(0.0005)
+
+    def write(self, dat) -> int:
+        with self.lock:
+            now = time.perf_counter()
+            for cmd, vDat in self.fw.feed(memoryview(bytes(dat))):
+                t = now +(self.delay(cmd) if self.delay != None else 0.0)
+                if len(self.queue) > 0:
+                    t = max(t, self.queue[-1][0]) #< In order
+                self.queue.append( (t, vDat) )
+            self._release()
+        return len(dat)
+
+def openBridge(transport=None, **kwargs):
+    ardu = ArduBridge.ArduBridge(COM='loop://', transport=transport, consoleHandler=False, logLevel=logging.CRITICAL, **kwargs)
+    ardu.OpenClosePort(1)
+    return ardu
+
+@pytest.fixture
+def ardu():
+    """Bridge on the loopback transport, ardu.comm.ser.fw is the firmware model"""
+    ardu = openBridge()
+    yield ardu
+    ardu.OpenClosePort(0)
+
+@pytest.fixture
+def stall():
+    """Bridge on a StallTransport, returns (ardu, transport)"""
+    tr = StallTransport()
+    ardu = openBridge(transport=tr)
+    yield (ardu, tr)
+    ardu.OpenClosePort(0)
+
+@pytest.fixture
+def emulator():
+    """Firmware emulator on a pseudo-terminal (POSIX), emulator.port is the port name"""
+    pytest.importorskip('tty')
+    emu = BridgeEmulator.ArduBridgeEmulator()
+    emu.start()
+    yield emu
+    emu.stop()
@@ -0,0 +1,78 @@
+"""Multi-channel analog acquisition (BridgeAcquisition) on the loopback firmware model"""
+
+import time
+import pytest
+from GSOF_ArduBridge import BridgeAcquisition
+
+def acquisition(ardu, **kwargs):
+    fw = ardu.comm.ser.fw
+    for pin in range(4):
+        fw.analog[pin] = 100*pin +5
+    return BridgeAcquisition.AnalogAcquisition(ardu.an, pins=[3, 0], **kwargs)
+
+def test_acquisition_scan_rate(ardu):
+    acq = acquisition(ardu, rate=200.0)
+    acq.start()
+    time.sleep(0.5)
+    acq.stop()
+    stats = acq.getStats()
+    assert stats['errors'] == 0
+    assert 0.7*acq.rate < stats['achieved'] < 1.1*acq.rate
+    t, v = acq.latest()
+    assert len(t) == stats['scans']
+    dt = sorted([t[i +1] -t[i] for i in range(len(t) -1)])
+    assert dt[len(dt)//2] == pytest.approx(1.0/acq.rate, rel=0.2) #< Median scan period
+    assert list(v[-2:]) == [305, 5]
+
+def test_acquisition_stream(ardu):
+    acq = acquisition(ardu, rate=500.0)
+    acq.start()
+    try:
+        scans = 0
+        tLast = 0.0
+        for t, v in acq.stream(duration=0.2):
+            assert len(v) == 2*len(t)
+            assert list(v) == [305, 5]*len(t)
+            assert t[0] > tLast #< No scan is yielded twice
+            tLast = t[-1]
+            scans += len(t)
+        assert scans > 0
+    finally:
+        acq.stop()
+    assert list(acq.stream()) == [] #< Ends when the acquisition stopped
+
+def test_acquisition_stream_skips_overwritten_scans(ardu):
+    acq = acquisition(ardu, rate=1000.0, history=8)
+    acq.start()
+    try:
+        stream = acq.stream()
+        t, v = next(stream)
+        first = acq.ring.count
+        time.sleep(0.1) #< Much more than history scans
+        t, v = next(stream)
+        assert acq.ring.count -first > 8 #< The ring was overwritten
+        assert len(t) == 8 #< Only the scans that are still in the ring, the newest ones
+        assert len(v) == 16
+        assert list(t) == sorted(t)
+        latest, vLatest = acq.latest(8)
+        assert t[-1] <= latest[-1]
+    finally:
+        acq.stop()
+
+def test_acquisition_pipelined_stream(ardu):
+    ardu.comm.startPipeline(4)
+    acq = acquisition(ardu, rate=500.0, depth=4)
+    acq.start()
+    try:
+        scans = sum([len(t) for t, v in acq.stream(duration=0.2)])
+    finally:
+        acq.stop()
+        ardu.comm.stopPipeline()
+    assert scans > 0
+    assert acq.getStats()['errors'] == 0
+    assert list(acq.latest(1)[1]) == [305, 5]
+
+def test_acquisition_stream_before_start(ardu):
+    acq = acquisition(ardu)
+    with pytest.raises(RuntimeError):
+        acq.stream()
@@ -0,0 +1,31 @@
+"""Oversampled analog reads (ArduAnalog) on the firmware model"""
+
+import random, statistics
+import pytest
+from GSOF_ArduBridge import ArduAnalog
+
+@pytest.mark.parametrize('mode', ArduAnalog.MODES)
+def test_noise_of_a_single_read(mode):
+    """Every mode estimates the standard deviation of a single read"""
+    rnd = random.Random(1)
+    noise = [ArduAnalog.reduceSamples([rnd.gauss(500, 3.0) for i in range(32)], mode)[1] for j in range(2000)]
+    assert statistics.mean(noise) == pytest.approx(3.0, rel=0.1)
+
+def test_oversampled_read(ardu):
+    fw = ardu.comm.ser.fw
+    fw.analog[1] = 600
+    fw.noise = 4.0
+    random.seed(2)
+    ardu.an.setOversampling(1, n=64, mode='trimmed')
+    noise = []
+    for i in range(50):
+        val, sd = ardu.an.analogReadOversampled(1)
+        assert val == pytest.approx(600, abs=3)
+        noise.append(sd)
+    assert statistics.mean(noise) == pytest.approx(4.0, rel=0.1)
+
+def test_oversampled_read_of_no_reads(ardu):
+    ardu.comm.ser.fw.analog[1] = 600
+    assert ardu.an.analogReadOversampled(1, n=0) == (600, 0.0) #< At least one read
+    ardu.an.setOversampling(1, n=0)
+    assert ardu.an.oversampling[1][0] == 1
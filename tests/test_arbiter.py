@@ -0,0 +1,124 @@
+"""Priority arbitration of the link (BridgeArbiter): PriorityLock and WaitStats"""
+
+import threading, time
+import pytest
+from GSOF_ArduBridge import BridgeArbiter
+
+def waitFor(cond, timeout=2.0) -> bool:
+    deadline = time.perf_counter() +timeout
+    while not cond():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+class Prio(threading.local):
+    prio = BridgeArbiter.PRIO_NORMAL
+
+def test_rt_overtakes_queued_bulk():
+    tls = Prio()
+    stats = BridgeArbiter.WaitStats()
+    lock = BridgeArbiter.PriorityLock(lambda: tls.prio, stats)
+    order = []
+    def worker(name, prio):
+        tls.prio = prio
+        with lock:
+            order.append(name)
+            time.sleep(0.005)
+    lock.acquire()
+    threads = [threading.Thread(target=worker, args=('bulk%d'%(i), BridgeArbiter.PRIO_BULK)) for i in range(3)]
+    for th in threads:
+        th.start()
+    assert waitFor(lambda: lock.waiting[BridgeArbiter.PRIO_BULK] == 3)
+    rt = threading.Thread(target=worker, args=('rt', BridgeArbiter.PRIO_RT))
+    rt.start()
+    assert waitFor(lambda: lock.waiting[BridgeArbiter.PRIO_RT] == 1)
+    time.sleep(0.02)
+    lock.release()
+    for th in threads +[rt]:
+        th.join()
+    assert order[0] == 'rt' #< Queued after the bulk waiters, served first
+    assert sorted(order[1:]) == ['bulk0', 'bulk1', 'bulk2']
+
+    res = stats.get()
+    assert res['NORMAL']['n'] == 1
+    assert res['RT']['n'] == 1
+    assert res['BULK']['n'] == 3
+    assert res['RT']['tWaitMax'] >= 0.02
+    assert res['BULK']['tWaitMax'] >= 0.02 +0.005 #< Behind the holder and the RT waiter
+    assert res['RT']['tWaitMax'] < res['BULK']['tWaitMax']
+    assert 0.0 < res['BULK']['tWaitAvg'] <= res['BULK']['tWaitMax']
+    stats.reset()
+    assert stats.get()['BULK'] == {'n': 0, 'tWaitAvg': 0.0, 'tWaitMax': 0.0}
+
+def test_priority_lock_is_reentrant():
+    stats = BridgeArbiter.WaitStats()
+    lock = BridgeArbiter.PriorityLock(lambda: BridgeArbiter.PRIO_NORMAL, stats)
+    got = threading.Event()
+    def other():
+        with lock:
+            got.set()
+    with lock:
+        with lock: #< Nested, the same thread
+            th = threading.Thread(target=other)
+            th.start()
+        assert lock.count == 1
+        assert not got.wait(0.02) #< Still held by the outer level
+    assert got.wait(1.0)
+    th.join()
+    assert lock.owner == None
+    assert stats.get()['NORMAL']['n'] == 2 #< The nested acquire is not a transaction
+
+def test_release_by_another_thread():
+    lock = BridgeArbiter.PriorityLock(lambda: BridgeArbiter.PRIO_NORMAL)
+    lock.acquire()
+    err = []
+    def release():
+        try:
+            lock.release()
+        except RuntimeError as e:
+            err.append(e)
+    th = threading.Thread(target=release)
+    th.start()
+    th.join()
+    assert len(err) == 1
+    lock.release()
+    with pytest.raises(RuntimeError):
+        lock.release()
+
+def test_bridge_priority_stats(stall):
+    """The bulk SPI transfer is split into chunks, a real-time read is served between them"""
+    ardu, tr = stall
+    comm = ardu.comm
+    spi = []
+    def delay(cmd):
+        if cmd != '3':
+            return 0.0
+        spi.append(cmd)
+        return 0.005
+    tr.delay = delay
+    comm.waitStats.reset()
+    chunks = 8
+    done = {}
+    started = threading.Event()
+    def bulk():
+        with comm.priority(comm.PRIO_BULK):
+            started.set()
+            reply = ardu.spi.write_read(list(range(comm.bulkChunk))*chunks)
+            done['bulk'] = time.perf_counter()
+            done['reply'] = reply
+    th = threading.Thread(target=bulk)
+    th.start()
+    assert started.wait(1.0)
+    assert waitFor(lambda: len(spi) >= 1) #< The first chunk was sent
+    with comm.priority(comm.PRIO_RT):
+        ardu.an.analogRead(0)
+        done['rt'] = time.perf_counter()
+    th.join()
+    assert done['reply'][0] == comm.GOOD
+    assert len(done['reply'][1]) == comm.bulkChunk*chunks
+    assert done['rt'] < done['bulk'] #< Did not wait for the whole transfer
+    res = comm.getPriorityStats()
+    assert res['BULK']['n'] >= chunks
+    assert res['RT']['n'] >= 1
+    assert res['RT']['tWaitMax'] < 0.005*chunks/2
@@ -0,0 +1,90 @@
+"""asyncio front-end (AsyncArduBridge) on the firmware emulator"""
+
+import asyncio, time
+import pytest
+from GSOF_ArduBridge import AsyncArduBridge
+
+def run(emulator, main, **kwargs):
+    async def wrapper():
+        async with AsyncArduBridge.AsyncArduBridge(COM=emulator.port, **kwargs) as ardu:
+            return await main(ardu)
+    return asyncio.run(wrapper())
+
+def test_async_gpio_and_analog_writes(emulator):
+    fw = emulator.fw
+    async def main(ardu):
+        assert await ardu.gpio.pinMode(5, ardu.gpio.OUTPUT) == 1
+        assert await ardu.gpio.digitalWrite(5, 1) == 1
+        assert await ardu.an.analogWrite(6, 100) == 1
+        assert await ardu.gpio.servoWrite(9, 90) == 1
+    run(emulator, main)
+    assert (fw.mode[5], fw.dout[5], fw.pwm[6], fw.servo[9]) == (0, 1, 100, 90)
+
+def test_async_shadow_skips_unchanged_writes(emulator):
+    fw = emulator.fw
+    async def main(ardu):
+        for i in range(3):
+            assert await ardu.gpio.digitalWrite(5, 1) == 1
+            assert await ardu.an.analogWrite(6, 100) == 1
+        return (ardu.gpio.getShadowStats(), ardu.an.getShadowStats())
+    gpio, an = run(emulator, main, shadow=True)
+    assert (gpio['elided'], an['elided']) == (2, 2)
+    assert (fw.cmdCount['O'], fw.cmdCount['P'], fw.dout[5], fw.pwm[6]) == (1, 1, 1, 100)
+
+def test_async_bulk_gpio(emulator):
+    fw = emulator.fw
+    fw.din[3] = 1
+    async def main(ardu):
+        assert await ardu.gpio.pinModes({5: ardu.gpio.OUTPUT, 6: ardu.gpio.OUTPUT, 3: ardu.gpio.INPUT}) == {5: 1, 6: 1, 3: 1}
+        assert await ardu.gpio.setPins({5: 1, 6: 0}) == {5: 1, 6: 1}
+        return await ardu.gpio.getPins([3, 4])
+    assert run(emulator, main) == {3: 1, 4: 0}
+    assert (fw.mode[5], fw.mode[6], fw.dout[5], fw.dout[6]) == (0, 0, 1, 0)
+
+def test_async_multi_stage_reads(emulator):
+    fw = emulator.fw
+    fw.analog[2] = 300
+    async def main(ardu):
+        await ardu.i2c.writeRegister(0x50, 4, [11, 22, 33])
+        reg = await ardu.i2c.readRegister(0x50, 4, 3)
+        delayed = await ardu.i2c.readRegister(0x50, 4, 3, delay=0.01)
+        await ardu.i2c.writeRaw(0x50, [4])
+        raw = await ardu.i2c.readRaw(0x50, 2)
+        val, noise = await ardu.an.analogReadOversampled(2, n=8)
+        return (reg, delayed, raw, val)
+    assert run(emulator, main) == ([11, 22, 33], [11, 22, 33], [11, 22], 300)
+
+def test_async_methods_without_awaitable_variant(emulator):
+    """The methods without an _nb variant fail at lookup, the local ones are available"""
+    async def main(ardu):
+        for bus, name in ((ardu.gpio, 'servoScurve'), (ardu.gpio, 'setMode'), (ardu.spi, 'write_read_cs'), (ardu.spi, 'cs_config')):
+            with pytest.raises(AttributeError, match='AsyncArduBridge'):
+                getattr(bus, name)
+        assert not hasattr(ardu.comm, 'transact')
+        ardu.an.setOversampling(0, n=4)
+        assert ardu.gpio.getShadowStats()['writes'] == 0
+        assert ardu.gpio.OUTPUT == 0
+        assert await ardu.gpio.digitalWrite_nb(5, 1) == 1
+        assert (await ardu.i2c.setFreq(400000))[0] == 1
+    run(emulator, main)
+
+def test_async_open_waits_for_the_boot(emulator):
+    """The board ignores the commands while it boots after the port was opened"""
+    fw = emulator.fw
+    feed = fw.feed
+    boot = [None]
+    def booting(raw):
+        if boot[0] == None:
+            boot[0] = time.perf_counter() +0.6
+        if time.perf_counter() < boot[0]:
+            return []
+        return feed(raw)
+    fw.feed = booting
+    async def main():
+        ardu = AsyncArduBridge.AsyncArduBridge(COM=emulator.port)
+        ID = await ardu.open()
+        val = await ardu.an.analogRead(0)
+        await ardu.close()
+        return (ID, val)
+    assert asyncio.run(main()) == (fw.ID +'\n', 512)
+    assert fw.cmdCount['?'] == 1 #< The earlier polls were ignored
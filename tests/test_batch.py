@@ -0,0 +1,97 @@
+"""Write-coalescing batch context (BridgeBatch)"""
+
+import logging
+
+def countWrites(ardu):
+    writes = [0]
+    write = ardu.comm.ser.write
+    def counted(dat):
+        writes[0] += 1
+        return write(dat)
+    ardu.comm.ser.write = counted
+    return writes
+
+def test_batch_single_write(ardu):
+    fw = ardu.comm.ser.fw
+    writes = countWrites(ardu)
+    with ardu.batch() as batch:
+        for i in range(20):
+            ardu.gpio.digitalWrite(3, i &1)
+            ardu.i2c.writeRegister(0x40, i &0xf, [i, 0x1b, 0x5c]) #< With RST and ESC values
+    assert writes[0] == 1
+    assert len(batch) == 40
+    assert batch.ok()
+    assert fw.dout[3] == 1
+    assert ardu.i2c.readRegister(0x40, 3, 3) == [19, 0x1b, 0x5c]
+
+def test_batch_read_keeps_order(ardu):
+    fw = ardu.comm.ser.fw
+    fw.din[5] = 1
+    with ardu.batch() as batch:
+        ardu.gpio.digitalWrite(6, 1)
+        val = ardu.gpio.digitalRead(5)           #< Sends the batch up to this command
+        ardu.i2c.writeRegister(0x40, 0, [7])
+        reg = ardu.i2c.readRegister(0x40, 0, 1)  #< Multi stage, sends the batch first
+        ardu.gpio.digitalWrite(6, 0)
+    assert (val, reg) == (1, [7])
+    assert batch.ok() and (len(batch) == 4)
+    assert fw.dout[6] == 0
+
+def test_batch_reports_failures(stall):
+    ardu, tr = stall
+    for i in range(10): #< Learn the round-trip times
+        ardu.gpio.digitalWrite(3, 1)
+        ardu.an.analogRead(0)
+    tr.delay = lambda cmd: 0.1 if cmd == 'O' else 0.0
+    with ardu.batch() as batch:
+        assert ardu.gpio.digitalWrite(3, 0) == 1 #< Placeholder
+        fut = ardu.an.analogRead_nb(0)
+    tr.delay = None
+    assert not batch.ok()
+    assert fut.result() < 0
+    assert ardu.an.analogRead(0) == 512 #< The late replies were drained
+
+def test_batch_in_pipeline_and_worker(ardu):
+    for start, stop in ((ardu.comm.startPipeline, ardu.comm.stopPipeline), (ardu.comm.startWorker, ardu.comm.stopWorker)):
+        start()
+        with ardu.batch() as batch:
+            for i in range(10):
+                ardu.gpio.digitalWrite(3, i &1)
+            fut = ardu.an.analogRead_nb(0)
+        assert batch.ok() and (fut.result() == 512)
+        stop()
+
+def test_batch_parses_the_real_reply_once(stall, caplog):
+    """The placeholder of an acknowledge only command is not parsed, its parser runs on the real reply"""
+    ardu, tr = stall
+    comm = ardu.comm
+    for i in range(10): #< Learn the round-trip times
+        ardu.gpio.digitalWrite(3, 1)
+        ardu.an.analogRead(0)
+    comm.setShadow(True)
+    ardu.gpio.logger = logging.getLogger('test.batch')
+    ardu.gpio.logger.setLevel(logging.DEBUG)
+    parsed = []
+    def parse(reply):
+        parsed.append(reply)
+        return reply[0]
+    with caplog.at_level(logging.DEBUG, logger='test.batch'):
+        with ardu.batch() as batch:
+            fut = comm.submit((ord('O'), 4, 1), 1, parser=parse)
+            assert fut.result() == comm.GOOD #< Placeholder, the batch is not sent
+            assert not fut.done()
+            assert ardu.gpio.digitalWrite(5, 1) == comm.GOOD
+            assert parsed == []
+            assert caplog.records == []
+    assert parsed == [(comm.GOOD, [1])]
+    assert [rec.getMessage() for rec in caplog.records] == ['DOUT5: 1 - OK']
+    assert comm.shadowed(5, ('O', 1))
+
+    tr.delay = lambda cmd: 0.1 if cmd == 'O' else 0.0
+    with ardu.batch() as batch:
+        fut = ardu.gpio.digitalWrite_nb(6, 1)
+        assert fut.result() == comm.GOOD #< Placeholder
+    tr.delay = None
+    assert fut.result() != comm.GOOD #< The real status
+    assert not batch.ok()
+    assert not comm.shadowed(6, ('O', 1))
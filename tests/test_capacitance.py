@@ -0,0 +1,37 @@
+"""Pulse and sample traces (ArduPulseAndSample) and the RC fit"""
+
+import sys
+import pytest
+import GSOF_ArduBridge
+
+def test_traces(ardu):
+    traces = ardu.cap.pulseAndSampleBatch(pulsePin=[2, 3, 4], adcPin=0, samples=32)
+    assert traces.shape == (3, 32)
+    assert traces.tolist()[0] == ardu.comm.ser.fw.pulseAndSample(2, 0, 32)
+
+def test_measCap_fits_the_emulator_tau(ardu):
+    pytest.importorskip('numpy')
+    fw = ardu.comm.ser.fw
+    fit = ardu.cap.measCap(pulsePin=[2, 3], adcPin=0, samples=64, dt=1e-4, R=1e6)
+    tau = fw.tau*1e-4
+    for i in range(2):
+        assert fit['tau'][i] == pytest.approx(tau, rel=0.05)
+        assert fit['C'][i] == pytest.approx(tau/1e6, rel=0.05)
+        assert fit['residual'][i] < 1.0 #< The ADC quantization
+
+def test_measCap_names_the_numpy_extra(ardu, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'numpy', None) #< import numpy raises ImportError
+    with pytest.raises(ImportError, match=r'GSOF_ArduBridge\[numpy\]'):
+        ardu.cap.measCap(pulsePin=2, adcPin=0)
+    with pytest.raises(ImportError, match=r'GSOF_ArduBridge\[numpy\]'):
+        GSOF_ArduBridge.requireNumpy()
+
+def test_failed_trace(stall):
+    """A trace that timed out fails the batch, its missing samples are not data"""
+    ardu, tr = stall
+    for i in range(10):
+        assert ardu.cap.pulseAndSample(2, 0, 16) != -1 #< Learn the round-trip time
+    tr.delay = lambda cmd: 0.3 if cmd == 'C' else 0.0 #< Longer than the backed off timeouts
+    assert ardu.cap.pulseAndSampleBatch([2, 3], 0, 16) == None
+    assert ardu.cap.measCap([2, 3], 0, 16) == None
+    assert ardu.cap.pulseAndSample(2, 0, 16) == -1
@@ -0,0 +1,50 @@
+"""Round-trip tests of the bulk escape / unescape codec (BridgeCodec)"""
+
+import random
+from GSOF_ArduBridge import BridgeCodec as codec
+
+ALL = bytes(range(256)) #< Including RST and ESC
+
+def test_escape_matches_legacy():
+    for reset in (True, False):
+        assert codec.escape(ALL, reset=reset) == codec._legacyEscape(ALL, reset=reset)
+
+def test_escape_has_no_bare_rst():
+    raw = codec.escape(ALL, reset=True)
+    assert raw[0] == codec.RST
+    assert codec.RST not in raw[1:]
+
+def test_unescape_round_trip():
+    rnd = random.Random(1)
+    for n in (0, 1, 2, 17, 1024):
+        vDat = bytes([rnd.choice((codec.RST, codec.ESC, rnd.randrange(256))) for i in range(n)])
+        status, out, pending = codec.unescape(codec.escape(vDat, reset=False))
+        assert (status, bytes(out), pending) == (codec.GOOD, vDat, False)
+
+def test_unescape_matches_legacy():
+    raw = codec.escape(ALL, reset=False)
+    assert list(codec.unescape(raw)[1]) == codec._legacyUnescape(raw, len(ALL))
+
+def test_unescape_stops_at_rst():
+    raw = codec.escape([1, 2], reset=False) +bytes([codec.RST]) +bytes([3])
+    status, out, pending = codec.unescape(raw)
+    assert (status, bytes(out)) == (codec.ERR_RST, bytes([1, 2]))
+    status, out, pending = codec.unescape(raw, reset=False)
+    assert status == codec.GOOD
+
+def test_unescape_pending_escape():
+    status, out, pending = codec.unescape(bytes([1, codec.ESC]))
+    assert (status, bytes(out), pending) == (codec.GOOD, bytes([1]), True)
+
+def test_decode_incremental():
+    vDat = bytes([codec.ESC, 7, codec.RST, 9])
+    raw = codec.escape(vDat, reset=False)
+    for cut in range(len(raw)):
+        status, out, used = codec.decode(raw[:cut], len(vDat))
+        assert (status, used) == (codec.PENDING, 0)
+    status, out, used = codec.decode(raw +b'\x01\x02', len(vDat))
+    assert (status, bytes(out), used) == (codec.GOOD, vDat, len(raw))
+
+def test_decode_rst():
+    status, out, used = codec.decode(bytes([5, codec.RST, 6]), 3)
+    assert (status, bytes(out), used) == (codec.ERR_RST, bytes([5]), 2)
@@ -0,0 +1,39 @@
+"""Port discovery (BridgeDiscovery) with a fake port list"""
+
+import types
+import pytest
+from GSOF_ArduBridge import BridgeDiscovery
+
+def port(device, serial=None):
+    return types.SimpleNamespace(device=device, vid=0x2341, pid=0x43, serial_number=serial, description='Arduino Uno')
+
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    """Returns ({port: ID} of the fake boards, the list of the probed ports), the cache is a temporary file"""
+    monkeypatch.setenv('GSOF_ARDUBRIDGE_CACHE', str(tmp_path/'ports.json'))
+    boards = {}
+    probed = []
+    def probe(device, baud=0, timeout=0):
+        probed.append(device)
+        return boards.get(device, False)
+    monkeypatch.setattr(BridgeDiscovery, 'comports', lambda: [port(p) for p in sorted(boards)])
+    monkeypatch.setattr(BridgeDiscovery, 'probe', probe)
+    yield (boards, probed)
+
+def test_cached_port_is_verified(fake):
+    boards, probed = fake
+    boards['/dev/ttyACM0'] = 'Board-A\n'
+    boards['/dev/ttyACM1'] = 'Board-B\n'
+    BridgeDiscovery.remember('Board-A', '/dev/ttyACM0')
+    assert BridgeDiscovery.findPort('Board-A') == '/dev/ttyACM0'
+    assert probed == ['/dev/ttyACM0']
+
+def test_cached_port_of_another_board(fake):
+    """The port name was taken by another board, the candidates are scanned"""
+    boards, probed = fake
+    boards['/dev/ttyACM0'] = 'Board-B\n'
+    boards['/dev/ttyACM1'] = 'Board-A\n'
+    BridgeDiscovery.remember('Board-A', '/dev/ttyACM0')
+    assert BridgeDiscovery.findPort('Board-A') == '/dev/ttyACM1'
+    assert sorted(probed) == ['/dev/ttyACM0', '/dev/ttyACM1'] #< The stale port is probed once
+    assert BridgeDiscovery.loadCache()['Board-A']['port'] == '/dev/ttyACM1'
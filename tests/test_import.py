@@ -0,0 +1,44 @@
+"""Import time of the package, the optional modules are imported on first use"""
+
+import sys, subprocess
+
+HEAVY = ('asyncio', 'numpy', 'concurrent.futures.thread',
+         'GSOF_ArduBridge.AsyncArduBridge',
+         'GSOF_ArduBridge.BridgeAcquisition',
+         'GSOF_ArduBridge.BridgeBatch',
+         'GSOF_ArduBridge.BridgeDiscovery',
+         'GSOF_ArduBridge.BridgeEmulator',
+         'GSOF_ArduBridge.BridgePoller',
+         'GSOF_ArduBridge.BridgeTrace',
+         'GSOF_ArduBridge.BridgeWaveform',
+         'GSOF_ArduBridge.BridgeWorker',
+         'GSOF_ArduBridge.ArduGPIO',
+         'GSOF_ArduBridge.ArduAnalog',
+         'GSOF_ArduBridge.ArduI2C',
+         'GSOF_ArduBridge.ArduSPI',
+         'GSOF_ArduBridge.ArduPulseAndSample')
+
+def loaded(code) -> list:
+    """Returns the HEAVY modules that are in sys.modules after running code in a new interpreter"""
+    code += '\nimport sys\nprint("modules: " +" ".join([m for m in %r if m in sys.modules]))'%(HEAVY,)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return out.splitlines()[-1].split()[1:] #< The last line, the bridge prints its version
+
+def test_import_is_light():
+    assert loaded('import GSOF_ArduBridge.ArduBridge') == []
+
+def test_subsystem_on_first_use():
+    code = '''import logging
+from GSOF_ArduBridge import ArduBridge
+ardu = ArduBridge.ArduBridge(COM='loop://', consoleHandler=False, logLevel=logging.CRITICAL)
+ardu.gpio
+'''
+    assert loaded(code) == ['GSOF_ArduBridge.BridgeEmulator', 'GSOF_ArduBridge.ArduGPIO'] #< The firmware model of loop://
+
+def test_import_time_budget():
+    """The import time of the package modules of the facade (python -X importtime, best of the runs) is within its budget"""
+    from GSOF_ArduBridge import BridgeBenchmark
+    res = BridgeBenchmark.importTime()
+    assert res != None
+    assert 0.0 < res['own'] <= res['total']
+    assert res['own']*1e3 < BridgeBenchmark.IMPORT_BUDGET, res['modules']
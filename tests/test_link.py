@@ -0,0 +1,145 @@
+"""Link supervisor (BridgeLink): fail-fast requests, back-off and background reconnect"""
+
+import threading, time
+import pytest
+import serial
+from GSOF_ArduBridge import BridgeLink, BridgeTransport
+from conftest import openBridge
+
+class UnplugTransport(BridgeTransport.LoopbackTransport):
+    """Loopback transport that can be unplugged, every read, write and open raises SerialException until it is replugged"""
+    def __init__(self, firmware=None, timeout=0.015):
+        BridgeTransport.LoopbackTransport.__init__(self, firmware=firmware, timeout=timeout)
+        self.unplugged = False
+        self.opens = 0
+
+    def open(self) -> None:
+        if self.unplugged:
+            raise serial.SerialException('%s is unplugged'%(self.port))
+        self.opens += 1
+        self.rx.clear()
+        self.pos = 0
+        BridgeTransport.LoopbackTransport.open(self)
+
+    def read(self, N) -> bytes:
+        if self.unplugged:
+            raise serial.SerialException('%s is unplugged'%(self.port))
+        return BridgeTransport.LoopbackTransport.read(self, N)
+
+    def write(self, dat) -> int:
+        if self.unplugged:
+            raise serial.SerialException('%s is unplugged'%(self.port))
+        return BridgeTransport.LoopbackTransport.write(self, dat)
+
+@pytest.mark.parametrize('mode', ['blocking', 'pipeline', 'worker'])
+def test_link_fail_fast_and_reconnect(mode):
+    tr = UnplugTransport()
+    ardu = openBridge(transport=tr)
+    comm = ardu.comm
+    fw = tr.fw
+    fw.analog[1] = 111
+    comm.link.baseDelay = 0.01
+    comm.link.maxDelay = 0.04
+    events = []
+    up = threading.Event()
+    def listener(event):
+        events.append(event)
+        if event['event'] == 'up':
+            up.set()
+    comm.link.addListener(listener)
+    if mode == 'pipeline':
+        comm.startPipeline(4)
+    elif mode == 'worker':
+        comm.startWorker()
+    try:
+        assert ardu.an.analogRead(1) == 111
+        tr.unplugged = True
+        with pytest.raises(BridgeLink.LinkDownError): #< The read/write error
+            ardu.an.analogRead(1)
+        assert comm.link.down
+        assert comm.LINK == False
+        t0 = time.perf_counter()
+        for i in range(5):
+            with pytest.raises(BridgeLink.LinkDownError): #< Fail fast while the link is down
+                ardu.an.analogRead(1)
+        assert time.perf_counter() -t0 < comm.rtt.rtoMax
+        assert ardu.an.analogRead_nb(1).exception(timeout=0) != None
+        time.sleep(0.1) #< Several failed reconnect attempts
+        assert comm.link.down
+        assert [event['event'] for event in events] == ['down']
+        assert 'unplugged' in events[0]['reason']
+
+        IDs = fw.cmdCount['?']
+        tr.unplugged = False
+        assert up.wait(2.0)
+        assert fw.cmdCount['?'] > IDs #< GetID after the reconnect
+        assert [event['event'] for event in events] == ['down', 'up']
+        assert events[1]['ID'] == fw.ID +'\n'
+        assert events[1]['attempts'] > 1
+        assert comm.LINK
+        assert ardu.an.analogRead(1) == 111
+        stats = comm.link.getStats()
+        assert stats['downs'] == 1
+        assert stats['reconnects'] == 1
+    finally:
+        ardu.OpenClosePort(0)
+
+def test_link_no_id_no_reconnect():
+    """The port opens but the board does not answer GetID, the link stays down"""
+    tr = UnplugTransport()
+    ardu = openBridge(transport=tr)
+    comm = ardu.comm
+    comm.link.baseDelay = 0.01
+    comm.link.maxDelay = 0.02
+    comm.link.handshake = 0.1
+    try:
+        tr.unplugged = True
+        with pytest.raises(BridgeLink.LinkDownError):
+            ardu.an.analogRead(1)
+        feed = tr.fw.feed
+        tr.fw.feed = lambda raw: [] #< Mute board
+        opens = tr.opens
+        tr.unplugged = False
+        time.sleep(0.3)
+        assert tr.opens > opens
+        assert comm.link.down
+        with pytest.raises(BridgeLink.LinkDownError):
+            ardu.an.analogRead(1)
+        tr.fw.feed = feed
+        deadline = time.perf_counter() +2.0
+        while comm.link.down and (time.perf_counter() < deadline):
+            time.sleep(0.01)
+        assert ardu.an.analogRead(1) == tr.fw.analog[1]
+    finally:
+        ardu.OpenClosePort(0)
+
+class FakeComm():
+    COM = 'fake'
+    def __init__(self, fails):
+        self.fails = fails
+        self.calls = 0
+
+    def _reopen(self, handshake):
+        self.calls += 1
+        if self.calls > self.fails:
+            return 'ID\n'
+        return False
+
+def test_link_backoff_is_capped(monkeypatch):
+    delays = []
+    def uniform(a, b):
+        delays.append( (a, b) )
+        return 0.0
+    monkeypatch.setattr(BridgeLink.random, 'uniform', uniform)
+    comm = FakeComm(fails=7)
+    link = BridgeLink.LinkSupervisor(comm, baseDelay=0.1, maxDelay=1.0)
+    up = threading.Event()
+    link.addListener(lambda event: up.set() if event['event'] == 'up' else None)
+    link.lost('test')
+    assert up.wait(2.0)
+    assert [b for a, b in delays] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0, 1.0, 1.0, 1.0])
+    assert all(a == pytest.approx(b/2) for a, b in delays) #< Jitter range
+    stats = link.getStats()
+    assert stats['attempts'] == 8
+    assert stats['reconnects'] == 1
+    assert link.down == False
@@ -0,0 +1,81 @@
+"""Pipelined command window (BridgePipeline) with late replies"""
+
+import time, threading
+
+def test_pipeline_replies_in_order(ardu):
+    fw = ardu.comm.ser.fw
+    for pin in range(8):
+        fw.analog[pin] = 100 +pin
+    ardu.comm.startPipeline(4)
+    futures = [(pin, ardu.an.analogRead_nb(pin)) for pin in list(range(8))*4]
+    assert [fut.result() for pin, fut in futures] == [100 +pin for pin, fut in futures]
+    ardu.comm.stopPipeline()
+
+def test_pipeline_timeouts_never_misattribute(stall):
+    """A late reply fails the commands in flight, no command may get the reply of another one"""
+    ardu, tr = stall
+    fw = tr.fw
+    for pin in range(8):
+        fw.analog[pin] = 100 +pin
+    count = [0]
+    def delay(cmd):
+        if cmd != 'A':
+            return 0.0
+        count[0] += 1
+        return 0.03 if (count[0]%40 == 0) else 0.0 #< Later than the deadline, earlier than rtoMax
+    tr.delay = delay
+    write = ardu.comm.uart_wr
+    def slowWrite(dat):
+        write(dat)
+        time.sleep(0.0002) #< Widen the gap between the write and the bookkeeping of the command
+    ardu.comm.uart_wr = slowWrite
+    ardu.comm.startPipeline(16)
+    wrong = []
+    results = {'good': 0, 'failed': 0}
+    lock = threading.Lock()
+    def reader(pins):
+        for i in range(40):
+            futures = [(pin, ardu.an.analogRead_nb(pin)) for pin in pins*3] #< Several commands in flight per thread
+            for pin, fut in futures:
+                val = fut.result()
+                with lock:
+                    if val < 0: #< Failed (ERR_BYTE)
+                        results['failed'] += 1
+                    elif val == 100 +pin:
+                        results['good'] += 1
+                    else:
+                        wrong.append( (pin, val) )
+    threads = [threading.Thread(target=reader, args=([2*i, 2*i +1],)) for i in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    ardu.comm.stopPipeline()
+    assert wrong == []
+    assert results['failed'] > 0
+    assert results['good'] > results['failed']
+
+def test_pipeline_command_sent_while_failing(stall):
+    """A command that is written while the reader fails the commands in flight is failed with them"""
+    ardu, tr = stall
+    fw = tr.fw
+    fw.analog[1] = 101
+    fw.analog[2] = 202
+    ardu.comm.startPipeline(4)
+    for i in range(20):
+        assert ardu.an.analogRead(1) == 101 #< Learn the short round-trip time
+    tr.delay = lambda cmd: 0.05 if cmd == 'A' else 0.0
+    late = ardu.an.analogRead_nb(1) #< Its deadline expires while the next command is written
+    write = ardu.comm.uart_wr
+    def slowWrite(dat):
+        write(dat)
+        time.sleep(0.03)
+    ardu.comm.uart_wr = slowWrite
+    fut = ardu.an.analogRead_nb(2)
+    ardu.comm.uart_wr = write
+    tr.delay = None
+    assert late.result() < 0
+    assert fut.result() in (202, -257) #< Never the reply of the late command
+    time.sleep(0.06)
+    assert ardu.an.analogRead(2) == 202 #< The stale replies were drained
+    ardu.comm.stopPipeline()
@@ -0,0 +1,62 @@
+"""Digital-input poller (BridgePoller) with failed reads"""
+
+import time
+from GSOF_ArduBridge import BridgePoller
+
+def test_getPins_failed_pin(stall):
+    ardu, tr = stall
+    tr.fw.din[2] = 1
+    assert ardu.gpio.getPins([2, 3]) == {2: 1, 3: 0}
+    for i in range(20):
+        ardu.gpio.digitalRead(2) #< Learn the short round-trip time
+    tr.delay = lambda cmd: 0.05 if cmd == 'I' else 0.0
+    assert ardu.gpio.getPins([2, 3]) == {2: -1, 3: -1}
+    assert ardu.gpio.getPins([2, 0x1b]) == {2: -1, 0x1b: -1} #< The late replies and an invalid pin
+
+def test_poller_timeout_is_not_an_edge(stall):
+    """A read that timed out is dropped, it must not look like a low level"""
+    ardu, tr = stall
+    tr.fw.din[2] = 1
+    tr.fw.din[3] = 1
+    for i in range(20):
+        ardu.gpio.digitalRead(2) #< Learn the short round-trip time
+    count = [0]
+    def delay(cmd):
+        if cmd != 'I':
+            return 0.0
+        count[0] += 1
+        return 0.05 if (count[0]%20 == 0) else 0.0
+    tr.delay = delay
+    edges = []
+    poller = BridgePoller.DigitalPoller(rate=200.0)
+    poller.addPins(ardu.gpio, [2, 3])
+    poller.onEdge(lambda ch, val, t: edges.append( (ch, val) ))
+    poller.start()
+    time.sleep(0.5)
+    poller.stop()
+    stats = poller.getStats()
+    assert stats['errors'] > 0
+    assert stats['samples'] > 0
+    assert (stats['edges'], edges) == (0, [])
+
+def test_poller_stop_before_start(ardu):
+    poller = BridgePoller.DigitalPoller(rate=200.0)
+    poller.addPins(ardu.gpio, [2])
+    poller.stop()
+    poller.stop()
+    assert poller.getStats()['samples'] == 0
+
+def test_poller_stop_twice(ardu):
+    ardu.comm.ser.fw.din[2] = 1
+    edges = []
+    poller = BridgePoller.DigitalPoller(rate=200.0)
+    poller.addPins(ardu.gpio, [2])
+    poller.onEdge(lambda ch, val, t: edges.append( (ch, val) ))
+    poller.start()
+    time.sleep(0.05)
+    poller.stop()
+    poller.stop()
+    assert not poller.is_alive()
+    assert not poller.dispatcher.is_alive()
+    assert poller.getStats()['samples'] > 0
+    assert list(poller.state().values()) == [1] #< A single channel
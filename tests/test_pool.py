@@ -0,0 +1,16 @@
+"""Pool of boards (ArduBridgePool) on the loopback transport"""
+
+import logging, threading
+from GSOF_ArduBridge import ArduBridgePool
+
+def test_pool_open_map_close():
+    pool = ArduBridgePool.ArduBridgePool(['loop://', 'loop://'], consoleHandler=False, logLevel=logging.CRITICAL)
+    boards = pool.open(retry=1)
+    assert len(boards) == 2
+    for ardu in pool.ardu:
+        assert ardu.comm.ser.fw.cmdCount['?'] == 1 #< The ID of the handshake is reused
+    res = pool.map(lambda b: b.an.analogRead(0))
+    assert list(res.values()) == [512, 512]
+    pool.close()
+    assert pool.executor == None
+    assert [th for th in threading.enumerate() if th.name.startswith('ArduBridgePool')] == []
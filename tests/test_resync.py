@@ -0,0 +1,40 @@
+"""The RX buffer is drained only after a failed reply (ArduBridgeComm.resync)"""
+
+import time
+
+def test_no_drain_after_good_replies(ardu):
+    resyncs = ardu.comm.counters.resyncs
+    for i in range(50):
+        assert ardu.gpio.digitalWrite(3, i &1) == 1
+        assert ardu.an.analogRead(0) == 512
+    assert ardu.comm.counters.resyncs == resyncs
+    assert not ardu.comm.rxStale
+
+def test_drain_after_timeout(stall):
+    ardu, tr = stall
+    tr.fw.analog[1] = 101
+    tr.fw.analog[2] = 202
+    for i in range(10):
+        assert ardu.an.analogRead(1) == 101
+    resyncs = ardu.comm.counters.resyncs
+    tr.delay = lambda cmd: 0.05 #< Later than the deadline
+    assert ardu.an.analogRead(1) < 0
+    assert ardu.comm.rxStale and (ardu.comm.rxOwed == 2)
+    tr.delay = None
+    assert ardu.an.analogRead(2) == 202 #< The late reply of pin 1 is drained first
+    assert ardu.comm.counters.resyncs == resyncs +1
+    assert ardu.comm.counters.staleBytes >= 2
+    assert not ardu.comm.rxStale
+
+def test_drain_after_rst(ardu):
+    fw = ardu.comm.ser.fw
+    fw.analog[2] = 202
+    reply = fw._reply
+    def corrupt(out, cmd, vDat):
+        fw._reply = reply
+        out.append( (cmd, bytes([0x1b])) ) #< A bare RST in the reply
+        reply(out, cmd, vDat)
+    fw._reply = corrupt
+    assert ardu.an.analogRead(1) < 0
+    assert ardu.comm.counters.rstRx == 1
+    assert ardu.an.analogRead(2) == 202
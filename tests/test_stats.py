@@ -0,0 +1,17 @@
+"""Link statistics (BridgeStats) of multi stage replies"""
+
+def test_latency_sampled_by_first_reply(stall):
+    """The later stages of readRegister / readRaw are not counted as replies, their bytes are"""
+    ardu, tr = stall
+    tr.delay = lambda cmd: 0.003 if cmd == '2' else 0.0
+    ardu.i2c.writeRegister(0x50, 0, [1, 2])
+    before = ardu.comm.stats()
+    for i in range(10):
+        assert ardu.i2c.readRegister(0x50, 0, 2) == [1, 2]
+        assert ardu.i2c.readRaw(0x50, 2) != -1
+    stats = ardu.comm.stats()
+    latency = stats['latency']['2']
+    assert latency['count'] -before['latency']['2']['count'] == 20
+    assert stats['framesRx'] -before['framesRx'] == 20
+    assert stats['payloadRx'] -before['payloadRx'] == 10*(4 +3) #< ACK, count and 2 bytes; count and 2 bytes
+    assert latency['p50'] >= 0.002 #< The stages that arrive together with the first one are not samples
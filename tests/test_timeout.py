@@ -0,0 +1,18 @@
+"""Adaptive receive timeout (BridgeTimeout) of multi stage replies"""
+
+def test_rtt_sampled_by_first_reply(stall):
+    """The later stages of readRegister / readRaw arrive together with the first one, they are not RTT samples"""
+    ardu, tr = stall
+    tr.delay = lambda cmd: 0.003 if cmd == '2' else 0.0
+    for i in range(20):
+        assert ardu.i2c.readRegister(0x50, 0, 2) != -1
+        assert ardu.i2c.readRegister(0x50, 0, 2, delay=0.001) != -1
+        assert ardu.i2c.readRaw(0x50, 2) != -1
+    srtt = ardu.comm.getRttStats()['2']['srtt']
+    assert srtt > 0.0025
+    assert ardu.comm.counters.timeouts == 0
+
+def test_rto_floor(ardu):
+    for i in range(20):
+        ardu.an.analogRead(0)
+    assert ardu.comm.rxTimeout(ord('A'), 2) >= ardu.comm.rtt.rtoMin +2*10.0/ardu.comm.baud
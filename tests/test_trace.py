@@ -0,0 +1,79 @@
+"""Wire trace (BridgeTrace): the memory-mapped ring and the replay of a recorded session"""
+
+import logging
+from GSOF_ArduBridge import ArduBridge, BridgeTrace
+
+def test_trace_ring_wraps(tmp_path):
+    """A full ring overwrites its oldest records, the newest ones are read back in order"""
+    fileName = str(tmp_path /'ring.trace')
+    size = 200
+    rec = BridgeTrace.TraceRecorder(fileName, size=size)
+    sent = []
+    for i in range(60):
+        dat = bytes([i])*(1 +i%7)
+        direction = BridgeTrace.TX if i%2 == 0 else BridgeTrace.RX
+        rec.record(direction, dat)
+        sent.append( (direction, dat) )
+        if i == 9:
+            assert [(d, bytes(dat)) for t, d, dat in BridgeTrace.read(fileName)] == sent #< Before the wrap
+    head, tail, count = rec.head, rec.tail, rec.count
+    rec.close()
+    assert head < tail #< Wrapped
+    records = BridgeTrace.read(fileName)
+    assert len(records) == count
+    assert 0 < count < len(sent)
+    assert [(d, bytes(dat)) for t, d, dat in records] == sent[-count:] #< The newest records
+    assert sum([BridgeTrace.RECORD.size +len(dat) for t, d, dat in records]) <= size
+    times = [t for t, d, dat in records]
+    assert times == sorted(times)
+
+def test_trace_oversized_record(tmp_path):
+    """A record larger than the ring is dropped, the ring is kept"""
+    fileName = str(tmp_path /'small.trace')
+    rec = BridgeTrace.TraceRecorder(fileName, size=64)
+    rec.tx(b'\x01\x02')
+    rec.rx(bytes(100))
+    rec.close()
+    assert [(d, bytes(dat)) for t, d, dat in BridgeTrace.read(fileName)] == [(BridgeTrace.TX, b'\x01\x02')]
+
+def session(ardu) -> list:
+    """Commands of the recorded (and replayed) session, returns their results"""
+    res = []
+    ardu.gpio.pinMode(5, 0)
+    for val in (1, 0, 1):
+        res.append(ardu.gpio.digitalWrite(5, val))
+    for pin in range(4):
+        res.append(ardu.an.analogRead(pin))
+    res.append(ardu.gpio.digitalRead(7))
+    res.append(ardu.an.analogWrite(6, 128))
+    res.append(list(ardu.cap.pulseAndSample(2, 0, 16)))
+    return res
+
+def test_trace_record_and_replay(emulator, tmp_path):
+    """A session recorded on the emulator plays back through replay:// with zero mismatches"""
+    fileName = str(tmp_path /'session.trace')
+    for pin in range(4):
+        emulator.fw.analog[pin] = 100*pin +7
+    emulator.fw.din[7] = 1
+    ardu = ArduBridge.ArduBridge(COM=emulator.port, consoleHandler=False, logLevel=logging.CRITICAL)
+    ardu.comm.startTrace(fileName, size=64*1024)
+    ardu.OpenClosePort(1)
+    ID = ardu.ID
+    assert ID != False
+    recorded = session(ardu)
+    ardu.OpenClosePort(0)
+    ardu.comm.stopTrace()
+    assert recorded[3:7] == [7, 107, 207, 307]
+    records = BridgeTrace.read(fileName)
+    assert set([d for t, d, dat in records]) == set([BridgeTrace.TX, BridgeTrace.RX])
+
+    replay = ArduBridge.ArduBridge(COM='replay://%s?fast'%(fileName), consoleHandler=False, logLevel=logging.CRITICAL)
+    replay.OpenClosePort(1)
+    try:
+        assert replay.ID == ID
+        assert session(replay) == recorded
+        tr = replay.comm.ser
+        assert tr.mismatches == 0
+        assert tr.done()
+    finally:
+        replay.OpenClosePort(0)
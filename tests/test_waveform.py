@@ -0,0 +1,114 @@
+"""Deadline based waits (Sleep_us.sleepUntil) and the waveform scheduler (BridgeWaveform)"""
+
+import time, logging
+import pytest
+from GSOF_ArduBridge import Sleep_us, BridgeWaveform
+
+class FakeClock():
+    """Replaces the time module, sleep() advances the clock and every perf_counter() call takes tick sec"""
+    def __init__(self, tick=1e-6):
+        self.t = 100.0
+        self.tick = tick
+        self.sleeps = []
+
+    def perf_counter(self) -> float:
+        self.t += self.tick
+        return self.t
+
+    def sleep(self, dt) -> None:
+        self.sleeps.append(dt)
+        self.t += dt
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(Sleep_us, 'time', clock)
+    monkeypatch.setattr(BridgeWaveform, 'time', clock)
+    return clock
+
+def test_sleep_until_fake_clock(clock):
+    deadline = clock.t +0.01
+    Sleep_us.sleepUntil(deadline)
+    assert len(clock.sleeps) == 1
+    assert clock.sleeps[0] == pytest.approx(0.01 -Sleep_us.SPIN, abs=1e-5) #< Coarse sleep
+    assert deadline <= clock.t < deadline +1e-5 #< Busy-wait to the deadline
+
+    Sleep_us.sleepUntil(clock.t +0.001) #< Within the spin time, no sleep
+    Sleep_us.sleepUntil(clock.t -0.001) #< Late, returns at once
+    assert len(clock.sleeps) == 1
+
+    t = clock.t
+    Sleep_us.sleep_us(5000)
+    assert clock.t == pytest.approx(t +0.005, abs=1e-5)
+
+def test_sleep_until_real_clock():
+    for dt in (0.0005, 0.005, 0.02):
+        deadline = time.perf_counter() +dt
+        Sleep_us.sleepUntil(deadline)
+        now = time.perf_counter()
+        assert deadline <= now < deadline +0.005
+
+class FakePins():
+    """Writes that take tWrite sec per round trip on the fake clock"""
+    def __init__(self, clock, tWrite=0.001):
+        self.clock = clock
+        self.tWrite = tWrite
+        self.writes = [] #< (start time, {pin: val})
+
+    def setPin(self, pin, val):
+        self.writes.append( (self.clock.t, {pin: val}) )
+        self.clock.t += self.tWrite
+        return 1
+
+    def setPins(self, vals):
+        self.writes.append( (self.clock.t, dict(vals)) )
+        self.clock.t += self.tWrite
+        return dict([(pin, 1) for pin in vals])
+
+def test_waveform_deadlines(clock):
+    pins = FakePins(clock, tWrite=0.001)
+    wave = BridgeWaveform.WaveformScheduler(pins.setPin, pins.setPins, tWrite=0.001)
+    events = BridgeWaveform.pulseTrain(5, onTime=0.01, offTime=0.02, count=3) +[(0.0, 6, 1)]
+    t0 = clock.t
+    report = wave.run(events)
+    tStart = t0 +2*0.001 #< Default lead, twice the write time
+
+    assert [vals for t, vals in pins.writes] == [{5: 1, 6: 1}, {5: 0}, {5: 1}, {5: 0}, {5: 1}, {5: 0}] #< Same time, one setPins
+    for (t, vals), requested in zip(pins.writes, [0.0, 0.01, 0.03, 0.04, 0.06, 0.07]):
+        assert t -tStart == pytest.approx(requested -0.0005, abs=2e-5) #< Issued half a write early
+    assert len(report['edges']) == 7
+    assert sorted([(pin, val, requested) for pin, val, requested, estimated in report['edges']]) == sorted([(pin, val, t) for t, pin, val in events])
+    assert report['maxError'] < 5e-5 #< The estimate is the middle of the write
+    assert report['uncertainty'] == pytest.approx(0.0005, abs=1e-5)
+    assert report['latency'] == pytest.approx(0.0005, abs=1e-5)
+
+def test_waveform_adapts_to_the_write_time(clock):
+    pins = FakePins(clock, tWrite=0.004)
+    wave = BridgeWaveform.WaveformScheduler(pins.setPin, lead=0.01, tWrite=0.001)
+    wave.run(BridgeWaveform.pulseTrain(5, onTime=0.01, count=20))
+    assert wave.tWrite[1] == pytest.approx(0.004, rel=0.1) #< Moving average of the measured writes
+    report = wave.pulse(5, 0.01)
+    assert report['maxError'] < 1e-4
+    assert report['uncertainty'] == pytest.approx(0.002, abs=1e-5)
+
+def test_pin_pulse(ardu, caplog):
+    fw = ardu.comm.ser.fw
+    gpio = ardu.gpio
+    gpio.logger = logging.getLogger('test.gpio')
+    gpio.logger.setLevel(logging.DEBUG)
+    writes = fw.cmdCount['O']
+    t = time.perf_counter()
+    with caplog.at_level(logging.DEBUG, logger='test.gpio'):
+        assert gpio.pinPulse(7, 0.02, log=False) == 1
+    assert time.perf_counter() -t >= 0.02
+    assert fw.cmdCount['O'] == writes +2
+    assert fw.dout[7] == 0
+    assert caplog.records == []
+
+    with caplog.at_level(logging.DEBUG, logger='test.gpio'):
+        gpio.pinPulse(7, 0.01)
+    messages = [rec.getMessage() for rec in caplog.records]
+    assert len(messages) == 2
+    assert messages[0].startswith('DOUT7: 1 at ')
+    assert messages[1].startswith('DOUT7: 0 at ')
+    assert all(['estimated' in msg for msg in messages])
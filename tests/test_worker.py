@@ -0,0 +1,40 @@
+"""I/O worker thread (BridgeWorker)"""
+
+import threading, time
+import pytest
+
+def test_worker_serves_requests(ardu):
+    ardu.comm.ser.fw.analog[3] = 333
+    ardu.comm.startWorker()
+    assert ardu.an.analogRead(3) == 333
+    futures = [ardu.an.analogRead_nb(3) for i in range(10)]
+    assert [fut.result() for fut in futures] == [333]*10
+    ardu.comm.stopWorker()
+    assert ardu.an.analogRead(3) == 333
+
+def test_worker_returns_exception_objects(ardu):
+    worker = ardu.comm.startWorker()
+    err = ValueError('a value')
+    assert worker.submit(lambda: err).result(timeout=1.0) is err
+    with pytest.raises(KeyError):
+        worker.submit(lambda: {}['x']).result(timeout=1.0)
+    ardu.comm.stopWorker()
+
+def test_worker_stop_fails_late_requests(ardu):
+    worker = ardu.comm.startWorker()
+    started = threading.Event()
+    def slow():
+        started.set()
+        time.sleep(0.05)
+        return 'done'
+    first = worker.submit(slow)
+    started.wait(1.0)
+    worker.queue.put( (0, -1, None) ) #< The stop request, ahead of the next request
+    late = worker.submit(lambda: 'late')
+    assert first.result(timeout=1.0) == 'done'
+    with pytest.raises(RuntimeError):
+        late.result(timeout=1.0) #< Does not block forever
+    worker.join(1.0)
+    with pytest.raises(RuntimeError):
+        worker.submit(lambda: 'after').result(timeout=1.0)
+    ardu.comm.worker = None